@@ -1,12 +1,13 @@
 import cv2
 import time
+import queue
+import threading
 import numpy as np
 import pygetwindow as gw
 
 from src.detector import detect_objects
 from src.face_utils import detect_faces
 from src.light_utils import is_face_dark
-from src.person_utils import count_persons
 from src.screen_utils import is_looking_at_screen
 from src.logger import init_logger, log_event
 from src.screenshot_utils import save_screenshot
@@ -20,20 +21,105 @@ WARNING_COOLDOWN = 5
 FACE_MISSING_THRESHOLD = 6        # seconds
 LOW_LIGHT_THRESHOLD = 8           # seconds
 GRACE_PERIOD = 30
+YOLO_STRIDE = 4                   # run object detection every Nth frame
+DISPLAY_FPS = 15                  # preview window refresh cap
+FACE_SCALE = 0.5                  # Haar runs on a half-size frame
 
 # ---- Behavioral features ----
 MAX_TAB_SWITCH_WARNINGS = 5
+WINDOW_POLL_INTERVAL = 0.5        # seconds between active-window queries
 IDLE_TIME_THRESHOLD = 20          # seconds
-MOTION_THRESHOLD = 5000
+MOTION_SCALE = 0.25               # idle check runs on a 1/4-size gray frame
+MOTION_THRESHOLD = 300            # summed abs-diff on the downscaled frame
 # ----------------------------------------
 
+
+class FrameGrabber:
+    """Reads the webcam on a background thread and keeps only the latest frame."""
+
+    def __init__(self, capture):
+        self.cap = capture
+        self._lock = threading.Lock()
+        self._new_frame = threading.Event()
+        self._ok = True
+        self._frame = None
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while self._running:
+            ok, frame = self.cap.read()
+            with self._lock:
+                self._ok, self._frame = ok, frame
+                self._new_frame.set()
+            if not ok:
+                break
+
+    def read(self, timeout=2.0):
+        """Wait for a frame newer than the last one returned."""
+        if not self._new_frame.wait(timeout):
+            return False, None
+        with self._lock:
+            self._new_frame.clear()
+            return self._ok, self._frame
+
+    def release(self):
+        self._running = False
+        self._thread.join(timeout=1.0)
+        self.cap.release()
+
+
+# Log + screenshot writes run on a background thread so disk I/O never
+# blocks the capture loop. Proctoring is not lossless: when the queue is
+# full the oldest pending write is dropped.
+_io_queue = queue.Queue(maxsize=256)
+
+
+def _io_worker():
+    while True:
+        fn, args = _io_queue.get()
+        try:
+            fn(*args)
+        except Exception as e:
+            print(f"[IO ERROR] {type(e).__name__}: {e}")
+        finally:
+            _io_queue.task_done()
+
+
+def submit_io(fn, *args):
+    """Queue a log_event / save_screenshot call for the I/O thread."""
+    while True:
+        try:
+            _io_queue.put_nowait((fn, args))
+            return
+        except queue.Full:
+            try:
+                _io_queue.get_nowait()
+                _io_queue.task_done()
+            except queue.Empty:
+                pass
+
+
+threading.Thread(target=_io_worker, daemon=True).start()
+
+# Warm up the detectors so model / cascade loading doesn't stall the first frame
+_warmup_frame = np.zeros((480, 640, 3), dtype=np.uint8)
+detect_objects(_warmup_frame)
+detect_faces(_warmup_frame)
+del _warmup_frame
+
 # Session setup
 session_id = create_session_id()
 print(f"[INFO] Session started: {session_id}")
 
 log_file = init_logger(session_id)
-session_start_time = time.time()
+session_start_time = time.monotonic()
 cap = start_webcam()
+# Keep only the newest frame in the driver queue so detectors never lag
+cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+grabber = FrameGrabber(cap)
 
 # State variables
 warning_count = 0
@@ -43,22 +129,44 @@ face_missing_start = None
 low_light_start = None
 
 # Tab switch tracking
-last_active_window = gw.getActiveWindowTitle()
+_window_title_cache = (float("-inf"), None)
+
+
+def get_active_window_title_cached(now):
+    """Query the active window title at most once per WINDOW_POLL_INTERVAL."""
+    global _window_title_cache
+    checked_at, title = _window_title_cache
+    if now - checked_at >= WINDOW_POLL_INTERVAL:
+        title = gw.getActiveWindowTitle()
+        _window_title_cache = (now, title)
+    return title
+
+
+last_active_window = get_active_window_title_cached(time.monotonic())
 tab_switch_count = 0
 
 # Idle detection
-last_motion_time = time.time()
+last_motion_time = time.monotonic()
 prev_gray = None
 
+# Object detection cadence
+frame_idx = 0
+results = None
+cls_ids = np.empty(0, dtype=np.int32)
+cell_phone_id = None
+person_id = None
+
+# Preview window throttling
+last_show = 0.0
 
-def add_aggregated_warning(reasons, frame):
+
+def add_aggregated_warning(reasons, frame, now):
     global warning_count, last_warning_time
 
     # Grace period
-    if time.time() - session_start_time < GRACE_PERIOD:
+    if now - session_start_time < GRACE_PERIOD:
         return
 
-    now = time.time()
     if now - last_warning_time >= WARNING_COOLDOWN:
         warning_count += 1
         last_warning_time = now
@@ -66,52 +174,72 @@ def add_aggregated_warning(reasons, frame):
         reason_text = " | ".join(reasons)
         print(f"[WARNING {warning_count}] {reason_text}")
 
-        log_event(log_file, "WARNING", reason_text, warning_count)
-        save_screenshot(frame, session_id, reason_text)
+        submit_io(log_event, log_file, "WARNING", reason_text, warning_count)
+        submit_io(save_screenshot, frame.copy(), session_id, reason_text)
 
 
 while True:
-    ret, frame = cap.read()
+    ret, frame = grabber.read()
     if not ret:
         break
 
-    results = detect_objects(frame)
-    annotated_frame = results[0].plot()
+    # One monotonic timestamp per iteration for every delta check below
+    now = time.monotonic()
+
+    # Single BGR->GRAY conversion per frame (idle check). src/face_utils and
+    # src/light_utils still take BGR, so they get `frame` until they accept gray
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    # YOLO is far slower than Haar; reuse the last result between strides
+    if frame_idx % YOLO_STRIDE == 0 or results is None:
+        results = detect_objects(frame)
+        cls_ids = results[0].boxes.cls.cpu().numpy().astype(np.int32)
+        if cell_phone_id is None:
+            names = results[0].names
+            cell_phone_id = next((i for i, n in names.items() if n == "cell phone"), -1)
+            person_id = next((i for i, n in names.items() if n == "person"), -1)
+    frame_idx += 1
+
     violations = []
 
     # --------------------------------------------------
     # 📱 Mobile phone → instant disqualification
     # --------------------------------------------------
-    for box in results[0].boxes:
-        cls_id = int(box.cls[0])
-        if results[0].names[cls_id] == "cell phone":
-            log_event(log_file, "DISQUALIFIED", "Mobile phone detected", warning_count)
-            save_screenshot(frame, session_id, "Mobile_phone_detected")
+    if (cls_ids == cell_phone_id).any():
+        submit_io(log_event, log_file, "DISQUALIFIED", "Mobile phone detected", warning_count)
+        submit_io(save_screenshot, frame.copy(), session_id, "Mobile_phone_detected")
 
-            cv2.putText(
-                annotated_frame,
-                "DISQUALIFIED: Mobile Phone Detected!",
-                (40, 200),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                1.5,
-                (0, 0, 255),
-                4
-            )
-            cv2.imshow("AI Proctoring System", annotated_frame)
-            cv2.waitKey(3000)
-            cap.release()
-            cv2.destroyAllWindows()
-            exit()
+        annotated_frame = results[0].plot(img=frame.copy())
+        cv2.putText(
+            annotated_frame,
+            "DISQUALIFIED: Mobile Phone Detected!",
+            (40, 200),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            1.5,
+            (0, 0, 255),
+            4
+        )
+        cv2.imshow("AI Proctoring System", annotated_frame)
+        cv2.waitKey(3000)
+        _io_queue.join()
+        grabber.release()
+        cv2.destroyAllWindows()
+        exit()
 
     # --------------------------------------------------
     # 👤 Face detection (Haar)
     # --------------------------------------------------
-    faces = detect_faces(frame)
+    small_frame = cv2.resize(frame, None, fx=FACE_SCALE, fy=FACE_SCALE,
+                             interpolation=cv2.INTER_LINEAR)
+    faces = [
+        tuple(int(v / FACE_SCALE) for v in f)
+        for f in detect_faces(small_frame)
+    ]
 
     if len(faces) == 0:
         if face_missing_start is None:
-            face_missing_start = time.time()
-        elif time.time() - face_missing_start >= FACE_MISSING_THRESHOLD:
+            face_missing_start = now
+        elif now - face_missing_start >= FACE_MISSING_THRESHOLD:
             violations.append("Face not visible")
     else:
         face_missing_start = None
@@ -125,8 +253,8 @@ while True:
         # 🌑 Face-based low light
         if is_face_dark(frame, face):
             if low_light_start is None:
-                low_light_start = time.time()
-            elif time.time() - low_light_start >= LOW_LIGHT_THRESHOLD:
+                low_light_start = now
+            elif now - low_light_start >= LOW_LIGHT_THRESHOLD:
                 violations.append("Low light (face region)")
         else:
             low_light_start = None
@@ -134,17 +262,17 @@ while True:
     # --------------------------------------------------
     # 👥 Multiple persons
     # --------------------------------------------------
-    if count_persons(results) > 1:
+    if int((cls_ids == person_id).sum()) > 1:
         violations.append("Multiple persons detected")
 
     # --------------------------------------------------
     # 🖥️ Tab / window switch detection
     # --------------------------------------------------
-    current_window = gw.getActiveWindowTitle()
+    current_window = get_active_window_title_cached(now)
     if current_window != last_active_window:
         tab_switch_count += 1
         last_active_window = current_window
-        log_event(log_file, "INFO", "Window switch detected", tab_switch_count)
+        submit_io(log_event, log_file, "INFO", "Window switch detected", tab_switch_count)
 
         if tab_switch_count >= MAX_TAB_SWITCH_WARNINGS:
             violations.append("Frequent tab/window switching")
@@ -152,73 +280,82 @@ while True:
     # --------------------------------------------------
     # 🧍 Idle / no-movement detection
     # --------------------------------------------------
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    motion_gray = cv2.resize(gray, (0, 0), fx=MOTION_SCALE, fy=MOTION_SCALE,
+                             interpolation=cv2.INTER_AREA)
     if prev_gray is not None:
-        diff = cv2.absdiff(prev_gray, gray)
-        motion_score = np.sum(diff)
+        diff = cv2.absdiff(prev_gray, motion_gray)
+        motion_score = cv2.sumElems(diff)[0]
 
         if motion_score > MOTION_THRESHOLD:
-            last_motion_time = time.time()
+            last_motion_time = now
 
-    prev_gray = gray
+    prev_gray = motion_gray
 
-    if time.time() - last_motion_time > IDLE_TIME_THRESHOLD:
+    if now - last_motion_time > IDLE_TIME_THRESHOLD:
         violations.append("User inactive / no movement")
 
     # --------------------------------------------------
     # ⚠️ Smart aggregated warning
     # --------------------------------------------------
     if violations:
-        add_aggregated_warning(violations, frame)
-        y = 80
-        for v in violations:
+        add_aggregated_warning(violations, frame, now)
+
+    if warning_count >= MAX_WARNINGS:
+        submit_io(log_event, log_file, "DISQUALIFIED", "Too many warnings", warning_count)
+        submit_io(save_screenshot, frame.copy(), session_id, "Too_many_warnings")
+        break
+
+    # --------------------------------------------------
+    # 🖼️ Preview (overlays are only drawn on frames we show)
+    # --------------------------------------------------
+    if now - last_show >= 1.0 / DISPLAY_FPS:
+        annotated_frame = results[0].plot(img=frame.copy())
+
+        # ⚠️ Active warnings
+        if violations:
+            y = 80
+            for v in violations:
+                cv2.putText(
+                    annotated_frame,
+                    f"WARNING: {v}",
+                    (30, y),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    1,
+                    (0, 255, 255),
+                    3
+                )
+                y += 40
+
+        # ⏳ Grace period display
+        elapsed = int(now - session_start_time)
+        if elapsed < GRACE_PERIOD:
             cv2.putText(
                 annotated_frame,
-                f"WARNING: {v}",
-                (30, y),
+                f"Grace Period: {GRACE_PERIOD - elapsed}s",
+                (30, 40),
                 cv2.FONT_HERSHEY_SIMPLEX,
                 1,
-                (0, 255, 255),
+                (0, 255, 0),
                 3
             )
-            y += 40
 
-    # --------------------------------------------------
-    # ⏳ Grace period display
-    # --------------------------------------------------
-    elapsed = int(time.time() - session_start_time)
-    if elapsed < GRACE_PERIOD:
+        # 🔢 Warning counter
         cv2.putText(
             annotated_frame,
-            f"Grace Period: {GRACE_PERIOD - elapsed}s",
-            (30, 40),
+            f"Warnings: {warning_count}/{MAX_WARNINGS}",
+            (30, 260),
             cv2.FONT_HERSHEY_SIMPLEX,
             1,
-            (0, 255, 0),
+            (0, 0, 255),
             3
         )
 
-    # --------------------------------------------------
-    # 🔢 Warning counter
-    # --------------------------------------------------
-    cv2.putText(
-        annotated_frame,
-        f"Warnings: {warning_count}/{MAX_WARNINGS}",
-        (30, 260),
-        cv2.FONT_HERSHEY_SIMPLEX,
-        1,
-        (0, 0, 255),
-        3
-    )
-
-    if warning_count >= MAX_WARNINGS:
-        log_event(log_file, "DISQUALIFIED", "Too many warnings", warning_count)
-        save_screenshot(frame, session_id, "Too_many_warnings")
-        break
+        cv2.imshow("AI Proctoring System", annotated_frame)
+        last_show = now
 
-    cv2.imshow("AI Proctoring System", annotated_frame)
     if cv2.waitKey(1) & 0xFF == ord('q'):
         break
 
-cap.release()
+_io_queue.join()
+grabber.release()
 cv2.destroyAllWindows()
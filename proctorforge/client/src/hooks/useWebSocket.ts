@@ -5,6 +5,8 @@
 
 import { useEffect, useRef, useCallback } from 'react';
 
+const textEncoder = new TextEncoder();
+
 interface UseWebSocketOptions {
     sessionType: 'exam' | 'teacher' | 'admin';
     sessionId: string;
@@ -43,7 +45,12 @@ export function useWebSocket({
             ws.onmessage = (event) => {
                 try {
                     const data = JSON.parse(event.data);
-                    onMessage?.(data);
+                    // The server coalesces bursts into one frame
+                    if (data.type === 'batch') {
+                        data.items.forEach((item: any) => onMessage?.(item));
+                    } else {
+                        onMessage?.(data);
+                    }
                 } catch { }
             };
 
@@ -69,7 +76,8 @@ export function useWebSocket({
 
     const send = useCallback((data: any) => {
         if (wsRef.current?.readyState === WebSocket.OPEN) {
-            wsRef.current.send(JSON.stringify(data));
+            // Binary frame: the server parses the bytes directly, skipping UTF-8 validation
+            wsRef.current.send(textEncoder.encode(JSON.stringify(data)));
         }
     }, []);
 
@@ -2,8 +2,9 @@
 ProctorForge AI - Configuration
 Loads settings from environment variables.
 """
+from functools import cached_property
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Tuple
 import os
 from dotenv import load_dotenv
 
@@ -15,12 +16,20 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "postgresql+asyncpg://localhost/proctorforge"
     DATABASE_URL_SYNC: str = "postgresql://localhost/proctorforge"
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 5  # fail fast instead of queueing requests behind a saturated pool
+    DB_POOL_RECYCLE: int = 1800
+    DB_QUERY_CACHE_SIZE: int = 1200  # compiled-statement cache entries per engine
 
     # JWT
     JWT_SECRET_KEY: str = "change-me"
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRATION_MINUTES: int = 120
 
+    # Password hashing (bcrypt cost factor; each +1 doubles hash time)
+    PASSWORD_HASH_ROUNDS: int = 12
+
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
 
@@ -40,15 +49,25 @@ class Settings(BaseSettings):
     SUPABASE_ANON_KEY: str = ""
     SUPABASE_SERVICE_ROLE_KEY: str = ""
 
+    # Buffered event writes (services/event_writer.py)
+    EVENT_BATCH_SIZE: int = 50
+    EVENT_BATCH_MS: int = 50
+    # Heartbeat trust penalties are coalesced per attempt (services/penalty_writer.py)
+    PENALTY_FLUSH_MS: int = 1000
+
     # Docker Sandbox
     SANDBOX_IMAGE: str = "proctorforge-sandbox"
     SANDBOX_TIMEOUT: int = 30
     SANDBOX_MEMORY_LIMIT: str = "256m"
     SANDBOX_CPU_LIMIT: float = 0.5
+    SANDBOX_MAX_CONCURRENCY: int = 0  # sandbox pool workers; 0 = os.cpu_count()
+    SANDBOX_WARM_CONTAINERS: int = -1  # idle Python containers kept running; -1 = one per worker, 0 = off
+    SANDBOX_BACKEND: str = "docker"  # "docker", or "bwrap" (bubblewrap jail on the API host)
+    SANDBOX_FALLBACK_STRICT: bool = True  # False: no-Docker Python runs fork from prestarted workers
 
-    @property
-    def cors_origins_list(self) -> List[str]:
-        return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
+    @cached_property
+    def cors_origins_list(self) -> Tuple[str, ...]:
+        return tuple(origin.strip() for origin in self.CORS_ORIGINS.split(","))
 
     class Config:
         env_file = "../.env"
@@ -4,20 +4,101 @@ Uses Supabase client (HTTPS) for all data operations.
 SQLAlchemy ORM is used locally only to create table schemas.
 """
 import os
+from sqlalchemy import Boolean, event as sa_event, inspect as sa_inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.schema import CreateColumn
 from config import settings
 
 # Global
 engine = None
 AsyncSessionLocal = None
 supabase_client = None
+# Indexes _create_missing_indexes couldn't build; callers relying on one fall back
+missing_indexes = set()
 
 
 class Base(DeclarativeBase):
     pass
 
 
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets readers run alongside the single writer; NORMAL sync is safe under WAL."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def _engine_options(url: str) -> dict:
+    """Shared pool settings; pre-ping only where connections can go stale over the network."""
+    options = {
+        "query_cache_size": settings.DB_QUERY_CACHE_SIZE,
+        # aiosqlite defaults to NullPool (a new file handle per session); pool it explicitly
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if not url.startswith("sqlite"):
+        options["pool_pre_ping"] = True
+    return options
+
+
+def dialect_insert(session: AsyncSession):
+    """Return the dialect-specific `insert` (with ON CONFLICT support) for the session's engine."""
+    if session.get_bind().dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+
+def _add_missing_columns(sync_conn):
+    """create_all skips existing tables, so add columns introduced after the table was created."""
+    inspector = sa_inspect(sync_conn)
+    preparer = sync_conn.dialect.identifier_preparer
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable and column.server_default is None:
+                # Existing rows would have no value for it
+                print(f"⚠️  Could not add column {table.name}.{column.name}: NOT NULL without a server default")
+                continue
+            ddl = CreateColumn(column).compile(dialect=sync_conn.dialect)
+            sync_conn.exec_driver_sql(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}")
+
+
+def _convert_legacy_booleans(sync_conn):
+    """Boolean columns once stored as 'true'/'false' strings (typing_metrics.burst_detected): rewrite them as 1/0."""
+    preparer = sync_conn.dialect.identifier_preparer
+    for table in Base.metadata.sorted_tables:
+        for column in table.columns:
+            if not isinstance(column.type, Boolean):
+                continue
+            name = preparer.quote(column.name)
+            sync_conn.exec_driver_sql(
+                f"UPDATE {preparer.format_table(table)} "
+                f"SET {name} = CASE WHEN lower({name}) = 'true' THEN 1 ELSE 0 END "
+                f"WHERE typeof({name}) = 'text'"
+            )
+
+
+def _create_missing_indexes(sync_conn):
+    """create_all skips existing tables, so add indexes introduced after the table was created."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(sync_conn, checkfirst=True)
+            except Exception as e:
+                # e.g. existing duplicate rows block a new unique index; keep starting up
+                missing_indexes.add(index.name)
+                print(f"⚠️  Could not create index {index.name}: {type(e).__name__}: {str(e)[:120]}")
+
+
 def get_supabase():
     """Return the initialized Supabase client."""
     if supabase_client is None:
@@ -75,11 +156,15 @@ async def init_db():
     sqlite_path = os.path.join(db_dir, "proctorforge_local.db")
     sqlite_url = f"sqlite+aiosqlite:///{sqlite_path}"
 
-    engine = create_async_engine(sqlite_url, echo=False, pool_pre_ping=True)
+    engine = create_async_engine(sqlite_url, echo=False, **_engine_options(sqlite_url))
+    sa_event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
 
     async with engine.begin() as conn:
         from models import user, exam, attempt, event  # noqa
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_convert_legacy_booleans)
+        await conn.run_sync(_create_missing_indexes)
 
     AsyncSessionLocal = async_sessionmaker(
         bind=engine,
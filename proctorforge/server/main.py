@@ -9,10 +9,15 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from config import settings
 from database import init_db
+from services.event_writer import event_writer
+from services.penalty_writer import penalty_writer
+from services.sandbox import sandbox_pool
+from services.cache import close_cache
+from services.live_feed import live_feed
 from routers.auth import router as auth_router
 from routers.exams import router as exams_router
 from routers.attempts import router as attempts_router
-from routers.websocket import router as websocket_router
+from routers.websocket import router as websocket_router, manager
 from routers.code_execution import router as code_router
 from routers.monitoring import router as monitoring_router
 
@@ -23,7 +28,16 @@ async def lifespan(app: FastAPI):
     # Create tables on startup
     await init_db()
     print("✅ Database tables created")
+    await event_writer.start()
+    await penalty_writer.start()
+    await sandbox_pool.start()
     yield
+    await sandbox_pool.stop()
+    await penalty_writer.stop()
+    await event_writer.stop()
+    await live_feed.stop()
+    await manager.stop()
+    await close_cache()
     print("🛑 Server shutting down")
 
 
@@ -82,5 +96,6 @@ if __name__ == "__main__":
         port=settings.SERVER_PORT,
         reload=is_development,
         workers=1 if is_development else 4,
+        loop="auto",  # uvloop (installed with uvicorn[standard]) where available
         log_level="debug" if is_development else "info",
     )
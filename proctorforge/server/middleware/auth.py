@@ -5,27 +5,36 @@ Provides dependencies for route-level authentication and role-based access contr
 from datetime import datetime, timedelta
 from typing import Optional, List
 from uuid import UUID
+import hashlib
+import time
 import bcrypt
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import settings
 from database import get_db
 from models.user import User
+from utils.ttl_cache import TTLCache
 
 security = HTTPBearer()
 
+_DEFAULT_TOKEN_LIFETIME = timedelta(minutes=settings.JWT_EXPIRATION_MINUTES)
+
+# Decoded JWT payloads keyed by token digest; entries never outlive `exp`
+_token_cache = TTLCache(maxsize=10_000, ttl=60)
+
 
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt with utf-8 encoding"""
     try:
         # Ensure password is bytes and limit to 72 bytes (bcrypt limit)
         pwd_bytes = password.encode('utf-8')[:72]
-        salt = bcrypt.gensalt(rounds=12)
+        # Cost is configurable: 12 rounds is ~250ms per hash, paid on every
+        # register and login. Lower it only on hosts where that latency hurts.
+        salt = bcrypt.gensalt(rounds=settings.PASSWORD_HASH_ROUNDS)
         hashed = bcrypt.hashpw(pwd_bytes, salt)
         return hashed.decode('utf-8')
     except Exception as e:
@@ -33,8 +42,14 @@ def hash_password(password: str) -> str:
         raise
 
 
+# Checked against when the login email is unknown, so both failure paths cost one bcrypt verify
+DUMMY_PASSWORD_HASH = bcrypt.hashpw(
+    b"proctorforge-dummy-password", bcrypt.gensalt(rounds=settings.PASSWORD_HASH_ROUNDS)
+).decode('utf-8')
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
+    """Verify a password against its hash (bcrypt.checkpw compares in constant time)"""
     try:
         pwd_bytes = plain_password.encode('utf-8')[:72]
         return bcrypt.checkpw(pwd_bytes, hashed_password.encode('utf-8'))
@@ -44,15 +59,19 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-    to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.JWT_EXPIRATION_MINUTES))
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    expire = datetime.utcnow() + (expires_delta or _DEFAULT_TOKEN_LIFETIME)
+    return jwt.encode({**data, "exp": expire}, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
 
 
 def decode_access_token(token: str) -> dict:
+    cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    payload = _token_cache.get(cache_key)
+    if payload is not None:
+        return payload
     try:
         payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        exp = payload.get("exp")
+        _token_cache.set(cache_key, payload, ttl=exp - time.time() if exp else None)
         return payload
     except JWTError:
         raise HTTPException(
@@ -63,25 +82,31 @@ def decode_access_token(token: str) -> dict:
 
 
 async def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db),
 ) -> User:
-    """Dependency: extracts and validates the current user from JWT."""
+    """Dependency: extracts and validates the current user from JWT (resolved once per request)."""
+    user = getattr(request.state, "user", None)
+    if user is not None:
+        return user
+
     payload = decode_access_token(credentials.credentials)
     user_id = payload.get("sub")
     if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid token payload")
 
-    result = await db.execute(select(User).where(User.id == UUID(user_id)))
-    user = result.scalar_one_or_none()
-
+    # Primary-key lookup (served from the session's identity map if already loaded)
+    user = await db.get(User, UUID(user_id))
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
+
     if user.status == "suspended":
         raise HTTPException(status_code=403, detail="Account suspended")
     if user.status == "locked":
         raise HTTPException(status_code=403, detail="Account locked")
 
+    request.state.user = user
     return user
 
 
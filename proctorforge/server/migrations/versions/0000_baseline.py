@@ -0,0 +1,185 @@
+"""baseline schema
+
+Revision ID: 0000_baseline
+Revises:
+Create Date: 2026-10-15 00:00:00.000000
+
+Creates the tables as they were before the first migration, so that
+`alembic upgrade head` works on an empty database. Tables that already exist
+(created by supabase_setup.sql or an earlier create_all) are left untouched.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from models.portable_types import PortableJSON, PortableUUID
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0000_baseline"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _id() -> sa.Column:
+    return sa.Column("id", PortableUUID(), primary_key=True)
+
+
+def _fk(name: str, target: str, nullable: bool = False, index: bool = True) -> sa.Column:
+    return sa.Column(name, PortableUUID(), sa.ForeignKey(f"{target}.id"), nullable=nullable, index=index)
+
+
+def _timestamp(name: str) -> sa.Column:
+    return sa.Column(name, sa.DateTime(), server_default=sa.func.now())
+
+
+def _baseline_metadata() -> sa.MetaData:
+    metadata = sa.MetaData()
+    sa.Table(
+        "users", metadata,
+        _id(),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("email", sa.String(255), nullable=False, unique=True, index=True),
+        sa.Column("password_hash", sa.Text(), nullable=False),
+        sa.Column("role", sa.String(20), nullable=False, server_default="student"),
+        sa.Column("status", sa.String(20), nullable=False, server_default="active"),
+        _timestamp("created_at"),
+        sa.Column("gender", sa.String(20)),
+        sa.Column("class_name", sa.String(100)),
+        sa.Column("year", sa.String(20)),
+        sa.Column("section", sa.String(20)),
+        sa.Column("register_number", sa.String(100)),
+    )
+    sa.Table(
+        "exams", metadata,
+        _id(),
+        sa.Column("title", sa.String(255), nullable=False),
+        sa.Column("description", sa.Text()),
+        _fk("created_by", "users", index=False),
+        sa.Column("type", sa.String(20), nullable=False, server_default="mcq"),
+        sa.Column("duration_minutes", sa.Integer(), nullable=False, server_default="60"),
+        sa.Column("start_time", sa.DateTime()),
+        sa.Column("end_time", sa.DateTime()),
+        sa.Column("status", sa.String(20), nullable=False, server_default="draft"),
+        sa.Column("settings", PortableJSON()),
+        _timestamp("created_at"),
+        sa.Column("assigned_class", sa.String(100)),
+        sa.Column("assigned_year", sa.String(20)),
+        sa.Column("assigned_section", sa.String(20)),
+    )
+    sa.Table(
+        "exam_assignments", metadata,
+        _id(),
+        _fk("exam_id", "exams"),
+        _fk("student_id", "users"),
+        _fk("assigned_by", "users", index=False),
+        _timestamp("assigned_at"),
+        sa.Column("status", sa.String(20), nullable=False, server_default="pending"),
+    )
+    sa.Table(
+        "questions", metadata,
+        _id(),
+        _fk("exam_id", "exams"),
+        sa.Column("type", sa.String(20), nullable=False, server_default="mcq"),
+        sa.Column("language", sa.String(20)),
+        sa.Column("question_text", sa.Text(), nullable=False),
+        sa.Column("options", PortableJSON()),
+        sa.Column("correct_answer", sa.Text()),
+        sa.Column("test_cases", PortableJSON()),
+        sa.Column("points", sa.Integer(), nullable=False, server_default="10"),
+        sa.Column("order_index", sa.Integer(), nullable=False, server_default="0"),
+        _timestamp("created_at"),
+    )
+    sa.Table(
+        "attempts", metadata,
+        _id(),
+        _fk("user_id", "users"),
+        _fk("exam_id", "exams"),
+        _timestamp("start_time"),
+        sa.Column("end_time", sa.DateTime()),
+        sa.Column("trust_score", sa.Float(), nullable=False, server_default="100"),
+        sa.Column("risk_level", sa.String(20), nullable=False, server_default="low"),
+        sa.Column("status", sa.String(20), nullable=False, server_default="active"),
+        sa.Column("device_fingerprint", sa.Text()),
+        sa.Column("browser_info", PortableJSON()),
+    )
+    sa.Table(
+        "code_submissions", metadata,
+        _id(),
+        _fk("attempt_id", "attempts"),
+        _fk("question_id", "questions", index=False),
+        sa.Column("language", sa.String(20), nullable=False),
+        sa.Column("code", sa.Text(), nullable=False),
+        sa.Column("test_results", PortableJSON()),
+        sa.Column("score", sa.Float()),
+        _timestamp("submitted_at"),
+    )
+    sa.Table(
+        "live_code_logs", metadata,
+        _id(),
+        _fk("attempt_id", "attempts"),
+        _fk("question_id", "questions", nullable=True, index=False),
+        sa.Column("code_snapshot", sa.Text(), nullable=False),
+        sa.Column("event_type", sa.String(20), nullable=False, server_default="autosave"),
+        _timestamp("timestamp"),
+    )
+    sa.Table(
+        "typing_metrics", metadata,
+        _id(),
+        _fk("attempt_id", "attempts"),
+        sa.Column("wpm", sa.Float()),
+        sa.Column("backspace_ratio", sa.Float()),
+        sa.Column("paste_size", sa.Integer()),
+        sa.Column("idle_time", sa.Float()),
+        sa.Column("entropy_score", sa.Float()),
+        # Still a string here; 0007 converts it to a boolean
+        sa.Column("burst_detected", sa.String(10), server_default="false"),
+        _timestamp("recorded_at"),
+    )
+    sa.Table(
+        "events", metadata,
+        _id(),
+        _fk("attempt_id", "attempts"),
+        sa.Column("event_type", sa.String(50), nullable=False),
+        sa.Column("event_data", PortableJSON()),
+        sa.Column("confidence_score", sa.Float()),
+        sa.Column("hmac_signature", sa.Text()),
+        _timestamp("created_at"),
+    )
+    sa.Table(
+        "ai_interventions", metadata,
+        _id(),
+        _fk("attempt_id", "attempts"),
+        sa.Column("trigger_event", sa.String(50), nullable=False),
+        sa.Column("risk_level", sa.String(20), nullable=False),
+        sa.Column("intervention_text", sa.Text()),
+        sa.Column("challenge_prompt", sa.Text()),
+        sa.Column("response_text", sa.Text()),
+        sa.Column("outcome", sa.String(20)),
+        sa.Column("trust_adjustment", sa.Float()),
+        sa.Column("reasoning_trace", PortableJSON()),
+        _timestamp("created_at"),
+    )
+    sa.Table(
+        "audit_reports", metadata,
+        _id(),
+        _fk("attempt_id", "attempts"),
+        sa.Column("summary", sa.Text()),
+        sa.Column("timeline", PortableJSON()),
+        sa.Column("risk_breakdown", PortableJSON()),
+        sa.Column("final_trust_score", sa.Float()),
+        sa.Column("ai_reasoning", PortableJSON()),
+        _timestamp("generated_at"),
+    )
+    return metadata
+
+
+def upgrade() -> None:
+    # checkfirst: only the missing tables are created
+    _baseline_metadata().create_all(op.get_bind(), checkfirst=True)
+
+
+def downgrade() -> None:
+    _baseline_metadata().drop_all(op.get_bind(), checkfirst=True)
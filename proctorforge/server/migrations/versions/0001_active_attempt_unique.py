@@ -0,0 +1,34 @@
+"""unique active attempt per user and exam
+
+Revision ID: 0001_active_attempt_unique
+Revises: 0000_baseline
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_active_attempt_unique"
+down_revision: Union[str, None] = "0000_baseline"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "uq_attempts_active_user_exam",
+        "attempts",
+        ["user_id", "exam_id"],
+        unique=True,
+        postgresql_where=sa.text("status = 'active'"),
+        sqlite_where=sa.text("status = 'active'"),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_attempts_active_user_exam", table_name="attempts", if_exists=True)
@@ -0,0 +1,33 @@
+"""composite indexes for per-attempt event and code-log timelines
+
+Revision ID: 0002_attempt_timeline_indexes
+Revises: 0001_active_attempt_unique
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_attempt_timeline_indexes"
+down_revision: Union[str, None] = "0001_active_attempt_unique"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_events_attempt_created", "events", ["attempt_id", "created_at"], if_not_exists=True,
+    )
+    op.create_index(
+        "ix_live_code_logs_attempt_timestamp", "live_code_logs", ["attempt_id", "timestamp"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_live_code_logs_attempt_timestamp", table_name="live_code_logs", if_exists=True)
+    op.drop_index("ix_events_attempt_created", table_name="events", if_exists=True)
@@ -0,0 +1,49 @@
+"""unique assignment per exam and student
+
+Revision ID: 0003_unique_exam_assignment
+Revises: 0002_attempt_timeline_indexes
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_unique_exam_assignment"
+down_revision: Union[str, None] = "0002_attempt_timeline_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the oldest row of any duplicate (exam_id, student_id) pair
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(
+            """
+            DELETE FROM exam_assignments a
+            USING exam_assignments b
+            WHERE a.exam_id = b.exam_id
+              AND a.student_id = b.student_id
+              AND (a.assigned_at, a.id::text) > (b.assigned_at, b.id::text)
+            """
+        )
+    else:
+        op.execute(
+            """
+            DELETE FROM exam_assignments
+            WHERE rowid NOT IN (
+                SELECT MIN(rowid) FROM exam_assignments GROUP BY exam_id, student_id
+            )
+            """
+        )
+    op.create_index(
+        "uq_exam_assignments_exam_student", "exam_assignments", ["exam_id", "student_id"],
+        unique=True, if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_exam_assignments_exam_student", table_name="exam_assignments", if_exists=True)
@@ -0,0 +1,40 @@
+"""composite indexes for exam listing and class roster lookups
+
+Revision ID: 0004_exam_lookup_indexes
+Revises: 0003_unique_exam_assignment
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_exam_lookup_indexes"
+down_revision: Union[str, None] = "0003_unique_exam_assignment"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_users_class_lookup", "users", ["role", "class_name", "year", "section"],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_exams_created_by_created_at", "exams", ["created_by", "created_at"],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_exams_class_lookup", "exams",
+        ["assigned_class", "assigned_year", "assigned_section", "status"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_exams_class_lookup", table_name="exams", if_exists=True)
+    op.drop_index("ix_exams_created_by_created_at", table_name="exams", if_exists=True)
+    op.drop_index("ix_users_class_lookup", table_name="users", if_exists=True)
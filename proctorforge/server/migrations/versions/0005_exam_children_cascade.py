@@ -0,0 +1,42 @@
+"""cascade exam deletes to questions and assignments
+
+Revision ID: 0005_exam_children_cascade
+Revises: 0004_exam_lookup_indexes
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005_exam_children_cascade"
+down_revision: Union[str, None] = "0004_exam_lookup_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, PostgreSQL default constraint name)
+_EXAM_CHILDREN = (
+    ("questions", "questions_exam_id_fkey"),
+    ("exam_assignments", "exam_assignments_exam_id_fkey"),
+)
+
+
+def _recreate_exam_fks(ondelete: Union[str, None]) -> None:
+    # SQLite doesn't enforce these foreign keys (no PRAGMA foreign_keys), so only
+    # PostgreSQL needs the constraints rebuilt
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for table, constraint in _EXAM_CHILDREN:
+        op.drop_constraint(constraint, table, type_="foreignkey")
+        op.create_foreign_key(constraint, table, "exams", ["exam_id"], ["id"], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    _recreate_exam_fks("CASCADE")
+
+
+def downgrade() -> None:
+    _recreate_exam_fks(None)
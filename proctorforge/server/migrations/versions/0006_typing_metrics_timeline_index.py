@@ -0,0 +1,38 @@
+"""composite index for per-attempt typing metric timelines
+
+Revision ID: 0006_typing_metrics_timeline_index
+Revises: 0005_exam_children_cascade
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006_typing_metrics_timeline_index"
+down_revision: Union[str, None] = "0005_exam_children_cascade"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # typing_metrics takes a write every few seconds per student; build the index
+    # without blocking them (CONCURRENTLY can't run inside a transaction)
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_typing_metrics_attempt_recorded", "typing_metrics", ["attempt_id", "recorded_at"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_typing_metrics_attempt_recorded", table_name="typing_metrics",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
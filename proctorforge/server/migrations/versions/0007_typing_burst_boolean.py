@@ -0,0 +1,50 @@
+"""store typing_metrics.burst_detected as a boolean
+
+Revision ID: 0007_typing_burst_boolean
+Revises: 0006_typing_metrics_timeline_index
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007_typing_burst_boolean"
+down_revision: Union[str, None] = "0006_typing_metrics_timeline_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        # The old 'false' default can't be cast, so drop it around the type change
+        op.alter_column("typing_metrics", "burst_detected", server_default=None)
+        op.alter_column(
+            "typing_metrics", "burst_detected",
+            type_=sa.Boolean(),
+            postgresql_using="burst_detected = 'true'",
+        )
+        op.alter_column("typing_metrics", "burst_detected", server_default=sa.false())
+        return
+    # SQLite: rewrite the stored strings as 0/1, then recreate the column type
+    op.execute("UPDATE typing_metrics SET burst_detected = CASE WHEN burst_detected = 'true' THEN 1 ELSE 0 END")
+    with op.batch_alter_table("typing_metrics") as batch:
+        batch.alter_column("burst_detected", type_=sa.Boolean(), existing_type=sa.String(10))
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.alter_column("typing_metrics", "burst_detected", server_default=None)
+        op.alter_column(
+            "typing_metrics", "burst_detected",
+            type_=sa.String(10),
+            postgresql_using="CASE WHEN burst_detected THEN 'true' ELSE 'false' END",
+        )
+        op.alter_column("typing_metrics", "burst_detected", server_default=sa.text("'false'"))
+        return
+    op.execute("UPDATE typing_metrics SET burst_detected = CASE WHEN burst_detected = 1 THEN 'true' ELSE 'false' END")
+    with op.batch_alter_table("typing_metrics") as batch:
+        batch.alter_column("burst_detected", type_=sa.String(10), existing_type=sa.Boolean())
@@ -0,0 +1,98 @@
+"""hash-partition events by attempt_id
+
+Revision ID: 0008_partition_events
+Revises: 0007_typing_burst_boolean
+Create Date: 2026-10-15 00:00:00.000000
+
+Rebuilds events as PARTITION BY HASH (attempt_id) with 16 partitions and copies
+the existing rows across. The copy holds an exclusive lock on events for its
+duration, so run it in a maintenance window on large databases.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008_partition_events"
+down_revision: Union[str, None] = "0007_typing_burst_boolean"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS = 16
+
+_COLUMNS = "id, attempt_id, event_type, event_data, confidence_score, hmac_signature, created_at"
+
+_CREATE_EVENTS = """
+CREATE TABLE events (
+    id UUID NOT NULL,
+    attempt_id UUID NOT NULL REFERENCES attempts(id),
+    event_type VARCHAR(50) NOT NULL,
+    event_data JSONB,
+    confidence_score FLOAT,
+    hmac_signature TEXT,
+    created_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY ({primary_key})
+){partition_clause}
+"""
+
+_INDEXES = (
+    ("ix_events_attempt_id", ["attempt_id"]),
+    ("ix_events_attempt_created", ["attempt_id", "created_at"]),
+)
+
+
+def _rebuild_events(partitioned: bool) -> None:
+    op.execute("ALTER TABLE events RENAME TO events_old")
+    # The primary key's index keeps its name across the rename; free it for the new table
+    op.execute("ALTER TABLE events_old RENAME CONSTRAINT events_pkey TO events_old_pkey")
+    op.execute(_CREATE_EVENTS.format(
+        # A partitioned table's primary key must include the partition key
+        primary_key="id, attempt_id" if partitioned else "id",
+        partition_clause=" PARTITION BY HASH (attempt_id)" if partitioned else "",
+    ))
+    if partitioned:
+        for remainder in range(PARTITIONS):
+            op.execute(
+                f"CREATE TABLE events_p{remainder} PARTITION OF events "
+                f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})"
+            )
+    op.execute(f"INSERT INTO events ({_COLUMNS}) SELECT {_COLUMNS} FROM events_old")
+
+    # Keep the Supabase setup (RLS policy, realtime publication) if this database has it
+    bind = op.get_bind()
+    rls = bind.execute(sa.text(
+        "SELECT relrowsecurity FROM pg_class WHERE oid = 'events_old'::regclass"
+    )).scalar()
+    published = bind.execute(sa.text(
+        "SELECT 1 FROM pg_publication_tables "
+        "WHERE pubname = 'supabase_realtime' AND tablename = 'events_old'"
+    )).scalar()
+
+    # Dropping the old table also drops its indexes, freeing their names
+    op.execute("DROP TABLE events_old")
+    for name, columns in _INDEXES:
+        op.create_index(name, "events", columns)
+
+    if rls:
+        op.execute("ALTER TABLE events ENABLE ROW LEVEL SECURITY")
+        op.execute(
+            'CREATE POLICY "Service role full access" ON events '
+            "FOR ALL USING (true) WITH CHECK (true)"
+        )
+    if published:
+        op.execute("ALTER PUBLICATION supabase_realtime ADD TABLE events")
+
+
+def upgrade() -> None:
+    # SQLite (local development) has no declarative partitioning
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    _rebuild_events(partitioned=True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    _rebuild_events(partitioned=False)
@@ -0,0 +1,31 @@
+"""events.repeat_count for suppressed duplicate events
+
+Revision ID: 0009_event_repeat_count
+Revises: 0008_partition_events
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009_event_repeat_count"
+down_revision: Union[str, None] = "0008_partition_events"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A constant default makes this a metadata-only change on PostgreSQL 11+
+    op.add_column(
+        "events",
+        sa.Column("repeat_count", sa.Integer(), nullable=False, server_default="1"),
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("events") as batch:
+        batch.drop_column("repeat_count")
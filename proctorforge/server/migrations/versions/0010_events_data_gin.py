@@ -0,0 +1,53 @@
+"""GIN index on events.event_data for containment queries
+
+Revision ID: 0010_events_data_gin
+Revises: 0009_event_repeat_count
+Create Date: 2026-10-15 00:00:00.000000
+
+event_data is already JSONB on PostgreSQL (PortableJSON), so only the index is
+added. events is hash-partitioned (0008) and CREATE INDEX CONCURRENTLY doesn't
+work on a partitioned parent, so each partition is indexed concurrently and
+attached to an index created ON ONLY the parent.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0010_events_data_gin"
+down_revision: Union[str, None] = "0009_event_repeat_count"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX = "ix_events_data_gin"
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    partitions = op.get_bind().execute(sa.text(
+        "SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'events'::regclass"
+    )).scalars().all()
+    with op.get_context().autocommit_block():
+        if not partitions:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX} "
+                "ON events USING gin (event_data jsonb_path_ops)"
+            )
+            return
+        op.execute(f"CREATE INDEX IF NOT EXISTS {INDEX} ON ONLY events USING gin (event_data jsonb_path_ops)")
+        for partition in partitions:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition}_data_gin "
+                f"ON {partition} USING gin (event_data jsonb_path_ops)"
+            )
+            op.execute(f"ALTER INDEX {INDEX} ATTACH PARTITION {partition}_data_gin")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    # Dropping the parent index drops the attached partition indexes with it
+    op.execute(f"DROP INDEX IF EXISTS {INDEX}")
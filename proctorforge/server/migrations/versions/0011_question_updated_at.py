@@ -0,0 +1,32 @@
+"""questions.updated_at, the version stamp for cached test cases
+
+Revision ID: 0011_question_updated_at
+Revises: 0010_events_data_gin
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0011_question_updated_at"
+down_revision: Union[str, None] = "0010_events_data_gin"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SQLite can't add a column with a non-constant default; existing rows stay NULL there
+    default = sa.func.now() if op.get_bind().dialect.name == "postgresql" else None
+    op.add_column(
+        "questions",
+        sa.Column("updated_at", sa.DateTime(), nullable=True, server_default=default),
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("questions") as batch:
+        batch.drop_column("updated_at")
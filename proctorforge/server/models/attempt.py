@@ -3,13 +3,22 @@ ProctorForge AI - Attempt, Code Submission, Live Code Log, Typing Metrics Models
 """
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, Float, DateTime, Text, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, Text, ForeignKey, Index, func, text
 from models.portable_types import PortableUUID as UUID, PortableJSON as JSONB
 from database import Base
 
 
 class Attempt(Base):
     __tablename__ = "attempts"
+    __table_args__ = (
+        # At most one active attempt per student per exam (upsert target in create_attempt)
+        Index(
+            "uq_attempts_active_user_exam", "user_id", "exam_id",
+            unique=True,
+            postgresql_where=text("status = 'active'"),
+            sqlite_where=text("status = 'active'"),
+        ),
+    )
 
     id = Column(UUID(), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(), ForeignKey("users.id"), nullable=False, index=True)
@@ -33,11 +42,15 @@ class CodeSubmission(Base):
     code = Column(Text, nullable=False)
     test_results = Column(JSONB(), nullable=True)
     score = Column(Float, nullable=True)
-    submitted_at = Column(DateTime, default=datetime.utcnow)
+    submitted_at = Column(DateTime, server_default=func.now())
 
 
 class LiveCodeLog(Base):
     __tablename__ = "live_code_logs"
+    __table_args__ = (
+        # Serves WHERE attempt_id = ? ORDER BY timestamp without a sort
+        Index("ix_live_code_logs_attempt_timestamp", "attempt_id", "timestamp"),
+    )
 
     id = Column(UUID(), primary_key=True, default=uuid.uuid4)
     attempt_id = Column(UUID(), ForeignKey("attempts.id"), nullable=False, index=True)
@@ -49,6 +62,10 @@ class LiveCodeLog(Base):
 
 class TypingMetric(Base):
     __tablename__ = "typing_metrics"
+    __table_args__ = (
+        # Serves WHERE attempt_id = ? ORDER BY recorded_at DESC LIMIT n (backward index scan)
+        Index("ix_typing_metrics_attempt_recorded", "attempt_id", "recorded_at"),
+    )
 
     id = Column(UUID(), primary_key=True, default=uuid.uuid4)
     attempt_id = Column(UUID(), ForeignKey("attempts.id"), nullable=False, index=True)
@@ -57,5 +74,5 @@ class TypingMetric(Base):
     paste_size = Column(Integer, nullable=True)
     idle_time = Column(Float, nullable=True)
     entropy_score = Column(Float, nullable=True)
-    burst_detected = Column(String(10), default="false")
+    burst_detected = Column(Boolean, default=False)
     recorded_at = Column(DateTime, default=datetime.utcnow)
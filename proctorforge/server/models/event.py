@@ -3,13 +3,22 @@ ProctorForge AI - Event, AI Intervention, and Audit Report Models
 """
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Float, DateTime, Text, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, DateTime, Text, ForeignKey, Index
 from models.portable_types import PortableUUID as UUID, PortableJSON as JSONB
 from database import Base
 
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        # Serves WHERE attempt_id = ? ORDER BY created_at without a sort
+        Index("ix_events_attempt_created", "attempt_id", "created_at"),
+        # event_data @> '{...}' containment lookups (PostgreSQL only; JSONB there)
+        Index(
+            "ix_events_data_gin", "event_data",
+            postgresql_using="gin", postgresql_ops={"event_data": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(UUID(), primary_key=True, default=uuid.uuid4)
     attempt_id = Column(UUID(), ForeignKey("attempts.id"), nullable=False, index=True)
@@ -17,6 +26,8 @@ class Event(Base):
     event_data = Column(JSONB(), nullable=True)
     confidence_score = Column(Float, nullable=True)
     hmac_signature = Column(Text, nullable=True)
+    # Identical events arriving within the monitoring suppression window are folded into this row
+    repeat_count = Column(Integer, nullable=False, default=1, server_default="1")
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
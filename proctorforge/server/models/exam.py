@@ -3,13 +3,19 @@ ProctorForge AI - Exam, Question, and Assignment Models
 """
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, Index
 from models.portable_types import PortableUUID as UUID, PortableJSON as JSONB
 from database import Base
 
 
 class Exam(Base):
     __tablename__ = "exams"
+    __table_args__ = (
+        # Teacher listing: WHERE created_by = ? ORDER BY created_at DESC
+        Index("ix_exams_created_by_created_at", "created_by", "created_at"),
+        # Student listing, class-match branch
+        Index("ix_exams_class_lookup", "assigned_class", "assigned_year", "assigned_section", "status"),
+    )
 
     id = Column(UUID(), primary_key=True, default=uuid.uuid4)
     title = Column(String(255), nullable=False)
@@ -30,9 +36,13 @@ class Exam(Base):
 
 class ExamAssignment(Base):
     __tablename__ = "exam_assignments"
+    __table_args__ = (
+        # One assignment per student per exam (ON CONFLICT target for bulk assigns)
+        Index("uq_exam_assignments_exam_student", "exam_id", "student_id", unique=True),
+    )
 
     id = Column(UUID(), primary_key=True, default=uuid.uuid4)
-    exam_id = Column(UUID(), ForeignKey("exams.id"), nullable=False, index=True)
+    exam_id = Column(UUID(), ForeignKey("exams.id", ondelete="CASCADE"), nullable=False, index=True)
     student_id = Column(UUID(), ForeignKey("users.id"), nullable=False, index=True)
     assigned_by = Column(UUID(), ForeignKey("users.id"), nullable=False)
     assigned_at = Column(DateTime, default=datetime.utcnow)
@@ -43,7 +53,7 @@ class Question(Base):
     __tablename__ = "questions"
 
     id = Column(UUID(), primary_key=True, default=uuid.uuid4)
-    exam_id = Column(UUID(), ForeignKey("exams.id"), nullable=False, index=True)
+    exam_id = Column(UUID(), ForeignKey("exams.id", ondelete="CASCADE"), nullable=False, index=True)
     type = Column(String(20), nullable=False, default="mcq")
     language = Column(String(20), nullable=True)
     question_text = Column(Text, nullable=False)
@@ -53,4 +63,6 @@ class Question(Base):
     points = Column(Integer, nullable=False, default=10)
     order_index = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Version stamp for per-process caches of this row (see routers/code_execution.py)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
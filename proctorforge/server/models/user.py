@@ -3,13 +3,17 @@ ProctorForge AI - User Model
 """
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Text
+from sqlalchemy import Column, String, DateTime, Text, Index
 from models.portable_types import PortableUUID as UUID
 from database import Base
 
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Class roster lookups for auto-assignment
+        Index("ix_users_class_lookup", "role", "class_name", "year", "section"),
+    )
 
     id = Column(UUID(), primary_key=True, default=uuid.uuid4)
     name = Column(String(255), nullable=False)
@@ -2,28 +2,74 @@
 ProctorForge AI - Attempts & Events Router
 Session management, event logging, and typing metrics.
 """
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import select, update, and_, false, func
 from sqlalchemy.ext.asyncio import AsyncSession
-from uuid import UUID
+from uuid import UUID, uuid4
 from typing import List
 from datetime import datetime
 
-from database import get_db
+import database
+from database import get_db, dialect_insert
 from models.user import User
-from models.exam import ExamAssignment
+from models.exam import Exam, ExamAssignment
 from models.attempt import Attempt, CodeSubmission, LiveCodeLog, TypingMetric
 from models.event import Event
 from schemas.exam import (
     AttemptCreate, AttemptResponse,
     EventCreate, EventResponse,
-    TypingMetricCreate, LiveCodeLogCreate,
+    TypingMetricCreate, LiveCodeLogCreate, LiveCodeLogResponse,
     CodeSubmitRequest,
 )
 from middleware.auth import get_current_user, require_teacher_or_admin
-from utils.hmac import verify_event
+from services.event_writer import event_writer
+from utils.hmac import verify_event, verify_payload
 
-router = APIRouter(prefix="/api/attempts", tags=["Attempts & Events"])
+router = APIRouter(prefix="/api/attempts", tags=["Attempts & Events"], default_response_class=ORJSONResponse)
+
+# Response validators, built once at import
+_attempt_adapter = TypeAdapter(AttemptResponse)
+_event_adapter = TypeAdapter(EventResponse)
+
+ACTIVE_ATTEMPT_INDEX = "uq_attempts_active_user_exam"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_CHUNK_ROWS = 500
+
+
+async def _stream_rows(stmt, ndjson: bool):
+    """Yield query rows as NDJSON lines or as one JSON array, one chunk at a time.
+
+    Runs on its own session: FastAPI closes the request session before the
+    response body is sent.
+    """
+    async with database.AsyncSessionLocal() as session:
+        result = await session.stream(stmt.execution_options(yield_per=STREAM_CHUNK_ROWS))
+        separator = b"\n" if ndjson else b","
+        first = True
+        if not ndjson:
+            yield b"["
+        async for rows in result.mappings().partitions():
+            chunk = separator.join(orjson.dumps(dict(row)) for row in rows)
+            if ndjson:
+                yield chunk + b"\n"
+            else:
+                yield chunk if first else b"," + chunk
+            first = False
+        if not ndjson:
+            yield b"]"
+
+
+def _rows_response(request: Request, stmt) -> StreamingResponse:
+    """Stream `stmt` as NDJSON when the client asks for it, otherwise as a JSON array."""
+    ndjson = NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+    return StreamingResponse(
+        _stream_rows(stmt, ndjson),
+        media_type=NDJSON_MEDIA_TYPE if ndjson else "application/json",
+    )
 
 
 # ===== ATTEMPTS =====
@@ -38,79 +84,111 @@ async def create_attempt(
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="Only students can start attempts")
 
-    # Check assignment (individual or class-based)
+    # Assignment, exam and class/year/section match in one round trip
+    if current_user.class_name and current_user.year and current_user.section:
+        class_match = and_(
+            Exam.assigned_class == current_user.class_name,
+            Exam.assigned_year == current_user.year,
+            Exam.assigned_section == current_user.section,
+        )
+    else:
+        class_match = false()
     result = await db.execute(
-        select(ExamAssignment).where(
-            ExamAssignment.exam_id == data.exam_id,
-            ExamAssignment.student_id == current_user.id,
+        select(Exam, ExamAssignment, class_match.label("class_match"))
+        .outerjoin(
+            ExamAssignment,
+            and_(
+                ExamAssignment.exam_id == Exam.id,
+                ExamAssignment.student_id == current_user.id,
+            ),
         )
+        .where(Exam.id == data.exam_id)
     )
-    assignment = result.scalar_one_or_none()
+    row = result.first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Exam not found")
+    exam_obj, assignment, matches_class = row
 
     if not assignment:
         # Auto-assign if student matches the exam's class/year/section
-        from models.exam import Exam as ExamModel
-        exam_result = await db.execute(select(ExamModel).where(ExamModel.id == data.exam_id))
-        exam_obj = exam_result.scalar_one_or_none()
-        if not exam_obj:
-            raise HTTPException(status_code=404, detail="Exam not found")
         if exam_obj.status not in ("active", "draft"):
             raise HTTPException(status_code=403, detail="Exam is not currently active")
-        if (
-            exam_obj.assigned_class
-            and exam_obj.assigned_year
-            and exam_obj.assigned_section
-            and current_user.class_name == exam_obj.assigned_class
-            and current_user.year == exam_obj.assigned_year
-            and current_user.section == exam_obj.assigned_section
-        ):
-            assignment = ExamAssignment(
-                exam_id=data.exam_id,
-                student_id=current_user.id,
-                assigned_by=exam_obj.created_by,
-            )
-            db.add(assignment)
-            await db.flush()
-        else:
+        if not matches_class:
             raise HTTPException(status_code=403, detail="Not assigned to this exam")
-
-    # Check for existing active attempt
-    result = await db.execute(
-        select(Attempt).where(
-            Attempt.user_id == current_user.id,
-            Attempt.exam_id == data.exam_id,
-            Attempt.status == "active",
+        assignment = ExamAssignment(
+            exam_id=data.exam_id,
+            student_id=current_user.id,
+            assigned_by=exam_obj.created_by,
+            status="started",
         )
-    )
-    existing = result.scalar_one_or_none()
-    if existing:
-        return AttemptResponse.model_validate(existing)
+        db.add(assignment)
 
     # Block re-takes: if a completed attempt exists, deny
     result = await db.execute(
-        select(Attempt).where(
+        select(Attempt.id).where(
             Attempt.user_id == current_user.id,
             Attempt.exam_id == data.exam_id,
             Attempt.status == "completed",
-        )
+        ).limit(1)
     )
-    completed_attempt = result.scalar_one_or_none()
-    if completed_attempt:
+    if result.first():
         raise HTTPException(
             status_code=403,
             detail="You have already completed this exam. Re-takes are not allowed.",
         )
 
-    attempt = Attempt(
-        user_id=current_user.id,
-        exam_id=data.exam_id,
-        device_fingerprint=data.device_fingerprint,
-        browser_info=data.browser_info,
+    values = {
+        "user_id": current_user.id,
+        "exam_id": data.exam_id,
+        "device_fingerprint": data.device_fingerprint,
+        "browser_info": data.browser_info,
+    }
+    if ACTIVE_ATTEMPT_INDEX in database.missing_indexes:
+        # No conflict target (duplicate active attempts kept the index from being built)
+        attempt = await _resume_or_insert_attempt(db, values)
+    else:
+        # Create the active attempt, or resume the existing one, in a single round trip.
+        # The partial unique index on (user_id, exam_id) WHERE status = 'active' also
+        # stops two tabs from racing each other into two active attempts. The no-op
+        # SET returns a resumed attempt unchanged (DO NOTHING would return no row).
+        stmt = dialect_insert(db)(Attempt).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Attempt.user_id, Attempt.exam_id],
+            index_where=Attempt.status == "active",
+            set_={"status": Attempt.status},
+        ).returning(Attempt)
+        result = await db.execute(stmt, execution_options={"populate_existing": True})
+        attempt = result.scalar_one()
+
+    # Resumes leave the assignment alone; first starts flip it with a plain UPDATE
+    if assignment.status != "started":
+        await db.execute(
+            update(ExamAssignment)
+            .where(ExamAssignment.id == assignment.id, ExamAssignment.status != "started")
+            .values(status="started"),
+            execution_options={"synchronize_session": False},
+        )
+    return _attempt_adapter.validate_python(attempt, from_attributes=True)
+
+
+async def _resume_or_insert_attempt(db: AsyncSession, values: dict) -> Attempt:
+    """Return the oldest active attempt for the user and exam, or insert one."""
+    result = await db.execute(
+        select(Attempt)
+        .where(
+            Attempt.user_id == values["user_id"],
+            Attempt.exam_id == values["exam_id"],
+            Attempt.status == "active",
+        )
+        .order_by(Attempt.start_time)
+        .limit(1)
     )
-    db.add(attempt)
-    assignment.status = "started"
-    await db.flush()
-    return AttemptResponse.model_validate(attempt)
+    attempt = result.scalars().first()
+    if attempt is None:
+        attempt = Attempt(**values)
+        db.add(attempt)
+        await db.flush()
+    return attempt
 
 
 @router.get("/{attempt_id}", response_model=AttemptResponse)
@@ -129,7 +207,7 @@ async def get_attempt(
     if current_user.role == "student" and attempt.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
 
-    return AttemptResponse.model_validate(attempt)
+    return _attempt_adapter.validate_python(attempt, from_attributes=True)
 
 
 @router.patch("/{attempt_id}/end")
@@ -139,17 +217,18 @@ async def end_attempt(
     current_user: User = Depends(get_current_user),
 ):
     """End an exam attempt and push real-time notification."""
-    result = await db.execute(select(Attempt).where(Attempt.id == attempt_id))
-    attempt = result.scalar_one_or_none()
+    # Single UPDATE ... RETURNING; students may only end their own attempt
+    stmt = update(Attempt).where(Attempt.id == attempt_id)
+    if current_user.role == "student":
+        stmt = stmt.where(Attempt.user_id == current_user.id)
+    stmt = stmt.values(status="completed", end_time=func.now()).returning(
+        Attempt.id, Attempt.exam_id, Attempt.user_id, Attempt.trust_score, Attempt.risk_level,
+    )
+    result = await db.execute(stmt, execution_options={"synchronize_session": False})
+    attempt = result.first()
     if not attempt:
         raise HTTPException(status_code=404, detail="Attempt not found")
 
-    if current_user.role == "student" and attempt.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Access denied")
-
-    attempt.status = "completed"
-    attempt.end_time = datetime.utcnow()
-
     # Push WebSocket notification to teacher feed and admin
     try:
         from routers.websocket import manager
@@ -171,42 +250,71 @@ async def end_attempt(
 
 # ===== EVENTS =====
 
-@router.post("/{attempt_id}/events", response_model=EventResponse, status_code=201)
+@router.post(
+    "/{attempt_id}/events",
+    response_model=EventResponse,
+    status_code=201,
+    # The body is read raw for signature checks, so document its schema explicitly
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": EventCreate.model_json_schema()}},
+    }},
+)
 async def log_event(
     attempt_id: UUID,
-    data: EventCreate,
-    db: AsyncSession = Depends(get_db),
+    request: Request,
     current_user: User = Depends(get_current_user),
 ):
-    """Log a proctoring event with optional HMAC verification."""
-    # Verify HMAC if provided
-    if data.hmac_signature and data.event_data:
+    """Log a proctoring event with optional HMAC verification.
+
+    Clients sign the raw JSON body and send it as X-Signature; that is checked
+    before the body is parsed. A legacy `hmac_signature` field over event_data
+    is still accepted.
+    """
+    body = await request.body()
+    signature = request.headers.get("X-Signature")
+    if signature is not None and not verify_payload(body, signature):
+        raise HTTPException(status_code=400, detail="Invalid event signature")
+    try:
+        data = EventCreate.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**err, "loc": ("body", *err["loc"])} for err in e.errors()], body=body
+        )
+
+    if signature is None and data.hmac_signature and data.event_data:
         if not verify_event(data.event_data, data.hmac_signature):
             raise HTTPException(status_code=400, detail="Invalid event signature")
 
-    event = Event(
-        attempt_id=attempt_id,
-        event_type=data.event_type,
-        event_data=data.event_data,
-        confidence_score=data.confidence_score,
-        hmac_signature=data.hmac_signature,
-    )
-    db.add(event)
-    await db.flush()
-    return EventResponse.model_validate(event)
+    # Batched with other in-flight events into one multi-row INSERT;
+    # returns once that batch is committed.
+    row = {
+        "id": uuid4(),
+        "attempt_id": attempt_id,
+        "event_type": data.event_type,
+        "event_data": data.event_data,
+        "confidence_score": data.confidence_score,
+        "hmac_signature": signature or data.hmac_signature,
+        "created_at": datetime.utcnow(),
+    }
+    await event_writer.write(Event, row)
+    return _event_adapter.validate_python(row, from_attributes=True)
 
 
 @router.get("/{attempt_id}/events", response_model=List[EventResponse])
 async def get_events(
     attempt_id: UUID,
-    db: AsyncSession = Depends(get_db),
+    request: Request,
     current_user: User = Depends(require_teacher_or_admin),
 ):
-    """Get all events for an attempt (teacher/admin only)."""
-    result = await db.execute(
-        select(Event).where(Event.attempt_id == attempt_id).order_by(Event.created_at)
+    """Get all events for an attempt (teacher/admin only). Streamed; NDJSON on request."""
+    return _rows_response(
+        request,
+        select(
+            Event.id, Event.attempt_id, Event.event_type,
+            Event.event_data, Event.confidence_score, Event.repeat_count, Event.created_at,
+        ).where(Event.attempt_id == attempt_id).order_by(Event.created_at),
     )
-    return [EventResponse.model_validate(e) for e in result.scalars().all()]
 
 
 # ===== TYPING METRICS =====
@@ -215,21 +323,20 @@ async def get_events(
 async def log_typing_metric(
     attempt_id: UUID,
     data: TypingMetricCreate,
-    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Log typing analytics."""
-    metric = TypingMetric(
-        attempt_id=attempt_id,
-        wpm=data.wpm,
-        backspace_ratio=data.backspace_ratio,
-        paste_size=data.paste_size,
-        idle_time=data.idle_time,
-        entropy_score=data.entropy_score,
-        burst_detected=data.burst_detected,
-    )
-    db.add(metric)
-    await db.flush()
+    """Log typing analytics (buffered; written in the next batch)."""
+    event_writer.enqueue(TypingMetric, {
+        "id": uuid4(),
+        "attempt_id": attempt_id,
+        "wpm": data.wpm,
+        "backspace_ratio": data.backspace_ratio,
+        "paste_size": data.paste_size,
+        "idle_time": data.idle_time,
+        "entropy_score": data.entropy_score,
+        "burst_detected": data.burst_detected,
+        "recorded_at": datetime.utcnow(),
+    })
     return {"message": "Typing metric logged"}
 
 
@@ -239,42 +346,34 @@ async def log_typing_metric(
 async def log_code_snapshot(
     attempt_id: UUID,
     data: LiveCodeLogCreate,
-    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Auto-save a code snapshot."""
-    log = LiveCodeLog(
-        attempt_id=attempt_id,
-        question_id=data.question_id,
-        code_snapshot=data.code_snapshot,
-        event_type=data.event_type,
-    )
-    db.add(log)
-    await db.flush()
+    """Auto-save a code snapshot (buffered; written in the next batch)."""
+    event_writer.enqueue(LiveCodeLog, {
+        "id": uuid4(),
+        "attempt_id": attempt_id,
+        "question_id": data.question_id,
+        "code_snapshot": data.code_snapshot,
+        "event_type": data.event_type,
+        "timestamp": datetime.utcnow(),
+    })
     return {"message": "Code snapshot saved"}
 
 
-@router.get("/{attempt_id}/code-logs")
+@router.get("/{attempt_id}/code-logs", response_model=List[LiveCodeLogResponse])
 async def get_code_logs(
     attempt_id: UUID,
-    db: AsyncSession = Depends(get_db),
+    request: Request,
     current_user: User = Depends(require_teacher_or_admin),
 ):
-    """Get code evolution logs (teacher/admin only)."""
-    result = await db.execute(
-        select(LiveCodeLog).where(LiveCodeLog.attempt_id == attempt_id).order_by(LiveCodeLog.timestamp)
+    """Get code evolution logs (teacher/admin only). Streamed; NDJSON on request."""
+    return _rows_response(
+        request,
+        select(
+            LiveCodeLog.id, LiveCodeLog.code_snapshot, LiveCodeLog.event_type,
+            LiveCodeLog.timestamp, LiveCodeLog.question_id,
+        ).where(LiveCodeLog.attempt_id == attempt_id).order_by(LiveCodeLog.timestamp),
     )
-    logs = result.scalars().all()
-    return [
-        {
-            "id": str(l.id),
-            "code_snapshot": l.code_snapshot,
-            "event_type": l.event_type,
-            "timestamp": l.timestamp.isoformat(),
-            "question_id": str(l.question_id) if l.question_id else None,
-        }
-        for l in logs
-    ]
 
 
 # ===== CODE SUBMISSIONS =====
@@ -288,13 +387,13 @@ async def submit_code(
 ):
     """Submit code for evaluation (stores submission, execution is separate)."""
     submission = CodeSubmission(
+        id=uuid4(),  # known up front, so no flush is needed before returning it
         attempt_id=attempt_id,
         question_id=data.question_id,
         language=data.language,
         code=data.code,
     )
     db.add(submission)
-    await db.flush()
     return {"message": "Code submitted", "submission_id": str(submission.id)}
 
 
@@ -3,19 +3,27 @@ ProctorForge AI - Auth Router
 Registration, login, and user management endpoints.
 """
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
+from typing import List
 
 from database import get_db
 from models.user import User
 from schemas.auth import UserRegister, UserLogin, UserResponse, TokenResponse
 from middleware.auth import (
     hash_password, verify_password, create_access_token,
-    get_current_user, require_admin
+    get_current_user, require_admin,
+    DUMMY_PASSWORD_HASH,
 )
 
-router = APIRouter(prefix="/api/auth", tags=["Authentication"])
+router = APIRouter(prefix="/api/auth", tags=["Authentication"], default_response_class=ORJSONResponse)
+
+# Response validators, built once at import
+_user_adapter = TypeAdapter(UserResponse)
+_users_adapter = TypeAdapter(List[UserResponse])
 
 
 @router.post("/register", status_code=201)
@@ -80,7 +88,11 @@ async def login(data: UserLogin, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == data.email))
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(data.password, user.password_hash):
+    if not user:
+        # Burn the same bcrypt cost as a wrong password so timing doesn't reveal unknown emails
+        verify_password(data.password, DUMMY_PASSWORD_HASH)
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    if not verify_password(data.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
     if user.status == "suspended":
@@ -89,14 +101,14 @@ async def login(data: UserLogin, db: AsyncSession = Depends(get_db)):
     token = create_access_token({"sub": str(user.id), "role": user.role})
     return TokenResponse(
         access_token=token,
-        user=UserResponse.model_validate(user),
+        user=_user_adapter.validate_python(user, from_attributes=True),
     )
 
 
 @router.get("/me", response_model=UserResponse)
 async def get_me(current_user: User = Depends(get_current_user)):
     """Get current authenticated user."""
-    return UserResponse.model_validate(current_user)
+    return _user_adapter.validate_python(current_user, from_attributes=True)
 
 
 @router.get("/users", response_model=list[UserResponse])
@@ -108,12 +120,11 @@ async def list_users(
     """List users. Admins and teachers see all. Optionally filter by role."""
     if current_user.role not in ("admin", "teacher"):
         raise HTTPException(status_code=403, detail="Not authorized")
-    query = select(User)
+    query = select(*(getattr(User, name) for name in UserResponse.model_fields))
     if role:
         query = query.where(User.role == role)
     result = await db.execute(query.order_by(User.created_at.desc()))
-    users = result.scalars().all()
-    return [UserResponse.model_validate(u) for u in users]
+    return _users_adapter.validate_python(result.mappings().all())
 
 
 @router.patch("/users/{user_id}/status")
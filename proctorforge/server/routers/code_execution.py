@@ -3,69 +3,114 @@ ProctorForge AI - Code Execution Router
 Secure code execution with automatic test case validation.
 """
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from uuid import UUID
-from datetime import datetime
+from uuid import UUID, uuid4
+from typing import Optional, Tuple
 
 from database import get_db
 from models.attempt import Attempt, CodeSubmission
 from models.exam import Question
 from models.user import User
+from schemas.exam import RunCodeRequest, SubmitCodeRequest
 from middleware.auth import get_current_user
 from services.sandbox import execute_code, run_test_cases
+from utils.ttl_cache import TTLCache
 
-router = APIRouter(prefix="/api/code", tags=["Code Execution"])
+router = APIRouter(prefix="/api/code", tags=["Code Execution"], default_response_class=ORJSONResponse)
+
+# question_id -> (updated_at, test cases); the same few questions are graded over and
+# over during an exam. Entries are checked against the row's updated_at on every use,
+# so an edit made through another worker is picked up immediately.
+_test_case_cache = TTLCache(maxsize=4096, ttl=300)
+
+
+def _submission_context_stmt(attempt_id: UUID, question_id: UUID, user_id: UUID, *columns):
+    return (
+        select(Attempt.id, Question.id.label("question_id"), Question.updated_at, *columns)
+        .select_from(Attempt)
+        .outerjoin(Question, Question.id == question_id)
+        .where(Attempt.id == attempt_id, Attempt.user_id == user_id)
+    )
+
+
+async def load_submission_context(db: AsyncSession, attempt_id: UUID, question_id: UUID,
+                                  user_id: UUID) -> Tuple[bool, Optional[list]]:
+    """Check attempt ownership and load test cases in one round trip.
+
+    Returns (attempt_found, test_cases); test_cases is None if the question doesn't
+    exist and [] if it has no test cases. Test cases are served from cache when warm.
+    """
+    cached = _test_case_cache.get(question_id)
+    if cached is not None:
+        result = await db.execute(_submission_context_stmt(attempt_id, question_id, user_id))
+        row = result.first()
+        if row is None:
+            return False, None
+        if row.question_id is None:
+            _test_case_cache.pop(question_id)
+            return True, None
+        version, test_cases = cached
+        if row.updated_at == version:
+            return True, test_cases
+
+    result = await db.execute(
+        _submission_context_stmt(attempt_id, question_id, user_id, Question.test_cases)
+    )
+    row = result.first()
+    if row is None:
+        return False, None
+    if row.question_id is None:
+        return True, None
+    test_cases = row.test_cases or []
+    _test_case_cache.set(question_id, (row.updated_at, test_cases))
+    return True, test_cases
+
+
+def invalidate_test_cases(question_id: UUID) -> None:
+    """Drop cached test cases after a question is changed or deleted."""
+    _test_case_cache.pop(question_id)
 
 
 @router.post("/run")
 async def run_code(
-    data: dict,
+    data: RunCodeRequest,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     """Execute code in the sandbox and return output."""
-    code = data.get("code", "")
-    language = data.get("language", "python")
-    stdin_data = data.get("stdin", "")
-
-    if not code.strip():
+    if not data.code.strip():
         raise HTTPException(status_code=400, detail="No code provided")
 
-    result = await execute_code(code, language, stdin_data=stdin_data, timeout=15)
+    result = await execute_code(data.code, data.language, stdin_data=data.stdin, timeout=15)
     return result.to_dict()
 
 
 @router.post("/submit/{attempt_id}/{question_id}")
 async def submit_code(
-    attempt_id: str,
-    question_id: str,
-    data: dict,
+    attempt_id: UUID,
+    question_id: UUID,
+    data: SubmitCodeRequest,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     """Submit code for grading against hidden test cases."""
-    code = data.get("code", "")
-    language = data.get("language", "python")
+    code = data.code
+    language = data.language
 
     if not code.strip():
         raise HTTPException(status_code=400, detail="No code provided")
 
-    # Verify attempt belongs to user
-    result = await db.execute(
-        select(Attempt).where(Attempt.id == UUID(attempt_id), Attempt.user_id == current_user.id)
+    # Verify attempt belongs to user and fetch the question's test cases
+    attempt_found, test_cases = await load_submission_context(
+        db, attempt_id, question_id, current_user.id
     )
-    attempt = result.scalar_one_or_none()
-    if not attempt:
+    if not attempt_found:
         raise HTTPException(status_code=404, detail="Attempt not found")
-
-    # Get question and test cases
-    result = await db.execute(select(Question).where(Question.id == UUID(question_id)))
-    question = result.scalar_one_or_none()
-    if not question:
+    if test_cases is None:
         raise HTTPException(status_code=404, detail="Question not found")
 
-    test_cases = question.test_cases or []
     test_results = {}
 
     if test_cases:
@@ -81,14 +126,16 @@ async def submit_code(
         }
 
     # Save submission
+    # submitted_at is set by the database (server_default NOW()); the id is
+    # assigned here so it can be returned without flushing first
     submission = CodeSubmission(
-        attempt_id=UUID(attempt_id),
-        question_id=UUID(question_id),
+        id=uuid4(),
+        attempt_id=attempt_id,
+        question_id=question_id,
         language=language,
         code=code,
         test_results=test_results,
         score=test_results.get("score", 0),
-        submitted_at=datetime.utcnow(),
     )
     db.add(submission)
 
@@ -2,23 +2,150 @@
 ProctorForge AI - Exam Router
 CRUD for exams, questions, and assignments. Teacher-controlled only.
 """
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select, insert, delete, union, exists, lambda_stmt, bindparam, func
+from sqlalchemy.orm import aliased
 from sqlalchemy.ext.asyncio import AsyncSession
-from uuid import UUID
-from typing import List
+from uuid import UUID, uuid4
+from datetime import datetime
+from typing import List, Optional
 
-from database import get_db
+import database
+from database import get_db, dialect_insert
 from models.user import User
 from models.exam import Exam, ExamAssignment, Question
 from schemas.exam import (
     ExamCreate, ExamUpdate, ExamResponse,
     QuestionCreate, QuestionUpdate, QuestionResponse, QuestionStudentView,
-    AssignExam, AssignmentResponse,
+    AssignExam, AssignmentResponse, MAX_ASSIGN_BATCH,
 )
 from middleware.auth import get_current_user, require_teacher, require_teacher_or_admin
+from routers.code_execution import invalidate_test_cases
+from services.cache import cache_get, cache_set
+
+router = APIRouter(prefix="/api/exams", tags=["Exams"], default_response_class=ORJSONResponse)
+
+# Response validators, built once at import
+_exam_adapter = TypeAdapter(ExamResponse)
+_question_adapter = TypeAdapter(QuestionResponse)
+_exams_adapter = TypeAdapter(List[ExamResponse])
+_student_questions_adapter = TypeAdapter(List[QuestionStudentView])
+_questions_adapter = TypeAdapter(List[QuestionResponse])
+_assignments_adapter = TypeAdapter(List[AssignmentResponse])
+
+# Question columns exposed by QuestionStudentView
+_STUDENT_QUESTION_COLUMNS = tuple(
+    getattr(Question, name) for name in QuestionStudentView.model_fields
+)
+
+# list_exams page size (default / hard cap)
+EXAM_PAGE_DEFAULT = 100
+EXAM_PAGE_MAX = 500
+
+# Question lists are cached per (exam, role) under a key versioned by the exam's
+# question count and latest updated_at: every add/edit/delete moves readers to a new
+# key, even when the writer couldn't reach Redis, and superseded keys just expire.
+QUESTIONS_CACHE_TTL = 300
+
+
+async def _questions_cache_key(db: AsyncSession, exam_id: UUID, role: str) -> str:
+    count, last_update = (await db.execute(
+        select(func.count(), func.max(Question.updated_at)).where(Question.exam_id == exam_id)
+    )).one()
+    version = f"{count}:{last_update.timestamp() if last_update else 0}"
+    return f"exam:{exam_id}:questions:{role}:{version}"
+
+
+# ===== EXAM LISTING STATEMENTS =====
+# lambda_stmt caches each statement's compiled SQL keyed on the lambda's code, so
+# repeat calls only re-extract the closed-over values as bound parameters.
+
+def _teacher_exams_stmt(teacher_id: UUID):
+    return lambda_stmt(lambda: select(Exam).where(Exam.created_by == teacher_id))
+
+
+def _all_exams_stmt():
+    return lambda_stmt(lambda: select(Exam))
+
+
+def _assigned_exams_stmt(student_id: UUID):
+    return lambda_stmt(
+        lambda: select(Exam)
+        .join(ExamAssignment, ExamAssignment.exam_id == Exam.id)
+        .where(ExamAssignment.student_id == student_id, Exam.status == "active")
+    )
+
+
+def _build_student_exams_alias():
+    # UNION lets each branch use its own index instead of an OR over a subquery, and
+    # drops exams that are both individually assigned and class-matched.
+    # lambda_stmt can't track closure values through the aliased union, so this one
+    # is built once with named bind parameters instead.
+    assigned_q = (
+        select(Exam)
+        .join(ExamAssignment, ExamAssignment.exam_id == Exam.id)
+        .where(ExamAssignment.student_id == bindparam("student_id"), Exam.status == "active")
+    )
+    class_q = select(Exam).where(
+        Exam.assigned_class == bindparam("class_name"),
+        Exam.assigned_year == bindparam("year"),
+        Exam.assigned_section == bindparam("section"),
+        Exam.status == "active",
+    )
+    return aliased(Exam, union(assigned_q, class_q).subquery())
+
+
+_StudentExam = _build_student_exams_alias()
+_STUDENT_EXAMS = select(_StudentExam)
+
+
+def _student_exams_stmt():
+    return lambda_stmt(lambda: _STUDENT_EXAMS)
 
-router = APIRouter(prefix="/api/exams", tags=["Exams"])
+
+def _paginate(stmt, entity, before: Optional[datetime], skip: int, limit: int):
+    """Newest-first page of an exam listing; `before` is a keyset cursor on created_at."""
+    if before is not None:
+        stmt += lambda s: s.where(entity.created_at < before)
+    stmt += lambda s: s.order_by(entity.created_at.desc()).offset(skip).limit(limit)
+    return stmt
+
+
+async def _insert_assignments(db: AsyncSession, rows: list, returning: bool = False):
+    """Bulk-insert assignment rows, skipping students already assigned to the exam."""
+    stmt = dialect_insert(db)(ExamAssignment).on_conflict_do_nothing(
+        index_elements=[ExamAssignment.exam_id, ExamAssignment.student_id],
+    )
+    if returning:
+        stmt = stmt.returning(ExamAssignment)
+    return await db.execute(stmt, rows)
+
+
+async def _auto_assign_class(exam_id: UUID, class_name: str, year: str, section: str, assigned_by: UUID):
+    """Assign every student in the class to the exam. Runs as a background task after the
+    response is sent; class-matched students can already open the exam before it finishes."""
+    try:
+        async with database.AsyncSessionLocal() as session:
+            student_ids = (await session.execute(
+                select(User.id).where(
+                    User.role == "student",
+                    User.class_name == class_name,
+                    User.year == year,
+                    User.section == section,
+                )
+            )).scalars().all()
+            # One executemany INSERT instead of one INSERT per student
+            rows = [
+                {"exam_id": exam_id, "student_id": student_id, "assigned_by": assigned_by}
+                for student_id in student_ids
+            ]
+            if rows:
+                await _insert_assignments(session, rows)
+                await session.commit()
+    except Exception as e:
+        print(f"[AUTO-ASSIGN ERROR] exam {exam_id}: {type(e).__name__}: {str(e)[:200]}")
 
 
 # ===== EXAM CRUD =====
@@ -26,11 +153,13 @@ router = APIRouter(prefix="/api/exams", tags=["Exams"])
 @router.post("/", response_model=ExamResponse, status_code=201)
 async def create_exam(
     data: ExamCreate,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_teacher),
 ):
     """Create a new exam (teacher only). Auto-assigns students if class info provided."""
     exam = Exam(
+        id=uuid4(),  # known up front so question/assignment rows can reference it without a flush
         title=data.title,
         description=data.description,
         created_by=current_user.id,
@@ -45,109 +174,64 @@ async def create_exam(
         assigned_section=data.assigned_section,
     )
     db.add(exam)
-    await db.flush()
-
-    # Process inline questions if provided in the payload
-    if data.questions:
-        for idx, q_data in enumerate(data.questions):
-            q_type = q_data.get("type") or q_data.get("question_type") or exam.type or "mcq"
-            q_text = q_data.get("question_text") or q_data.get("text") or ""
-            if not q_text:
-                continue
-            options = q_data.get("options") or []
-            correct_answer = None
-            if q_type == "mcq" and options:
-                if isinstance(options[0], dict):
-                    # [{text, is_correct}, ...]
-                    correct_opts = [o.get("text", "") for o in options if o.get("is_correct")]
-                    correct_answer = correct_opts[0] if correct_opts else None
-                elif isinstance(options[0], str):
-                    ci = q_data.get("correct_option")
-                    correct_answer = options[ci] if ci is not None and ci < len(options) else None
-            # For coding questions, test_cases come via options list or metadata
-            test_cases = q_data.get("test_cases") or q_data.get("metadata")
-            db.add(Question(
-                exam_id=exam.id,
-                type=q_type,
-                language=q_data.get("language"),
-                question_text=q_text,
-                options=options if options else None,
-                correct_answer=correct_answer,
-                test_cases=test_cases,
-                points=q_data.get("marks") or q_data.get("points") or 10,
-                order_index=idx,
-            ))
 
-    # Auto-assign all students matching the class/year/section
-    if data.assigned_class and data.assigned_year and data.assigned_section:
-        student_query = select(User).where(
-            User.role == "student",
-            User.class_name == data.assigned_class,
-            User.year == data.assigned_year,
-            User.section == data.assigned_section,
-        )
-        student_result = await db.execute(student_query)
-        matching_students = student_result.scalars().all()
-        for student in matching_students:
-            assignment = ExamAssignment(
-                exam_id=exam.id,
-                student_id=student.id,
-                assigned_by=current_user.id,
-            )
-            db.add(assignment)
+    # Inline questions arrive pre-normalized by ExamCreate (inserted as one batch)
+    question_rows = [
+        {**q.model_dump(), "exam_id": exam.id, "order_index": idx}
+        for idx, q in enumerate(data.questions or [])
+    ]
+    if question_rows:
+        await db.execute(insert(Question), question_rows)
 
     await db.commit()
     await db.refresh(exam)
-    return ExamResponse.model_validate(exam)
+
+    # Auto-assign all students matching the class/year/section, off the request path
+    if data.assigned_class and data.assigned_year and data.assigned_section:
+        background_tasks.add_task(
+            _auto_assign_class, exam.id,
+            data.assigned_class, data.assigned_year, data.assigned_section, current_user.id,
+        )
+
+    return _exam_adapter.validate_python(exam, from_attributes=True)
 
 
 @router.get("/", response_model=List[ExamResponse])
 async def list_exams(
+    before: Optional[datetime] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(EXAM_PAGE_DEFAULT, ge=1, le=EXAM_PAGE_MAX),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """List exams. Teachers see their own exams. Students see assigned exams (individual + class)."""
+    """List exams, newest first and paginated (pass the last exam's created_at as `before`
+    for the next page). Teachers see their own exams. Students see assigned exams (individual + class)."""
     if current_user.role == "teacher":
-        result = await db.execute(
-            select(Exam).where(Exam.created_by == current_user.id).order_by(Exam.created_at.desc())
-        )
-        return [ExamResponse.model_validate(e) for e in result.scalars().all()]
+        stmt = _paginate(_teacher_exams_stmt(current_user.id), Exam, before, skip, limit)
+        result = await db.execute(stmt)
+        exams = result.scalars().all()
     elif current_user.role == "student":
-        from sqlalchemy import or_, and_
-        # Individually assigned exams
-        individual_q = (
-            select(Exam)
-            .join(ExamAssignment, ExamAssignment.exam_id == Exam.id)
-            .where(ExamAssignment.student_id == current_user.id)
-        )
-        # Class-based assigned exams (student's class matches exam class assignment)
-        class_conditions = []
+        # Individually assigned exams, plus class-based ones when the student has a class
         if current_user.class_name and current_user.year and current_user.section:
-            class_conditions = [
-                and_(
-                    Exam.assigned_class == current_user.class_name,
-                    Exam.assigned_year == current_user.year,
-                    Exam.assigned_section == current_user.section,
-                )
-            ]
-
-        if class_conditions:
-            combined_q = select(Exam).where(
-                or_(
-                    Exam.id.in_(select(individual_q.subquery().c.id)),
-                    *class_conditions,
-                ),
-                Exam.status == "active",
-            ).order_by(Exam.created_at.desc())
+            stmt = _paginate(_student_exams_stmt(), _StudentExam, before, skip, limit)
+            result = await db.execute(stmt, {
+                "student_id": current_user.id,
+                "class_name": current_user.class_name,
+                "year": current_user.year,
+                "section": current_user.section,
+            })
         else:
-            combined_q = individual_q.where(Exam.status == "active").order_by(Exam.created_at.desc())
-
-        result = await db.execute(combined_q)
-        exams = list({e.id: e for e in result.scalars().all()}.values())
-        return [ExamResponse.model_validate(e) for e in exams]
+            stmt = _paginate(_assigned_exams_stmt(current_user.id), Exam, before, skip, limit)
+            result = await db.execute(stmt)
+        exams = result.scalars().all()
     else:  # admin
-        result = await db.execute(select(Exam).order_by(Exam.created_at.desc()))
-        return [ExamResponse.model_validate(e) for e in result.scalars().all()]
+        result = await db.execute(_paginate(_all_exams_stmt(), Exam, before, skip, limit))
+        exams = result.scalars().all()
+
+    # Validate the whole list in one pass and serialize it straight to JSON bytes,
+    # skipping FastAPI's second response_model validation/encoding pass.
+    exams = _exams_adapter.validate_python(exams, from_attributes=True)
+    return Response(_exams_adapter.dump_json(exams), media_type="application/json")
 
 
 @router.get("/{exam_id}", response_model=ExamResponse)
@@ -164,16 +248,7 @@ async def get_exam(
 
     # Students can view exams they are individually assigned to OR class-matched
     if current_user.role == "student":
-        # Check individual assignment
-        assignment = await db.execute(
-            select(ExamAssignment).where(
-                ExamAssignment.exam_id == exam_id,
-                ExamAssignment.student_id == current_user.id,
-            )
-        )
-        has_assignment = assignment.scalar_one_or_none() is not None
-
-        # Check class-based match
+        # Check class-based match (no query: the exam row is already loaded)
         class_match = (
             exam.assigned_class
             and exam.assigned_year
@@ -183,16 +258,25 @@ async def get_exam(
             and current_user.section == exam.assigned_section
         )
 
-        if not has_assignment and not class_match:
+        # Only look for an individual assignment when the class doesn't match
+        has_access = class_match or await db.scalar(
+            select(exists().where(
+                ExamAssignment.exam_id == exam_id,
+                ExamAssignment.student_id == current_user.id,
+            ))
+        )
+
+        if not has_access:
             raise HTTPException(status_code=403, detail="Not assigned to this exam")
 
-    return ExamResponse.model_validate(exam)
+    return _exam_adapter.validate_python(exam, from_attributes=True)
 
 
 @router.patch("/{exam_id}", response_model=ExamResponse)
 async def update_exam(
     exam_id: UUID,
     data: ExamUpdate,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_teacher),
 ):
@@ -205,34 +289,17 @@ async def update_exam(
     for field, value in data.model_dump(exclude_unset=True).items():
         setattr(exam, field, value)
 
-    # If class assignment changed, re-assign matching students
+    await db.commit()
+    await db.refresh(exam)
+
+    # If class assignment changed, re-assign matching students in the background
     if data.assigned_class and data.assigned_year and data.assigned_section:
-        student_query = select(User).where(
-            User.role == "student",
-            User.class_name == data.assigned_class,
-            User.year == data.assigned_year,
-            User.section == data.assigned_section,
+        background_tasks.add_task(
+            _auto_assign_class, exam_id,
+            data.assigned_class, data.assigned_year, data.assigned_section, current_user.id,
         )
-        student_result = await db.execute(student_query)
-        matching_students = student_result.scalars().all()
-        for student in matching_students:
-            existing = await db.execute(
-                select(ExamAssignment).where(
-                    ExamAssignment.exam_id == exam_id,
-                    ExamAssignment.student_id == student.id,
-                )
-            )
-            if not existing.scalar_one_or_none():
-                assignment = ExamAssignment(
-                    exam_id=exam_id,
-                    student_id=student.id,
-                    assigned_by=current_user.id,
-                )
-                db.add(assignment)
 
-    await db.commit()
-    await db.refresh(exam)
-    return ExamResponse.model_validate(exam)
+    return _exam_adapter.validate_python(exam, from_attributes=True)
 
 
 @router.delete("/{exam_id}")
@@ -241,12 +308,26 @@ async def delete_exam(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_teacher),
 ):
-    """Delete an exam (teacher only)."""
-    result = await db.execute(select(Exam).where(Exam.id == exam_id, Exam.created_by == current_user.id))
-    exam = result.scalar_one_or_none()
-    if not exam:
+    """Delete an exam and its questions and assignments (teacher only).
+
+    On PostgreSQL the children go via ON DELETE CASCADE. The local SQLite database
+    doesn't enforce foreign keys (and older tables lack the CASCADE), so they are
+    deleted explicitly there, in the same transaction.
+    """
+    result = await db.execute(
+        delete(Exam)
+        .where(Exam.id == exam_id, Exam.created_by == current_user.id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Exam not found")
-    await db.delete(exam)
+    if db.get_bind().dialect.name != "postgresql":
+        for child in (Question, ExamAssignment):
+            await db.execute(
+                delete(child).where(child.exam_id == exam_id)
+                .execution_options(synchronize_session=False)
+            )
+    await db.commit()
     return {"message": "Exam deleted"}
 
 
@@ -277,8 +358,8 @@ async def create_question(
         order_index=data.order_index,
     )
     db.add(question)
-    await db.flush()
-    return QuestionResponse.model_validate(question)
+    await db.commit()
+    return _question_adapter.validate_python(question, from_attributes=True)
 
 
 @router.get("/{exam_id}/questions")
@@ -288,14 +369,29 @@ async def get_questions(
     current_user: User = Depends(get_current_user),
 ):
     """Get questions for an exam. Students don't see correct answers or test cases."""
-    result = await db.execute(
-        select(Question).where(Question.exam_id == exam_id).order_by(Question.order_index)
-    )
-    questions = result.scalars().all()
+    cache_key = await _questions_cache_key(db, exam_id, current_user.role)
+    body = await cache_get(cache_key)
+    if body is None:
+        if current_user.role == "student":
+            # Only the columns students may see; correct_answer/test_cases are never read
+            result = await db.execute(
+                select(*_STUDENT_QUESTION_COLUMNS)
+                .where(Question.exam_id == exam_id)
+                .order_by(Question.order_index)
+            )
+            adapter = _student_questions_adapter
+            questions = adapter.validate_python(result.mappings().all())
+        else:
+            result = await db.execute(
+                select(Question).where(Question.exam_id == exam_id).order_by(Question.order_index)
+            )
+            adapter = _questions_adapter
+            questions = adapter.validate_python(result.scalars().all(), from_attributes=True)
+        body = adapter.dump_json(questions)
+        await cache_set(cache_key, body, ttl=QUESTIONS_CACHE_TTL)
 
-    if current_user.role == "student":
-        return [QuestionStudentView.model_validate(q) for q in questions]
-    return [QuestionResponse.model_validate(q) for q in questions]
+    # Cached and fresh bodies are already JSON bytes; send them without re-encoding
+    return Response(body, media_type="application/json")
 
 
 @router.patch("/{exam_id}/questions/{question_id}", response_model=QuestionResponse)
@@ -316,8 +412,9 @@ async def update_question(
 
     for field, value in data.model_dump(exclude_unset=True).items():
         setattr(question, field, value)
-    await db.flush()
-    return QuestionResponse.model_validate(question)
+    await db.commit()
+    invalidate_test_cases(question_id)
+    return _question_adapter.validate_python(question, from_attributes=True)
 
 
 @router.delete("/{exam_id}/questions/{question_id}")
@@ -329,12 +426,14 @@ async def delete_question(
 ):
     """Delete a question (teacher only)."""
     result = await db.execute(
-        select(Question).where(Question.id == question_id, Question.exam_id == exam_id)
+        delete(Question)
+        .where(Question.id == question_id, Question.exam_id == exam_id)
+        .execution_options(synchronize_session=False)
     )
-    question = result.scalar_one_or_none()
-    if not question:
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Question not found")
-    await db.delete(question)
+    await db.commit()
+    invalidate_test_cases(question_id)
     return {"message": "Question deleted"}
 
 
@@ -353,38 +452,39 @@ async def assign_exam(
     if not result.scalar_one_or_none():
         raise HTTPException(status_code=404, detail="Exam not found")
 
-    assignments = []
-    for student_id in data.student_ids:
-        # Check if already assigned
-        existing = await db.execute(
-            select(ExamAssignment).where(
-                ExamAssignment.exam_id == exam_id,
-                ExamAssignment.student_id == student_id,
-            )
-        )
-        if existing.scalar_one_or_none():
-            continue
+    if not data.student_ids:
+        return []
 
-        assignment = ExamAssignment(
-            exam_id=exam_id,
-            student_id=student_id,
-            assigned_by=current_user.id,
-        )
-        db.add(assignment)
-        assignments.append(assignment)
+    # Keep only ids that belong to existing students (one IN query, duplicates collapse);
+    # already-assigned students are then skipped by the unique index
+    student_ids = (await db.execute(
+        select(User.id).where(User.role == "student", User.id.in_(set(data.student_ids)))
+    )).scalars().all()
+    rows = [
+        {"exam_id": exam_id, "student_id": student_id, "assigned_by": current_user.id}
+        for student_id in student_ids
+    ]
+    if not rows:
+        return []
 
-    await db.flush()
-    return [AssignmentResponse.model_validate(a) for a in assignments]
+    result = await _insert_assignments(db, rows, returning=True)
+    return _assignments_adapter.validate_python(result.scalars().all(), from_attributes=True)
 
 
 @router.get("/{exam_id}/assignments", response_model=List[AssignmentResponse])
 async def get_assignments(
     exam_id: UUID,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(MAX_ASSIGN_BATCH, ge=1, le=MAX_ASSIGN_BATCH),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_teacher_or_admin),
 ):
-    """List assignments for an exam (teacher/admin)."""
+    """List assignments for an exam (teacher/admin), in assignment order."""
     result = await db.execute(
-        select(ExamAssignment).where(ExamAssignment.exam_id == exam_id)
+        select(ExamAssignment)
+        .where(ExamAssignment.exam_id == exam_id)
+        .order_by(ExamAssignment.assigned_at, ExamAssignment.id)
+        .offset(skip)
+        .limit(limit)
     )
-    return [AssignmentResponse.model_validate(a) for a in result.scalars().all()]
+    return _assignments_adapter.validate_python(result.scalars().all(), from_attributes=True)
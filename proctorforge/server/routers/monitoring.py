@@ -3,24 +3,33 @@ ProctorForge AI - Monitoring & Heartbeat Router
 Zero-trust session monitoring: heartbeat, camera signals, audio events,
 session initialization validation, and real-time trust score updates.
 """
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy import select, func
+import asyncio
+import re
+import time
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select, func, case
 from sqlalchemy.ext.asyncio import AsyncSession
-from uuid import UUID
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from uuid import UUID, uuid4
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 from pydantic import BaseModel
 
+import database
 from database import get_db
 from models.user import User
 from models.attempt import Attempt, TypingMetric
 from models.event import Event, AIIntervention
-from middleware.auth import get_current_user, require_teacher_or_admin
+from middleware.auth import get_current_user, require_teacher_or_admin, decode_access_token
 from services.trust_score import compute_trust_score, apply_violation_penalty, get_violation_penalty
-from services.ai_twin import analyze_session
+from services.event_writer import event_writer
+from services.penalty_writer import penalty_writer, penalty_update
+from services.live_feed import live_feed
+from services import session_store, task_queue
 from utils.hmac import sign_event
 
-router = APIRouter(prefix="/api/monitoring", tags=["Monitoring"])
+router = APIRouter(prefix="/api/monitoring", tags=["Monitoring"], default_response_class=ORJSONResponse)
 
 # Import WS manager for real-time score pushes (lazy)
 _ws_manager = None
@@ -32,21 +41,104 @@ def _get_ws_manager():
     return _ws_manager
 
 async def _push_trust_update(attempt_id: str, exam_id: str, trust_score: float, risk_level: str, user_id: str):
-    """Push trust score update to the student via WebSocket and to teacher feed."""
+    """Push trust score update to the student via WebSocket, to teacher feed and to
+    live-session streams (on every worker)."""
     mgr = _get_ws_manager()
     payload = {"type": "trust_update", "trust_score": trust_score, "risk_level": risk_level}
     await mgr.send_to_channel(f"exam:{attempt_id}", payload)
     await mgr.send_to_channel(f"teacher_feed:{exam_id}", {
         **payload, "student_id": user_id,
     })
+    await live_feed.publish(exam_id, {
+        "attempt_id": attempt_id, "trust_score": trust_score, "risk_level": risk_level,
+    })
 
-# ── In-memory heartbeat tracking ──────────────────────────────────────────
-_heartbeats: Dict[str, datetime] = {}
-_session_states: Dict[str, Dict[str, Any]] = {}
-
+# ── Heartbeat tracking (state lives in services/session_store.py) ─────────
 HEARTBEAT_INTERVAL = 3  # seconds
 HEARTBEAT_TOLERANCE = 10  # pause after 10s of missing heartbeats
 
+# ── Event risk tables: event_type -> (penalty, risk level) ────────────────
+CAMERA_RISK = {
+    "face_missing": (8, "high"),
+    "multi_face": (12, "critical"),
+    "gaze_deviation": (3, "medium"),
+    "head_pose": (2, "low"),
+    "face_detected": (0, "none"),
+}
+
+AUDIO_RISK = {
+    "multiple_voices": (10, "critical"),
+    "voice_detected": (0, "none"),
+    "background_noise": (1, "low"),
+    "silence": (0, "none"),
+}
+
+BEHAVIOR_RISK = {
+    "mouse_idle": (1, "low"),
+    "rapid_scroll": (2, "low"),
+    "suspicious_resize": (5, "medium"),
+    "extension_detected": (15, "critical"),
+    "devtools_open": (20, "critical"),
+    "clipboard_paste": (4, "medium"),
+    "tab_switch": (6, "high"),
+    "window_blur": (5, "high"),
+}
+
+DEFAULT_RISK = (1, "low")  # unknown camera/behavior events
+DEFAULT_AUDIO_RISK = (0, "low")  # unknown audio events carry no penalty
+
+# Risk "none" events (face_detected, voice_detected, silence) are keepalive noise:
+# above this confidence they are only counted (session_store.count_event), not stored
+NOISE_CONFIDENCE = 0.9
+
+# Repeats of the same event type for an attempt within this window are folded into the
+# first event's row (repeat_count += 1) and carry no further penalty
+EVENT_DEDUPE_WINDOW_MS = 500
+
+# ── Session-init checks (substring matches, case-insensitive) ─────────────
+_ALLOWED_BROWSER_RE = re.compile(r"chrome|edge|chromium", re.IGNORECASE)
+_VM_RENDERER_RE = re.compile(r"swiftshader|llvmpipe|virtualbox|vmware|parallels", re.IGNORECASE)
+
+
+async def _on_penalty_applied(attempt, violations: int):
+    """penalty_writer callback: record the violations and push the new trust score."""
+    await session_store.add_violations(attempt.id, violations)
+    await _push_trust_update(
+        str(attempt.id), str(attempt.exam_id),
+        attempt.trust_score, attempt.risk_level, str(attempt.user_id)
+    )
+
+penalty_writer.on_applied = _on_penalty_applied
+
+
+async def _fold_duplicate(attempt_id: UUID, event_type: str, event_id: UUID) -> Optional[UUID]:
+    """Returns None if `event_id` should be stored, or the id of the recent identical
+    event it was folded into."""
+    holder = await session_store.claim_event_window(attempt_id, event_type, event_id, EVENT_DEDUPE_WINDOW_MS)
+    if holder is not None:
+        event_writer.enqueue_increment(Event, holder, "repeat_count")
+    return holder
+
+
+def _utc_datetime(epoch_seconds: Optional[float]) -> Optional[datetime]:
+    """Naive UTC datetime (the format stored elsewhere) for a session_store timestamp."""
+    if epoch_seconds is None:
+        return None
+    return datetime.fromtimestamp(epoch_seconds, timezone.utc).replace(tzinfo=None)
+
+
+async def _apply_penalty(db: AsyncSession, attempt_id: UUID, user_id: UUID, penalty: float):
+    """Apply `penalty` in one UPDATE ... RETURNING (no SELECT, no read-modify-write race)
+    and push the new score. Returns the updated row, or None if `user_id` doesn't own the attempt."""
+    result = await db.execute(penalty_update(attempt_id, user_id, penalty))
+    attempt = result.one_or_none()
+    if attempt is not None:
+        await _push_trust_update(
+            str(attempt.id), str(attempt.exam_id),
+            attempt.trust_score, attempt.risk_level, str(user_id)
+        )
+    return attempt
+
 
 # ══════════════════════════════════════════════════════════════════════════
 #  SCHEMAS
@@ -120,15 +212,11 @@ async def validate_session(
     blocking = []
 
     # Browser validation
-    allowed_browsers = ["chrome", "edge", "chromium"]
-    browser_lower = data.browser_name.lower()
-    if not any(b in browser_lower for b in allowed_browsers):
+    if not _ALLOWED_BROWSER_RE.search(data.browser_name):
         blocking.append(f"Unsupported browser: {data.browser_name}. Use Chrome or Edge.")
 
     # VM detection
-    gpu_lower = data.gpu_renderer.lower()
-    vm_indicators = ["swiftshader", "llvmpipe", "virtualbox", "vmware", "parallels"]
-    if data.vm_detected or any(ind in gpu_lower for ind in vm_indicators):
+    if data.vm_detected or _VM_RENDERER_RE.search(data.gpu_renderer):
         blocking.append("Virtual machine detected. Exams must run on physical hardware.")
 
     # Multi-monitor
@@ -169,33 +257,23 @@ async def validate_session(
 @router.post("/heartbeat")
 async def receive_heartbeat(
     data: HeartbeatRequest,
-    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """
     Receive a heartbeat ping from the student's browser every 3 seconds.
-    Detects missing heartbeats and auto-pauses the exam.
+    Detects missing heartbeats and auto-pauses the exam. Penalties are applied in
+    the background by penalty_writer, so this handler never touches the database.
     """
-    attempt_key = str(data.attempt_id)
-    now = datetime.utcnow()
+    # Epoch seconds: comparable across workers (a monotonic clock is per-process) and no
+    # datetime/ISO round trip; clamped in case the wall clock steps back
+    now = time.time()
 
-    # Check gap since last heartbeat
-    last_beat = _heartbeats.get(attempt_key)
-    gap_seconds = (now - last_beat).total_seconds() if last_beat else 0
-
-    # Update heartbeat
-    _heartbeats[attempt_key] = now
-
-    # Update session state
-    if attempt_key not in _session_states:
-        _session_states[attempt_key] = {
-            "paused": False,
-            "violations": 0,
-            "last_camera_event": None,
-            "last_audio_event": None,
-        }
+    # Record this heartbeat (and session state) in the shared store; check the gap since the last one
+    last_beat, paused = await session_store.record_heartbeat(data.attempt_id, now)
+    gap_seconds = max(now - last_beat, 0.0) if last_beat else 0
 
     violations = []
+    gap_events = []
 
     # Detect missing heartbeat gap
     if last_beat and gap_seconds > HEARTBEAT_TOLERANCE:
@@ -204,14 +282,15 @@ async def receive_heartbeat(
             "gap_seconds": round(gap_seconds, 1),
             "message": f"Heartbeat gap of {gap_seconds:.0f}s detected",
         })
-        # Log event
-        event = Event(
-            attempt_id=data.attempt_id,
-            event_type="heartbeat_gap",
-            event_data={"gap_seconds": gap_seconds},
-            confidence_score=1.0,
-        )
-        db.add(event)
+        # Logged together with the penalty, once the attempt's owner is confirmed
+        gap_events.append({
+            "id": uuid4(),
+            "attempt_id": data.attempt_id,
+            "event_type": "heartbeat_gap",
+            "event_data": {"gap_seconds": gap_seconds},
+            "confidence_score": 1.0,
+            "created_at": _utc_datetime(now),
+        })
 
     # Tab visibility check
     if not data.tab_visible:
@@ -229,40 +308,21 @@ async def receive_heartbeat(
             "message": "Battery critically low. Please plug in your device.",
         })
 
-    # Apply penalties for violations
+    # Queue penalties; they are coalesced per attempt and applied about once a second
     if violations:
-        result = await db.execute(select(Attempt).where(Attempt.id == data.attempt_id))
-        attempt = result.scalar_one_or_none()
-        if attempt and attempt.user_id == current_user.id:
-            for v in violations:
-                penalty = get_violation_penalty(v["type"])
-                attempt.trust_score = max(0, attempt.trust_score - penalty)
-            _session_states[attempt_key]["violations"] += len(violations)
-
-            # Update risk level
-            if attempt.trust_score < 40:
-                attempt.risk_level = "critical"
-            elif attempt.trust_score < 60:
-                attempt.risk_level = "high"
-            elif attempt.trust_score < 80:
-                attempt.risk_level = "medium"
-            else:
-                attempt.risk_level = "low"
-
-            # Push real-time trust update
-            await _push_trust_update(
-                str(data.attempt_id), str(attempt.exam_id),
-                attempt.trust_score, attempt.risk_level, str(current_user.id)
-            )
-
-    await db.flush()
+        penalty_writer.enqueue(
+            data.attempt_id, current_user.id,
+            sum(get_violation_penalty(v["type"]) for v in violations),
+            len(violations),
+            gap_events,
+        )
 
     return {
         "status": "ok",
-        "server_time": now.isoformat(),
+        "server_time": int(now),
         "gap_seconds": round(gap_seconds, 1) if last_beat else 0,
         "violations": violations,
-        "paused": _session_states.get(attempt_key, {}).get("paused", False),
+        "paused": paused,
     }
 
 
@@ -273,7 +333,6 @@ async def receive_heartbeat(
 @router.post("/camera-event")
 async def receive_camera_event(
     data: CameraEventRequest,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -281,71 +340,51 @@ async def receive_camera_event(
     Receive camera-based monitoring signals (face detection, gaze, head pose).
     Maps events to risk levels and updates trust score.
     """
-    risk_map = {
-        "face_missing": {"penalty": 8, "risk": "high"},
-        "multi_face": {"penalty": 12, "risk": "critical"},
-        "gaze_deviation": {"penalty": 3, "risk": "medium"},
-        "head_pose": {"penalty": 2, "risk": "low"},
-        "face_detected": {"penalty": 0, "risk": "none"},
-    }
-
-    risk_info = risk_map.get(data.event_type, {"penalty": 1, "risk": "low"})
-
-    # Log event to database
-    event = Event(
-        attempt_id=data.attempt_id,
-        event_type=f"camera_{data.event_type}",
-        event_data={
+    base_penalty, risk = CAMERA_RISK.get(data.event_type, DEFAULT_RISK)
+
+    if risk == "none" and data.confidence > NOISE_CONFIDENCE:
+        await session_store.count_event(data.attempt_id, f"camera_{data.event_type}")
+        return {"processed": True, "risk_level": risk, "trust_adjustment": 0.0, "event_id": None}
+
+    event_id = uuid4()
+    duplicate_of = await _fold_duplicate(data.attempt_id, f"camera_{data.event_type}", event_id)
+    if duplicate_of is not None:
+        return {"processed": True, "risk_level": risk, "trust_adjustment": 0.0, "event_id": str(duplicate_of)}
+
+    # Log event (buffered; written in the next multi-row INSERT batch)
+    event_writer.enqueue(Event, {
+        "id": event_id,
+        "attempt_id": data.attempt_id,
+        "event_type": f"camera_{data.event_type}",
+        "event_data": {
             "face_count": data.face_count,
             "confidence": data.confidence,
             "gaze": {"x": data.gaze_x, "y": data.gaze_y} if data.gaze_x is not None else None,
             "head_pose": {"yaw": data.head_yaw, "pitch": data.head_pitch} if data.head_yaw is not None else None,
             "details": data.details,
         },
-        confidence_score=data.confidence,
-        hmac_signature=sign_event({"type": data.event_type, "attempt": str(data.attempt_id)}),
-    )
-    db.add(event)
+        "confidence_score": data.confidence,
+        "hmac_signature": sign_event({"type": data.event_type, "attempt": str(data.attempt_id)}),
+        "created_at": datetime.utcnow(),
+    })
 
     # Apply trust penalty
     trust_adjustment = 0
-    if risk_info["penalty"] > 0:
-        result = await db.execute(select(Attempt).where(Attempt.id == data.attempt_id))
-        attempt = result.scalar_one_or_none()
-        if attempt and attempt.user_id == current_user.id:
-            penalty = risk_info["penalty"] * (1 - data.confidence * 0.3)  # Scale by confidence
-            attempt.trust_score = max(0, attempt.trust_score - penalty)
+    if base_penalty > 0:
+        penalty = base_penalty * (1 - data.confidence * 0.3)  # Scale by confidence
+        attempt = await _apply_penalty(db, data.attempt_id, current_user.id, penalty)
+        if attempt is not None:
             trust_adjustment = -penalty
 
-            # Update risk level
-            if attempt.trust_score < 40:
-                attempt.risk_level = "critical"
-            elif attempt.trust_score < 60:
-                attempt.risk_level = "high"
-            elif attempt.trust_score < 80:
-                attempt.risk_level = "medium"
-            else:
-                attempt.risk_level = "low"
-
-            # Push real-time trust update
-            await _push_trust_update(
-                str(data.attempt_id), str(attempt.exam_id),
-                attempt.trust_score, attempt.risk_level, str(current_user.id)
-            )
-
-            # Trigger AI analysis for high-risk events
-            if risk_info["risk"] in ("high", "critical"):
-                background_tasks.add_task(
-                    _trigger_ai_analysis, str(data.attempt_id), data.event_type, db
-                )
-
-    await db.flush()
+            # Queue AI analysis for high-risk events (runs on the task worker)
+            if risk in ("high", "critical"):
+                await task_queue.enqueue("analyze_high_risk_event", str(data.attempt_id), data.event_type)
 
     return {
         "processed": True,
-        "risk_level": risk_info["risk"],
+        "risk_level": risk,
         "trust_adjustment": round(trust_adjustment, 2),
-        "event_id": str(event.id) if hasattr(event, 'id') else None,
+        "event_id": str(event_id),
     }
 
 
@@ -362,59 +401,38 @@ async def receive_audio_event(
     """
     Receive audio monitoring signals (voice detection, multiple speakers, noise levels).
     """
-    risk_map = {
-        "multiple_voices": {"penalty": 10, "risk": "critical"},
-        "voice_detected": {"penalty": 0, "risk": "none"},
-        "background_noise": {"penalty": 1, "risk": "low"},
-        "silence": {"penalty": 0, "risk": "none"},
-    }
+    penalty, risk = AUDIO_RISK.get(data.event_type, DEFAULT_AUDIO_RISK)
 
-    risk_info = risk_map.get(data.event_type, {"penalty": 0, "risk": "low"})
+    if risk == "none" and data.confidence > NOISE_CONFIDENCE:
+        await session_store.count_event(data.attempt_id, f"audio_{data.event_type}")
+        return {"processed": True, "risk_level": risk, "trust_adjustment": 0.0}
 
-    event = Event(
-        attempt_id=data.attempt_id,
-        event_type=f"audio_{data.event_type}",
-        event_data={
+    event_id = uuid4()
+    if await _fold_duplicate(data.attempt_id, f"audio_{data.event_type}", event_id) is not None:
+        return {"processed": True, "risk_level": risk, "trust_adjustment": 0.0}
+
+    event_writer.enqueue(Event, {
+        "id": event_id,
+        "attempt_id": data.attempt_id,
+        "event_type": f"audio_{data.event_type}",
+        "event_data": {
             "volume_level": data.volume_level,
             "voice_count": data.voice_count,
             "confidence": data.confidence,
             "details": data.details,
         },
-        confidence_score=data.confidence,
-    )
-    db.add(event)
+        "confidence_score": data.confidence,
+        "created_at": datetime.utcnow(),
+    })
 
     trust_adjustment = 0
-    attempt = None
-    if risk_info["penalty"] > 0:
-        result = await db.execute(select(Attempt).where(Attempt.id == data.attempt_id))
-        attempt = result.scalar_one_or_none()
-        if attempt and attempt.user_id == current_user.id:
-            penalty = risk_info["penalty"]
-            attempt.trust_score = max(0, attempt.trust_score - penalty)
+    if penalty > 0:
+        if await _apply_penalty(db, data.attempt_id, current_user.id, penalty) is not None:
             trust_adjustment = -penalty
 
-            # Update risk level
-            if attempt.trust_score < 40:
-                attempt.risk_level = "critical"
-            elif attempt.trust_score < 60:
-                attempt.risk_level = "high"
-            elif attempt.trust_score < 80:
-                attempt.risk_level = "medium"
-            else:
-                attempt.risk_level = "low"
-
-            # Push real-time trust update
-            await _push_trust_update(
-                str(data.attempt_id), str(attempt.exam_id),
-                attempt.trust_score, attempt.risk_level, str(current_user.id)
-            )
-
-    await db.flush()
-
     return {
         "processed": True,
-        "risk_level": risk_info["risk"],
+        "risk_level": risk,
         "trust_adjustment": round(trust_adjustment, 2),
     }
 
@@ -432,56 +450,32 @@ async def receive_behavior_event(
     """
     Receive behavior-based monitoring signals (mouse activity, scrolling patterns, etc).
     """
-    risk_map = {
-        "mouse_idle": {"penalty": 1, "risk": "low"},
-        "rapid_scroll": {"penalty": 2, "risk": "low"},
-        "suspicious_resize": {"penalty": 5, "risk": "medium"},
-        "extension_detected": {"penalty": 15, "risk": "critical"},
-        "devtools_open": {"penalty": 20, "risk": "critical"},
-        "clipboard_paste": {"penalty": 4, "risk": "medium"},
-        "tab_switch": {"penalty": 6, "risk": "high"},
-        "window_blur": {"penalty": 5, "risk": "high"},
-    }
-
-    risk_info = risk_map.get(data.event_type, {"penalty": 1, "risk": "low"})
-
-    event = Event(
-        attempt_id=data.attempt_id,
-        event_type=f"behavior_{data.event_type}",
-        event_data=data.details or {},
-        confidence_score=data.confidence,
-        hmac_signature=sign_event({"type": data.event_type, "attempt": str(data.attempt_id)}),
-    )
-    db.add(event)
+    penalty, risk = BEHAVIOR_RISK.get(data.event_type, DEFAULT_RISK)
+
+    event_id = uuid4()
+    if await _fold_duplicate(data.attempt_id, f"behavior_{data.event_type}", event_id) is not None:
+        return {"processed": True, "risk_level": risk, "trust_adjustment": 0.0, "new_trust_score": None}
+
+    event_writer.enqueue(Event, {
+        "id": event_id,
+        "attempt_id": data.attempt_id,
+        "event_type": f"behavior_{data.event_type}",
+        "event_data": data.details or {},
+        "confidence_score": data.confidence,
+        "hmac_signature": sign_event({"type": data.event_type, "attempt": str(data.attempt_id)}),
+        "created_at": datetime.utcnow(),
+    })
 
     trust_adjustment = 0
-    result = await db.execute(select(Attempt).where(Attempt.id == data.attempt_id))
-    attempt = result.scalar_one_or_none()
-    if attempt and attempt.user_id == current_user.id and risk_info["penalty"] > 0:
-        attempt.trust_score = max(0, attempt.trust_score - risk_info["penalty"])
-        trust_adjustment = -risk_info["penalty"]
-
-        # Update risk level
-        if attempt.trust_score < 40:
-            attempt.risk_level = "critical"
-        elif attempt.trust_score < 60:
-            attempt.risk_level = "high"
-        elif attempt.trust_score < 80:
-            attempt.risk_level = "medium"
-        else:
-            attempt.risk_level = "low"
-
-        # Push real-time trust update
-        await _push_trust_update(
-            str(data.attempt_id), str(attempt.exam_id),
-            attempt.trust_score, attempt.risk_level, str(current_user.id)
-        )
-
-    await db.flush()
+    attempt = None
+    if penalty > 0:
+        attempt = await _apply_penalty(db, data.attempt_id, current_user.id, penalty)
+        if attempt is not None:
+            trust_adjustment = -penalty
 
     return {
         "processed": True,
-        "risk_level": risk_info["risk"],
+        "risk_level": risk,
         "trust_adjustment": round(trust_adjustment, 2),
         "new_trust_score": attempt.trust_score if attempt else None,
     }
@@ -498,56 +492,83 @@ async def get_monitoring_status(
     current_user: User = Depends(get_current_user),
 ):
     """Get full monitoring status for an attempt."""
-    result = await db.execute(select(Attempt).where(Attempt.id == attempt_id))
-    attempt = result.scalar_one_or_none()
-    if not attempt:
-        raise HTTPException(status_code=404, detail="Attempt not found")
-
-    # Get recent events
-    events_result = await db.execute(
-        select(Event)
-        .where(Event.attempt_id == attempt_id)
-        .order_by(Event.created_at.desc())
-        .limit(20)
+    # Two DB round trips (attempt + typing summary, then recent events), overlapped
+    # with one Redis round trip for the live session state
+    db_rows, (session_state, noise_counts, last_heartbeat) = await asyncio.gather(
+        _status_rows(db, attempt_id),
+        session_store.get_status(attempt_id),
     )
-    recent_events = events_result.scalars().all()
-
-    # Get typing metrics
-    typing_result = await db.execute(
-        select(TypingMetric)
-        .where(TypingMetric.attempt_id == attempt_id)
-        .order_by(TypingMetric.recorded_at.desc())
-        .limit(5)
-    )
-    typing_metrics = typing_result.scalars().all()
-
-    attempt_key = str(attempt_id)
-    session_state = _session_states.get(attempt_key, {})
+    attempt, recent_events = db_rows
+    if attempt is None:
+        raise HTTPException(status_code=404, detail="Attempt not found")
 
-    return {
-        "attempt_id": str(attempt_id),
+    # Returned as ORJSONResponse directly: orjson encodes the UUIDs/datetimes natively,
+    # skipping FastAPI's jsonable_encoder pass over the whole payload
+    return ORJSONResponse({
+        "attempt_id": attempt_id,
         "trust_score": attempt.trust_score,
         "risk_level": attempt.risk_level,
         "status": attempt.status,
         "session_state": session_state,
-        "last_heartbeat": _heartbeats.get(attempt_key, {None: None}),
+        "last_heartbeat": _utc_datetime(last_heartbeat),
+        "noise_event_counts": noise_counts,
         "recent_events": [
             {
-                "id": str(e.id),
+                "id": e.id,
                 "type": e.event_type,
                 "data": e.event_data,
                 "confidence": e.confidence_score,
-                "timestamp": e.created_at.isoformat(),
+                "repeat_count": e.repeat_count,
+                "timestamp": e.created_at,
             }
             for e in recent_events
         ],
         "typing_summary": {
-            "avg_wpm": sum(t.wpm or 0 for t in typing_metrics) / max(len(typing_metrics), 1),
-            "avg_backspace_ratio": sum(t.backspace_ratio or 0 for t in typing_metrics) / max(len(typing_metrics), 1),
-            "paste_detected": any(t.paste_size and t.paste_size > 0 for t in typing_metrics),
-            "burst_detected": any(t.burst_detected == "true" for t in typing_metrics),
+            "avg_wpm": float(attempt.avg_wpm),
+            "avg_backspace_ratio": float(attempt.avg_backspace_ratio),
+            "paste_detected": bool(attempt.paste_detected),
+            "burst_detected": bool(attempt.burst_detected),
         },
-    }
+    })
+
+
+async def _status_rows(db: AsyncSession, attempt_id: UUID):
+    """(attempt row with typing summary columns, or None; last 20 events)."""
+    # Last 5 typing metrics, summarised by scalar subqueries on the attempt row
+    recent_typing = (
+        select(TypingMetric.wpm, TypingMetric.backspace_ratio,
+               TypingMetric.paste_size, TypingMetric.burst_detected)
+        .where(TypingMetric.attempt_id == attempt_id)
+        .order_by(TypingMetric.recorded_at.desc())
+        .limit(5)
+        .subquery()
+    )
+
+    def summary(expr):
+        return select(expr).select_from(recent_typing).scalar_subquery()
+
+    attempt = (await db.execute(
+        select(
+            Attempt.trust_score, Attempt.risk_level, Attempt.status,
+            summary(func.coalesce(func.avg(func.coalesce(recent_typing.c.wpm, 0)), 0)).label("avg_wpm"),
+            summary(func.coalesce(func.avg(func.coalesce(recent_typing.c.backspace_ratio, 0)), 0)).label("avg_backspace_ratio"),
+            summary(func.max(case((recent_typing.c.paste_size > 0, 1), else_=0))).label("paste_detected"),
+            summary(func.max(case((recent_typing.c.burst_detected, 1), else_=0))).label("burst_detected"),
+        ).where(Attempt.id == attempt_id)
+    )).one_or_none()
+    if attempt is None:
+        return None, []
+
+    events = await db.execute(
+        select(
+            Event.id, Event.event_type, Event.event_data,
+            Event.confidence_score, Event.repeat_count, Event.created_at,
+        )
+        .where(Event.attempt_id == attempt_id)
+        .order_by(Event.created_at.desc())
+        .limit(20)
+    )
+    return attempt, events.all()
 
 
 # ══════════════════════════════════════════════════════════════════════════
@@ -561,72 +582,102 @@ async def get_live_sessions(
     current_user: User = Depends(require_teacher_or_admin),
 ):
     """Get all active attempts for an exam with their monitoring status."""
+    sessions = await _live_sessions_snapshot(db, exam_id)
+    return ORJSONResponse({"exam_id": exam_id, "sessions": sessions, "total": len(sessions)})
+
+
+@router.websocket("/live-sessions/{exam_id}/stream")
+async def stream_live_sessions(websocket: WebSocket, exam_id: UUID):
+    """
+    Live-sessions feed for the teacher dashboard: one snapshot (same shape as
+    GET /live-sessions/{exam_id}), then a delta per trust-score change:
+    {"type": "delta", "attempt_id", "trust_score", "risk_level"}.
+    Authenticated with ?token=<JWT>, like /ws.
+    """
+    try:
+        payload = decode_access_token(websocket.query_params.get("token") or "")
+    except HTTPException:
+        await websocket.close(code=4001, reason="Invalid token")
+        return
+    if payload.get("role") not in ("teacher", "admin"):
+        await websocket.close(code=4003, reason="Teacher or admin access required")
+        return
+
+    await websocket.accept()
+    # Subscribe before the snapshot so no change falls between the two
+    async with live_feed.subscribe(exam_id) as updates:
+        async with database.AsyncSessionLocal() as db:
+            sessions = await _live_sessions_snapshot(db, exam_id)
+        await websocket.send_text(orjson.dumps({
+            "type": "snapshot", "exam_id": exam_id, "sessions": sessions, "total": len(sessions),
+        }).decode())
+
+        async def forward_updates():
+            while True:
+                update = await updates.get()
+                await websocket.send_text(orjson.dumps({"type": "delta", **update}).decode())
+
+        sender = asyncio.create_task(forward_updates())
+        try:
+            # The client only ever sends pings; read until it goes away
+            while not sender.done():
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            sender.cancel()
+
+
+_RISK_ORDER = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+
+
+async def _live_sessions_snapshot(db: AsyncSession, exam_id: UUID) -> list:
+    """Active attempts for the exam, critical first."""
+    # One round trip: student columns via JOIN, violation count via a correlated
+    # subquery served by the (attempt_id, created_at) events index
+    violation_count = (
+        select(func.count(Event.id)).where(Event.attempt_id == Attempt.id).scalar_subquery()
+    )
     result = await db.execute(
-        select(Attempt).where(
+        select(
+            Attempt.id, Attempt.trust_score, Attempt.risk_level, Attempt.start_time,
+            User.id.label("student_id"), User.name, User.email, User.register_number,
+            violation_count.label("violation_count"),
+        )
+        .outerjoin(User, User.id == Attempt.user_id)
+        .where(
             Attempt.exam_id == exam_id,
             Attempt.status == "active",
         )
+        # Critical first
+        .order_by(case(_RISK_ORDER, value=Attempt.risk_level, else_=len(_RISK_ORDER)))
     )
-    attempts = result.scalars().all()
 
-    sessions = []
-    for attempt in attempts:
-        # Get student info
-        user_result = await db.execute(select(User).where(User.id == attempt.user_id))
-        student = user_result.scalar_one_or_none()
-
-        # Get violation count
-        event_count = await db.execute(
-            select(func.count(Event.id)).where(Event.attempt_id == attempt.id)
-        )
-        violation_count = event_count.scalar() or 0
+    rows = result.all()
+    # Every attempt's last heartbeat in one round trip
+    heartbeats = await session_store.get_heartbeats([row.id for row in rows])
 
-        attempt_key = str(attempt.id)
-        last_beat = _heartbeats.get(attempt_key)
-        is_online = last_beat and (datetime.utcnow() - last_beat).total_seconds() < HEARTBEAT_TOLERANCE
+    sessions = []
+    now = time.time()
+    for row in rows:
+        last_beat = heartbeats.get(row.id)
+        is_online = last_beat is not None and now - last_beat < HEARTBEAT_TOLERANCE
 
         sessions.append({
-            "attempt_id": str(attempt.id),
+            "attempt_id": row.id,
             "student": {
-                "id": str(student.id) if student else None,
-                "name": student.name if student else "Unknown",
-                "email": student.email if student else None,
-                "register_number": student.register_number if student else None,
+                "id": row.student_id,
+                "name": row.name if row.student_id else "Unknown",
+                "email": row.email,
+                "register_number": row.register_number,
             },
-            "trust_score": attempt.trust_score,
-            "risk_level": attempt.risk_level,
+            "trust_score": row.trust_score,
+            "risk_level": row.risk_level,
             "is_online": is_online,
-            "last_heartbeat": last_beat.isoformat() if last_beat else None,
-            "violation_count": violation_count,
-            "start_time": attempt.start_time.isoformat(),
+            "last_heartbeat": _utc_datetime(last_beat),
+            "violation_count": row.violation_count or 0,
+            "start_time": row.start_time,
         })
 
-    # Sort by risk: critical first
-    risk_order = {"critical": 0, "high": 1, "medium": 2, "low": 3}
-    sessions.sort(key=lambda s: risk_order.get(s["risk_level"], 4))
-
-    return {"exam_id": str(exam_id), "sessions": sessions, "total": len(sessions)}
+    return sessions
 
-
-# ══════════════════════════════════════════════════════════════════════════
-#  HELPER: Trigger AI Analysis (background)
-# ══════════════════════════════════════════════════════════════════════════
-
-async def _trigger_ai_analysis(attempt_id: str, trigger_event: str, db: AsyncSession):
-    """Background task to run AI Twin analysis on high-risk events."""
-    try:
-        # Simple analysis data
-        session_data = {
-            "trigger_event": trigger_event,
-            "tab_switches": 0,
-            "paste_size": 0,
-            "typing_speed": 50,
-            "gaze_deviation": 0.5 if "gaze" in trigger_event else 0,
-            "voice_match": True,
-            "backspace_ratio": 0.1,
-            "code_entropy": 3.0,
-        }
-        result = await analyze_session(session_data)
-        # Result would be used by the WebSocket to push to teachers
-    except Exception:
-        pass  # Non-critical background task
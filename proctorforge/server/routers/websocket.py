@@ -1,18 +1,55 @@
 """
 ProctorForge AI - WebSocket Router
 Real-time communication for live updates, violation events, and trust scores.
-Uses Redis Pub/Sub for cross-client broadcasting.
+Uses Redis Pub/Sub for cross-client broadcasting: channel messages go straight to
+this worker's sockets and are published on ws:{channel} for every other API worker
+to forward to its own.
 """
-import json
 import asyncio
-from typing import Dict, Set
+import orjson
+import secrets
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
 from uuid import UUID
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
+from sqlalchemy import select
+
+import database
+from models.attempt import Attempt
 from middleware.auth import decode_access_token
+from services.cache import get_redis, mark_redis_unavailable, psubscribe_forever
 
 router = APIRouter(tags=["WebSocket"])
 
+# Prefixed so socket channels (exam:{attempt_id}) don't collide with exam:{exam_id}:risk
+REDIS_CHANNEL_PREFIX = "ws:"
+# Tags this process's publishes ("{origin} {payload}"); it has already delivered them locally
+_ORIGIN = secrets.token_hex(8)
+
+# Messages buffered per socket; a client this far behind is disconnected
+OUTBOX_SIZE = 256
+# Messages queued for a socket within this window go out as one batch frame
+COALESCE_WINDOW = 0.01  # seconds
+# Close code sent to a client dropped for not keeping up ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+@dataclass(slots=True, frozen=True)
+class UserCtx:
+    """Who is on a socket and where its events go; fixed for the connection."""
+    user_id: str
+    role: str
+    session_type: str
+    session_id: str
+    teacher_channel: str
+    admin_channel: str
+
+
+def _encode(message: dict) -> str:
+    """orjson text payload; UUIDs and (naive, UTC) datetimes serialise natively."""
+    return orjson.dumps(message, option=orjson.OPT_NAIVE_UTC).decode()
+
 
 class ConnectionManager:
     """Manages WebSocket connections by channel."""
@@ -21,54 +58,364 @@ class ConnectionManager:
         # channel -> set of WebSocket connections
         self.channels: Dict[str, Set[WebSocket]] = {}
         # websocket -> user info
-        self.user_map: Dict[WebSocket, dict] = {}
-
-    async def connect(self, websocket: WebSocket, channel: str, user_info: dict):
+        self.user_map: Dict[WebSocket, UserCtx] = {}
+        # websocket -> channels it is in (inverse of self.channels)
+        self._ws_channels: Dict[WebSocket, List[str]] = {}
+        # websocket -> (outbound queue, writer task draining it)
+        self.outboxes: Dict[WebSocket, Tuple[asyncio.Queue, asyncio.Task]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        # Keeps slow-client close tasks referenced until they finish
+        self._closing: Set[asyncio.Task] = set()
+        # Bumped on every membership change; get_active_sessions caches against it
+        self._version = 0
+        self._sessions_cache: Optional[Tuple[int, list]] = None
+
+    async def connect(self, websocket: WebSocket, channel: str, user_info: UserCtx):
         await websocket.accept()
+        outbox = asyncio.Queue(maxsize=OUTBOX_SIZE)
+        self.outboxes[websocket] = (outbox, asyncio.create_task(self._writer(websocket, outbox)))
+        self.join(websocket, channel, user_info)
+
+    def join(self, websocket: WebSocket, channel: str, user_info: UserCtx):
+        """Add an already-accepted socket to another channel."""
         if channel not in self.channels:
             self.channels[channel] = set()
         self.channels[channel].add(websocket)
+        self._ws_channels.setdefault(websocket, []).append(channel)
         self.user_map[websocket] = user_info
+        self._version += 1
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(
+                psubscribe_forever(f"{REDIS_CHANNEL_PREFIX}*", self._on_message)
+            )
+
+    async def stop(self):
+        """Cancel the Redis listener (called from the app lifespan)."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
 
     def disconnect(self, websocket: WebSocket, channel: str):
         if channel in self.channels:
             self.channels[channel].discard(websocket)
             if not self.channels[channel]:
                 del self.channels[channel]
+        ws_channels = self._ws_channels.get(websocket)
+        if ws_channels is not None:
+            if channel in ws_channels:
+                ws_channels.remove(channel)
+            if not ws_channels:
+                del self._ws_channels[websocket]
         self.user_map.pop(websocket, None)
+        self._version += 1
+        self._close_outbox(websocket)
+
+    def _close_outbox(self, websocket: WebSocket):
+        outbox = self.outboxes.pop(websocket, None)
+        if outbox is None:
+            return
+        queue, writer = outbox
+        writer.cancel()
+        while not queue.empty():
+            queue.get_nowait()
+
+    def _drop(self, websocket: WebSocket):
+        """Remove a socket from every channel (it failed or fell too far behind)."""
+        for channel in list(self._ws_channels.get(websocket, ())):
+            self.disconnect(websocket, channel)
+
+    async def _writer(self, websocket: WebSocket, outbox: asyncio.Queue):
+        """Per-socket sender, so a slow client only ever delays itself. Bursts
+        (camera + audio + snapshot from one student) are merged into a single
+        {"type": "batch", "items": [...]} frame."""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                batch = [await outbox.get()]
+                deadline = loop.time() + COALESCE_WINDOW
+                while len(batch) < OUTBOX_SIZE:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(outbox.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                if len(batch) == 1:
+                    await websocket.send_text(batch[0])
+                else:
+                    # Items are already-encoded JSON; splice them rather than re-encode
+                    await websocket.send_text('{"type":"batch","items":[' + ",".join(batch) + "]}")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._drop(websocket)
 
     async def send_to_channel(self, channel: str, message: dict):
-        """Broadcast message to all connections on a channel."""
-        if channel in self.channels:
-            dead = []
-            for ws in self.channels[channel]:
-                try:
-                    await ws.send_json(message)
-                except Exception:
-                    dead.append(ws)
-            for ws in dead:
-                self.channels[channel].discard(ws)
-
-    async def send_to_user(self, websocket: WebSocket, message: dict):
-        """Send message to a specific user."""
+        """Broadcast message to all connections on a channel, across every worker
+        (encoded once, not per socket)."""
+        # Text frames: the browser client JSON.parses event.data as a string
+        payload = _encode(message)
+        # Local sockets don't wait on a Redis round trip (or on Redis being up)
+        self._enqueue(channel, payload)
+        client = get_redis()
+        if client is None:
+            return
         try:
-            await websocket.send_json(message)
+            await client.publish(REDIS_CHANNEL_PREFIX + channel, f"{_ORIGIN} {payload}")
+        except Exception as e:
+            mark_redis_unavailable(e)
+
+    async def _on_message(self, redis_channel: str, data: bytes):
+        origin, _, payload = data.decode().partition(" ")
+        if origin != _ORIGIN:
+            self._enqueue(redis_channel[len(REDIS_CHANNEL_PREFIX):], payload)
+
+    def _enqueue(self, channel: str, payload: str):
+        """Queue a pre-encoded payload for every socket on the channel without waiting
+        on any of them."""
+        slow = None  # only allocated when some socket has fallen behind
+        for ws in self.channels.get(channel, ()):
+            outbox = self.outboxes.get(ws)
+            if outbox is None:
+                continue
+            try:
+                outbox[0].put_nowait(payload)
+            except asyncio.QueueFull:
+                if slow is None:
+                    slow = []
+                slow.append(ws)
+        if slow is None:
+            return
+        for ws in slow:
+            self._drop(ws)
+            task = asyncio.create_task(self._close_slow(ws))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _close_slow(websocket: WebSocket):
+        try:
+            await websocket.close(code=SLOW_CONSUMER_CLOSE_CODE, reason="Client too slow")
         except Exception:
             pass
 
+    async def send_to_user(self, websocket: WebSocket, message: dict):
+        """Send message to a specific user, in order with its channel messages."""
+        outbox = self.outboxes.get(websocket)
+        if outbox is not None:
+            try:
+                outbox[0].put_nowait(_encode(message))
+            except asyncio.QueueFull:
+                pass
+
     def get_active_sessions(self) -> list:
-        """Get all active user sessions."""
-        return [
-            {**info, "channel": ch}
-            for ch, sockets in self.channels.items()
-            for ws in sockets
-            if (info := self.user_map.get(ws))
+        """Get all active user sessions, one entry per (socket, channel) (rebuilt only
+        after connections change)."""
+        cache = self._sessions_cache
+        if cache is not None and cache[0] == self._version:
+            return cache[1]
+        sessions = [
+            {
+                "user_id": info.user_id,
+                "role": info.role,
+                "session_type": info.session_type,
+                "session_id": info.session_id,
+                "channel": channel,
+            }
+            for ws, info in self.user_map.items()
+            for channel in self._ws_channels.get(ws, ())
         ]
+        self._sessions_cache = (self._version, sessions)
+        return sessions
 
 
 manager = ConnectionManager()
 
 
+# Inbound message handlers: handler(data, user_info, session_id, websocket)
+
+async def _send_to_teacher(user_info: UserCtx, message: dict):
+    """Publish to the feed of the exam this socket belongs to (resolved at connect)."""
+    await manager.send_to_channel(user_info.teacher_channel, message)
+
+
+async def handle_violation_event(data: dict, user_info: UserCtx, session_id: str, websocket: WebSocket):
+    # Student sends violation → broadcast to teacher feed
+    await _send_to_teacher(
+        user_info,
+        {
+            "type": "student_violation",
+            "student_id": user_info.user_id,
+            "event": data,
+        },
+    )
+    # Also broadcast to admin
+    await manager.send_to_channel(
+        user_info.admin_channel,
+        {
+            "type": "violation_alert",
+            "student_id": user_info.user_id,
+            "event": data,
+        },
+    )
+
+
+async def handle_trust_score_update(data: dict, user_info: UserCtx, session_id: str, websocket: WebSocket):
+    # Broadcast trust score to teacher
+    await _send_to_teacher(
+        user_info,
+        {
+            "type": "trust_score",
+            "student_id": user_info.user_id,
+            "trust_score": data.get("trust_score"),
+            "risk_level": data.get("risk_level"),
+        },
+    )
+
+
+async def handle_code_update(data: dict, user_info: UserCtx, session_id: str, websocket: WebSocket):
+    # Live code preview for teachers
+    await _send_to_teacher(
+        user_info,
+        {
+            "type": "code_preview",
+            "student_id": user_info.user_id,
+            "code": data.get("code"),
+            "language": data.get("language"),
+        },
+    )
+
+
+async def handle_intervention(data: dict, user_info: UserCtx, session_id: str, websocket: WebSocket):
+    # Teacher/AI sends intervention to student
+    target_channel = f"exam:{data.get('attempt_id')}"
+    await manager.send_to_channel(
+        target_channel,
+        {
+            "type": "intervention",
+            "intervention_text": data.get("intervention_text"),
+            "challenge_prompt": data.get("challenge_prompt"),
+            "risk_level": data.get("risk_level"),
+        },
+    )
+
+
+async def handle_camera_event(data: dict, user_info: UserCtx, session_id: str, websocket: WebSocket):
+    # Camera monitoring events → teacher feed
+    await _send_to_teacher(
+        user_info,
+        {
+            "type": "camera_alert",
+            "student_id": user_info.user_id,
+            "event_type": data.get("event_type"),
+            "face_count": data.get("face_count", 1),
+            "confidence": data.get("confidence", 1.0),
+        },
+    )
+
+
+async def handle_audio_event(data: dict, user_info: UserCtx, session_id: str, websocket: WebSocket):
+    # Audio monitoring events → teacher feed
+    await _send_to_teacher(
+        user_info,
+        {
+            "type": "audio_alert",
+            "student_id": user_info.user_id,
+            "event_type": data.get("event_type"),
+            "volume_level": data.get("volume_level", 0),
+            "voice_count": data.get("voice_count", 0),
+        },
+    )
+
+
+async def handle_monitoring_snapshot(data: dict, user_info: UserCtx, session_id: str, websocket: WebSocket):
+    # Full monitoring snapshot from student → teacher
+    await _send_to_teacher(
+        user_info,
+        {
+            "type": "student_snapshot",
+            "student_id": user_info.user_id,
+            "trust_score": data.get("trust_score"),
+            "risk_level": data.get("risk_level"),
+            "camera_status": data.get("camera_status"),
+            "audio_status": data.get("audio_status"),
+            "tab_visible": data.get("tab_visible", True),
+            "fullscreen": data.get("fullscreen", True),
+        },
+    )
+
+
+async def handle_force_pause(data: dict, user_info: UserCtx, session_id: str, websocket: WebSocket):
+    # Teacher forces student exam pause
+    target_channel = f"exam:{data.get('attempt_id')}"
+    await manager.send_to_channel(
+        target_channel,
+        {
+            "type": "exam_paused",
+            "reason": data.get("reason", "Paused by instructor"),
+            "paused_by": user_info.user_id,
+        },
+    )
+
+
+async def handle_force_terminate(data: dict, user_info: UserCtx, session_id: str, websocket: WebSocket):
+    # Teacher/Admin terminates student exam
+    target_channel = f"exam:{data.get('attempt_id')}"
+    await manager.send_to_channel(
+        target_channel,
+        {
+            "type": "exam_terminated",
+            "reason": data.get("reason", "Terminated by instructor"),
+            "terminated_by": user_info.user_id,
+        },
+    )
+
+
+async def handle_timer_sync(data: dict, user_info: UserCtx, session_id: str, websocket: WebSocket):
+    # Broadcast timer to specific exam session
+    await manager.send_to_user(websocket, {
+        "type": "timer_sync",
+        "remaining_seconds": data.get("remaining_seconds"),
+    })
+
+
+async def handle_ping(data: dict, user_info: UserCtx, session_id: str, websocket: WebSocket):
+    await manager.send_to_user(websocket, {"type": "pong"})
+
+
+# msg_type -> handler; unknown types are ignored
+HANDLERS: Dict[str, Callable[[dict, UserCtx, str, WebSocket], Awaitable[None]]] = {
+    "violation_event": handle_violation_event,
+    "trust_score_update": handle_trust_score_update,
+    "code_update": handle_code_update,
+    "intervention": handle_intervention,
+    "camera_event": handle_camera_event,
+    "audio_event": handle_audio_event,
+    "monitoring_snapshot": handle_monitoring_snapshot,
+    "force_pause": handle_force_pause,
+    "force_terminate": handle_force_terminate,
+    "timer_sync": handle_timer_sync,
+    "ping": handle_ping,
+}
+
+
+async def _attempt_exam_id(attempt_id: str, user_id: str) -> Optional[UUID]:
+    """Exam of the given attempt, if it belongs to the user."""
+    try:
+        attempt_id, user_id = UUID(attempt_id), UUID(user_id)
+    except (TypeError, ValueError):
+        return None
+    async with database.AsyncSessionLocal() as db:
+        return (await db.execute(
+            select(Attempt.exam_id).where(Attempt.id == attempt_id, Attempt.user_id == user_id)
+        )).scalar_one_or_none()
+
+
 @router.websocket("/ws/{session_type}/{session_id}")
 async def websocket_endpoint(
     websocket: WebSocket,
@@ -95,169 +442,60 @@ async def websocket_endpoint(
         await websocket.close(code=4001, reason="Invalid token")
         return
 
-    user_info = {
-        "user_id": payload.get("sub"),
-        "role": payload.get("role"),
-        "session_type": session_type,
-        "session_id": session_id,
-    }
+    # Channels this socket's events go to, fixed for the connection: a student's
+    # teacher feed comes from their own attempt, not from what the client sends
+    if session_type == "exam":
+        exam_id = await _attempt_exam_id(session_id, payload.get("sub"))
+        if exam_id is None:
+            await websocket.close(code=4004, reason="Attempt not found")
+            return
+        teacher_channel = f"teacher_feed:{exam_id}"
+    else:
+        # teacher/{exam_id} -> that exam's feed; admin/global -> teacher_feed:global
+        teacher_channel = f"teacher_feed:{session_id}"
+
+    user_info = UserCtx(
+        user_id=payload.get("sub"),
+        role=payload.get("role"),
+        session_type=session_type,
+        session_id=session_id,
+        teacher_channel=teacher_channel,
+        admin_channel="admin:global",
+    )
 
     channel = f"{session_type}:{session_id}"
     await manager.connect(websocket, channel, user_info)
 
     # Also connect teachers to their exam's student events
     if session_type == "teacher":
-        teacher_channel = f"teacher_feed:{session_id}"
-        await manager.connect(websocket, teacher_channel, user_info)
+        manager.join(websocket, teacher_channel, user_info)
 
     try:
         while True:
-            data = await websocket.receive_json()
-            msg_type = data.get("type")
-
-            if msg_type == "violation_event":
-                # Student sends violation → broadcast to teacher feed
-                await manager.send_to_channel(
-                    f"teacher_feed:{data.get('exam_id', session_id)}",
-                    {
-                        "type": "student_violation",
-                        "student_id": user_info["user_id"],
-                        "event": data,
-                    },
-                )
-                # Also broadcast to admin
-                await manager.send_to_channel(
-                    "admin:global",
-                    {
-                        "type": "violation_alert",
-                        "student_id": user_info["user_id"],
-                        "event": data,
-                    },
-                )
-
-            elif msg_type == "trust_score_update":
-                # Broadcast trust score to teacher
-                await manager.send_to_channel(
-                    f"teacher_feed:{data.get('exam_id', session_id)}",
-                    {
-                        "type": "trust_score",
-                        "student_id": user_info["user_id"],
-                        "trust_score": data.get("trust_score"),
-                        "risk_level": data.get("risk_level"),
-                    },
-                )
-
-            elif msg_type == "code_update":
-                # Live code preview for teachers
-                await manager.send_to_channel(
-                    f"teacher_feed:{data.get('exam_id', session_id)}",
-                    {
-                        "type": "code_preview",
-                        "student_id": user_info["user_id"],
-                        "code": data.get("code"),
-                        "language": data.get("language"),
-                    },
-                )
-
-            elif msg_type == "intervention":
-                # Teacher/AI sends intervention to student
-                target_channel = f"exam:{data.get('attempt_id')}"
-                await manager.send_to_channel(
-                    target_channel,
-                    {
-                        "type": "intervention",
-                        "intervention_text": data.get("intervention_text"),
-                        "challenge_prompt": data.get("challenge_prompt"),
-                        "risk_level": data.get("risk_level"),
-                    },
-                )
-
-            elif msg_type == "camera_event":
-                # Camera monitoring events → teacher feed
-                await manager.send_to_channel(
-                    f"teacher_feed:{data.get('exam_id', session_id)}",
-                    {
-                        "type": "camera_alert",
-                        "student_id": user_info["user_id"],
-                        "event_type": data.get("event_type"),
-                        "face_count": data.get("face_count", 1),
-                        "confidence": data.get("confidence", 1.0),
-                    },
-                )
-
-            elif msg_type == "audio_event":
-                # Audio monitoring events → teacher feed
-                await manager.send_to_channel(
-                    f"teacher_feed:{data.get('exam_id', session_id)}",
-                    {
-                        "type": "audio_alert",
-                        "student_id": user_info["user_id"],
-                        "event_type": data.get("event_type"),
-                        "volume_level": data.get("volume_level", 0),
-                        "voice_count": data.get("voice_count", 0),
-                    },
-                )
-
-            elif msg_type == "monitoring_snapshot":
-                # Full monitoring snapshot from student → teacher
-                await manager.send_to_channel(
-                    f"teacher_feed:{data.get('exam_id', session_id)}",
-                    {
-                        "type": "student_snapshot",
-                        "student_id": user_info["user_id"],
-                        "trust_score": data.get("trust_score"),
-                        "risk_level": data.get("risk_level"),
-                        "camera_status": data.get("camera_status"),
-                        "audio_status": data.get("audio_status"),
-                        "tab_visible": data.get("tab_visible", True),
-                        "fullscreen": data.get("fullscreen", True),
-                    },
-                )
-
-            elif msg_type == "force_pause":
-                # Teacher forces student exam pause
-                target_channel = f"exam:{data.get('attempt_id')}"
-                await manager.send_to_channel(
-                    target_channel,
-                    {
-                        "type": "exam_paused",
-                        "reason": data.get("reason", "Paused by instructor"),
-                        "paused_by": user_info["user_id"],
-                    },
-                )
-
-            elif msg_type == "force_terminate":
-                # Teacher/Admin terminates student exam
-                target_channel = f"exam:{data.get('attempt_id')}"
-                await manager.send_to_channel(
-                    target_channel,
-                    {
-                        "type": "exam_terminated",
-                        "reason": data.get("reason", "Terminated by instructor"),
-                        "terminated_by": user_info["user_id"],
-                    },
-                )
-
-            elif msg_type == "timer_sync":
-                # Broadcast timer to specific exam session
-                await manager.send_to_user(websocket, {
-                    "type": "timer_sync",
-                    "remaining_seconds": data.get("remaining_seconds"),
-                })
-
-            elif msg_type == "ping":
-                await manager.send_to_user(websocket, {"type": "pong"})
+            # Binary frames (the browser client) skip UTF-8 validation; text still works
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            try:
+                data = orjson.loads(message.get("bytes") or message.get("text") or b"")
+            except orjson.JSONDecodeError:
+                continue
+            if not isinstance(data, dict):
+                continue
+            handler = HANDLERS.get(data.get("type"))
+            if handler is not None:
+                await handler(data, user_info, session_id, websocket)
 
     except WebSocketDisconnect:
         manager.disconnect(websocket, channel)
         if session_type == "teacher":
-            manager.disconnect(websocket, f"teacher_feed:{session_id}")
+            manager.disconnect(websocket, teacher_channel)
         # Notify teacher about student disconnect
         if session_type == "exam":
             await manager.send_to_channel(
-                f"teacher_feed:{session_id}",
+                teacher_channel,
                 {
                     "type": "student_disconnect",
-                    "student_id": user_info["user_id"],
+                    "student_id": user_info.user_id,
                 },
             )
@@ -1,12 +1,13 @@
 from schemas.auth import UserRegister, UserLogin, UserResponse, TokenResponse, TokenPayload  # noqa
 from schemas.exam import (  # noqa
-    ExamCreate, ExamUpdate, ExamResponse,
+    ExamCreate, ExamUpdate, ExamResponse, NormalizedQuestion,
     QuestionCreate, QuestionUpdate, QuestionResponse, QuestionStudentView,
     AssignExam, AssignmentResponse,
     AttemptCreate, AttemptResponse,
     CodeExecuteRequest, CodeExecuteResponse, CodeSubmitRequest,
+    RunCodeRequest, SubmitCodeRequest,
     EventCreate, EventResponse,
     TypingMetricCreate, LiveCodeLogCreate,
-    InterventionResponse,
+    InterventionResponse, AIAnalysisResult,
     TrustScoreUpdate, TrustScoreResponse,
 )
@@ -1,13 +1,52 @@
 """
 ProctorForge AI - Pydantic Schemas for Exams, Questions, Assignments
 """
-from pydantic import BaseModel
-from typing import Optional, List, Any
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Optional, List, Any, Literal
 from uuid import UUID
 from datetime import datetime
 
 
 # --- Exam ---
+class NormalizedQuestion(BaseModel):
+    """Inline question from the create-exam payload, mapped onto Question columns.
+    Accepts the builder's aliases (text, question_type, marks, metadata, correct_option)."""
+    type: str = "mcq"
+    language: Optional[str] = None
+    question_text: str = ""
+    options: Optional[List[Any]] = None
+    correct_answer: Optional[str] = None
+    test_cases: Optional[Any] = None
+    points: int = 10
+
+    @model_validator(mode="before")
+    @classmethod
+    def _normalize(cls, data: Any) -> Any:
+        if not isinstance(data, dict):
+            return data
+        q_type = data.get("type") or data.get("question_type") or "mcq"
+        options = data.get("options") or []
+        correct_answer = None
+        if q_type == "mcq" and options:
+            if isinstance(options[0], dict):
+                # [{text, is_correct}, ...]
+                correct_opts = [o.get("text", "") for o in options if o.get("is_correct")]
+                correct_answer = correct_opts[0] if correct_opts else None
+            elif isinstance(options[0], str):
+                ci = data.get("correct_option")
+                correct_answer = options[ci] if ci is not None and ci < len(options) else None
+        return {
+            "type": q_type,
+            "language": data.get("language"),
+            "question_text": data.get("question_text") or data.get("text") or "",
+            "options": options or None,
+            "correct_answer": correct_answer,
+            # For coding questions, test_cases come via options list or metadata
+            "test_cases": data.get("test_cases") or data.get("metadata"),
+            "points": data.get("marks") or data.get("points") or 10,
+        }
+
+
 class ExamCreate(BaseModel):
     title: str
     description: Optional[str] = None
@@ -21,7 +60,27 @@ class ExamCreate(BaseModel):
     assigned_year: Optional[str] = None
     assigned_section: Optional[str] = None
     passing_score: Optional[int] = None
-    questions: Optional[List[Any]] = None
+    questions: Optional[List[NormalizedQuestion]] = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def _default_question_type(cls, data: Any) -> Any:
+        """Untyped inline questions inherit the exam's type."""
+        if isinstance(data, dict) and data.get("questions"):
+            exam_type = data.get("type") or "mcq"
+            data = {**data, "questions": [
+                {**q, "type": q.get("type") or q.get("question_type") or exam_type}
+                if isinstance(q, dict) else q
+                for q in data["questions"]
+            ]}
+        return data
+
+    @field_validator("questions")
+    @classmethod
+    def _drop_blank_questions(cls, questions):
+        if questions is None:
+            return None
+        return [q for q in questions if q.question_text]
 
 
 class ExamUpdate(BaseModel):
@@ -113,8 +172,11 @@ class QuestionStudentView(BaseModel):
 
 
 # --- Assignment ---
+MAX_ASSIGN_BATCH = 5000
+
+
 class AssignExam(BaseModel):
-    student_ids: List[UUID]
+    student_ids: List[UUID] = Field(..., max_length=MAX_ASSIGN_BATCH)
 
 
 class AssignmentResponse(BaseModel):
@@ -173,6 +235,20 @@ class CodeSubmitRequest(BaseModel):
     code: str
 
 
+MAX_CODE_LENGTH = 100_000
+
+
+class RunCodeRequest(BaseModel):
+    code: str = Field("", max_length=MAX_CODE_LENGTH)
+    language: str = Field("python", max_length=20)
+    stdin: str = Field("", max_length=MAX_CODE_LENGTH)
+
+
+class SubmitCodeRequest(BaseModel):
+    code: str = Field("", max_length=MAX_CODE_LENGTH)
+    language: str = Field("python", max_length=20)
+
+
 # --- Events ---
 class EventCreate(BaseModel):
     attempt_id: UUID
@@ -188,6 +264,7 @@ class EventResponse(BaseModel):
     event_type: str
     event_data: Optional[dict]
     confidence_score: Optional[float]
+    repeat_count: int = 1
     created_at: datetime
 
     class Config:
@@ -202,7 +279,7 @@ class TypingMetricCreate(BaseModel):
     paste_size: Optional[int] = None
     idle_time: Optional[float] = None
     entropy_score: Optional[float] = None
-    burst_detected: str = "false"
+    burst_detected: bool = False  # older clients send "true"/"false"; pydantic coerces them
 
 
 # --- Live Code Log ---
@@ -213,6 +290,17 @@ class LiveCodeLogCreate(BaseModel):
     event_type: str = "autosave"
 
 
+class LiveCodeLogResponse(BaseModel):
+    id: UUID
+    code_snapshot: str
+    event_type: str
+    timestamp: datetime
+    question_id: Optional[UUID] = None
+
+    class Config:
+        from_attributes = True
+
+
 # --- AI Intervention ---
 class InterventionResponse(BaseModel):
     id: UUID
@@ -229,6 +317,15 @@ class InterventionResponse(BaseModel):
         from_attributes = True
 
 
+class AIAnalysisResult(BaseModel):
+    """Claude's session analysis, in the JSON shape the AI Twin prompt asks for."""
+    risk_level: Literal["low", "medium", "high", "critical"]
+    intervention_text: Optional[str] = None
+    challenge_prompt: Optional[str] = None
+    trust_adjustment: float = Field(ge=-20, le=5)
+    reasoning: str
+
+
 # --- Trust Score ---
 class TrustScoreUpdate(BaseModel):
     behavior_stability: float
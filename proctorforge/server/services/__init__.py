@@ -1,3 +1,7 @@
 from services.trust_score import compute_trust_score, apply_violation_penalty  # noqa
 from services.ai_twin import analyze_session  # noqa
 from services.audit import generate_audit_report  # noqa
+from services.event_writer import event_writer  # noqa
+from services.penalty_writer import penalty_writer  # noqa
+from services.live_feed import live_feed  # noqa
+from services.cache import cache_get, cache_set, cache_delete  # noqa
@@ -5,24 +5,18 @@ Uses Claude to analyze session data, classify risk, and generate interventions.
 import json
 from typing import Optional
 
+from pydantic import ValidationError
 
-async def analyze_session(session_data: dict) -> dict:
-    """
-    Send structured session data to Claude for risk analysis.
-    Returns risk classification, intervention text, trust adjustment, and reasoning.
-    
-    Falls back to rule-based analysis if API is unavailable.
-    """
-    try:
-        import anthropic
-        from config import settings
+from config import settings
+from schemas.exam import AIAnalysisResult
 
-        if not settings.ANTHROPIC_API_KEY or settings.ANTHROPIC_API_KEY == "your-anthropic-api-key-here":
-            return _rule_based_analysis(session_data)
+try:
+    import anthropic
+except ImportError:  # falls back to rule-based analysis
+    anthropic = None
 
-        client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-
-        prompt = f"""You are an AI proctoring assistant analyzing a student's exam session in real-time.
+# Static part of the analysis prompt; only the session data is appended per call
+_PROMPT_HEAD = """You are an AI proctoring assistant analyzing a student's exam session in real-time.
 
 Analyze the following session data and provide:
 1. Risk classification: low, medium, high, or critical
@@ -32,97 +26,114 @@ Analyze the following session data and provide:
 5. Detailed reasoning trace
 
 Session Data:
-{json.dumps(session_data, indent=2)}
+"""
+_PROMPT_TAIL = """
 
 Respond in JSON format:
-{{
+{
     "risk_level": "low|medium|high|critical",
     "intervention_text": "message to student or null",
     "challenge_prompt": "challenge question or null",
     "trust_adjustment": number,
     "reasoning": "detailed explanation"
-}}"""
+}"""
+
+# Shared async client, created on first use so its connection pool is reused
+_client = None
+
+
+def _get_client():
+    global _client
+    if _client is None:
+        _client = anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+    return _client
+
+
+async def analyze_session(session_data: dict) -> dict:
+    """
+    Send structured session data to Claude for risk analysis.
+    Returns risk classification, intervention text, trust adjustment, and reasoning.
+    
+    Falls back to rule-based analysis if API is unavailable.
+    """
+    if (
+        anthropic is None
+        or not settings.ANTHROPIC_API_KEY
+        or settings.ANTHROPIC_API_KEY == "your-anthropic-api-key-here"
+    ):
+        return _rule_based_analysis(session_data)
 
-        response = client.messages.create(
+    prompt = _PROMPT_HEAD + json.dumps(session_data, indent=2) + _PROMPT_TAIL
+    try:
+        response = await _get_client().messages.create(
             model="claude-sonnet-4-20250514",
             max_tokens=1024,
             messages=[{"role": "user", "content": prompt}],
         )
-
-        result = json.loads(response.content[0].text)
-        return result
-
     except Exception as e:
-        # Fallback to rule-based
+        print(f"[AI TWIN ERROR] API call failed: {type(e).__name__}: {str(e)[:200]}")
         return _rule_based_analysis(session_data)
 
+    try:
+        # Parsed and type-checked in one step by pydantic-core
+        return AIAnalysisResult.model_validate_json(response.content[0].text).model_dump()
+    except (ValidationError, IndexError, AttributeError) as e:
+        print(f"[AI TWIN ERROR] unusable model response: {type(e).__name__}: {str(e)[:200]}")
+        return _rule_based_analysis(session_data)
+
+
+# Rule table for the fallback analyzer: (feature, default, [(threshold, points), ...]).
+# A feature scores the points of the first rung it exceeds; rungs are highest first.
+_HIGH_RULES = (
+    ("tab_switch_count", 0, ((5, 30), (2, 15))),
+    ("paste_size", 0, ((500, 25), (100, 10))),
+    ("typing_speed", 0, ((150, 20), (100, 10))),
+    ("code_entropy", 0.5, ((0.95, 10),)),
+)
+# Features that are suspicious when low: (feature, default, threshold, points)
+_LOW_RULES = (
+    ("voice_match_score", 1.0, 0.7, 25),
+    ("backspace_ratio", 0.05, 0.01, 15),  # Suspiciously low
+)
+GAZE_DEVIATION_POINTS = 15
+
+# (min risk score, risk level, intervention text, challenge prompt, trust adjustment)
+_RISK_BANDS = (
+    (60, "critical",
+     "Your session has been flagged for multiple anomalies. Please stay focused on your exam.",
+     "Please explain your approach to the current problem in your own words.", -15),
+    (40, "high",
+     "Several unusual activities detected. Please ensure you're following exam rules.",
+     "Can you walk through the logic of your most recent code change?", -10),
+    (20, "medium", "Minor irregularities detected. Please remain focused.", None, -5),
+    (0, "low", None, None, 0),
+)
+
 
 def _rule_based_analysis(session_data: dict) -> dict:
     """Rule-based fallback when Claude API is unavailable."""
     risk_score = 0
+    for feature, default, rungs in _HIGH_RULES:
+        value = session_data.get(feature, default)
+        for threshold, points in rungs:
+            if value > threshold:
+                risk_score += points
+                break
+    for feature, default, threshold, points in _LOW_RULES:
+        if session_data.get(feature, default) < threshold:
+            risk_score += points
+    if session_data.get("gaze_deviation"):
+        risk_score += GAZE_DEVIATION_POINTS
 
-    # Tab switches
-    tab_switches = session_data.get("tab_switch_count", 0)
-    if tab_switches > 5:
-        risk_score += 30
-    elif tab_switches > 2:
-        risk_score += 15
+    _, risk_level, intervention_text, challenge_prompt, trust_adjustment = next(
+        band for band in _RISK_BANDS if risk_score >= band[0]
+    )
 
-    # Paste size
+    tab_switches = session_data.get("tab_switch_count", 0)
     paste_size = session_data.get("paste_size", 0)
-    if paste_size > 500:
-        risk_score += 25
-    elif paste_size > 100:
-        risk_score += 10
-
-    # Typing speed
     wpm = session_data.get("typing_speed", 0)
-    if wpm > 150:
-        risk_score += 20
-    elif wpm > 100:
-        risk_score += 10
-
-    # Gaze deviation
-    if session_data.get("gaze_deviation"):
-        risk_score += 15
-
-    # Voice match
     voice_score = session_data.get("voice_match_score", 1.0)
-    if voice_score < 0.7:
-        risk_score += 25
-
-    # Backspace ratio
     backspace_ratio = session_data.get("backspace_ratio", 0.05)
-    if backspace_ratio < 0.01:
-        risk_score += 15  # Suspiciously low
-
-    # Code entropy
-    entropy = session_data.get("code_entropy", 0.5)
-    if entropy > 0.95:
-        risk_score += 10
-
-    # Classify risk
-    if risk_score >= 60:
-        risk_level = "critical"
-        intervention_text = "Your session has been flagged for multiple anomalies. Please stay focused on your exam."
-        challenge_prompt = "Please explain your approach to the current problem in your own words."
-        trust_adjustment = -15
-    elif risk_score >= 40:
-        risk_level = "high"
-        intervention_text = "Several unusual activities detected. Please ensure you're following exam rules."
-        challenge_prompt = "Can you walk through the logic of your most recent code change?"
-        trust_adjustment = -10
-    elif risk_score >= 20:
-        risk_level = "medium"
-        intervention_text = "Minor irregularities detected. Please remain focused."
-        challenge_prompt = None
-        trust_adjustment = -5
-    else:
-        risk_level = "low"
-        intervention_text = None
-        challenge_prompt = None
-        trust_adjustment = 0
-
     return {
         "risk_level": risk_level,
         "intervention_text": intervention_text,
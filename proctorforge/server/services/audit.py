@@ -5,14 +5,52 @@ Generates forensic audit reports and violation timelines.
 import json
 from datetime import datetime
 from typing import List, Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 
-from sqlalchemy import select
+from sqlalchemy import cast, func, literal, null, select, union_all
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models.attempt import Attempt
 from models.event import Event, AIIntervention, AuditReport
 
+# Timeline rows fetched from the database per round trip
+TIMELINE_CHUNK_SIZE = 500
+
+
+def _null(column):
+    """NULL typed like `column`, so both sides of the timeline UNION line up."""
+    return cast(null(), column.type)
+
+
+def _timeline_query(attempt_id: UUID):
+    """Events and AI interventions for an attempt as one UNION ALL in timeline
+    order (events first on equal timestamps). Shared columns: label is the
+    event type / intervention trigger, data is event_data / reasoning_trace."""
+    events = select(
+        literal("violation").label("kind"),
+        Event.created_at.label("created_at"),
+        Event.event_type.label("label"),
+        Event.event_data.label("data"),
+        Event.confidence_score.label("confidence"),
+        _null(AIIntervention.risk_level).label("risk_level"),
+        _null(AIIntervention.intervention_text).label("text"),
+        _null(AIIntervention.outcome).label("outcome"),
+        _null(AIIntervention.trust_adjustment).label("trust_adjustment"),
+    ).where(Event.attempt_id == attempt_id)
+    interventions = select(
+        literal("intervention").label("kind"),
+        AIIntervention.created_at,
+        AIIntervention.trigger_event,
+        AIIntervention.reasoning_trace,
+        _null(Event.confidence_score),
+        AIIntervention.risk_level,
+        AIIntervention.intervention_text,
+        AIIntervention.outcome,
+        AIIntervention.trust_adjustment,
+    ).where(AIIntervention.attempt_id == attempt_id)
+    timeline = union_all(events, interventions).subquery()
+    return select(timeline).order_by(timeline.c.created_at, timeline.c.kind.desc())
+
 
 async def generate_audit_report(
     attempt_id: UUID,
@@ -25,54 +63,50 @@ async def generate_audit_report(
     if not attempt:
         return {"error": "Attempt not found"}
 
-    # Get all events
+    # Per-type violation counts, aggregated by the database
     result = await db.execute(
-        select(Event).where(Event.attempt_id == attempt_id).order_by(Event.created_at)
+        select(Event.event_type, func.count())
+        .where(Event.attempt_id == attempt_id)
+        .group_by(Event.event_type)
     )
-    events = result.scalars().all()
+    violation_counts = dict(result.all())
 
-    # Get interventions
-    result = await db.execute(
-        select(AIIntervention).where(AIIntervention.attempt_id == attempt_id).order_by(AIIntervention.created_at)
+    # Events and interventions as one timeline, merged and ordered by the database;
+    # streamed in chunks rather than materialising every row before the loop
+    timeline_rows = await db.stream(
+        _timeline_query(attempt_id).execution_options(yield_per=TIMELINE_CHUNK_SIZE)
     )
-    interventions = result.scalars().all()
 
-    # Build timeline
     timeline = []
-    for event in events:
-        timeline.append({
-            "timestamp": event.created_at.isoformat(),
-            "type": "violation",
-            "event_type": event.event_type,
-            "data": event.event_data,
-            "confidence": event.confidence_score,
-        })
-
-    for intervention in interventions:
-        timeline.append({
-            "timestamp": intervention.created_at.isoformat(),
-            "type": "intervention",
-            "trigger": intervention.trigger_event,
-            "risk_level": intervention.risk_level,
-            "text": intervention.intervention_text,
-            "outcome": intervention.outcome,
-            "trust_adjustment": intervention.trust_adjustment,
-        })
-
-    # Sort by timestamp
-    timeline.sort(key=lambda x: x["timestamp"])
+    interventions = []
+    async for row in timeline_rows:
+        if row.kind == "violation":
+            timeline.append({
+                "timestamp": row.created_at.isoformat(),
+                "type": "violation",
+                "event_type": row.label,
+                "data": row.data,
+                "confidence": row.confidence,
+            })
+        else:
+            timeline.append({
+                "timestamp": row.created_at.isoformat(),
+                "type": "intervention",
+                "trigger": row.label,
+                "risk_level": row.risk_level,
+                "text": row.text,
+                "outcome": row.outcome,
+                "trust_adjustment": row.trust_adjustment,
+            })
+            interventions.append(row)
 
     # Generate summary
-    violation_counts = {}
-    for event in events:
-        violation_counts[event.event_type] = violation_counts.get(event.event_type, 0) + 1
-
     summary = (
         f"Session for attempt {attempt_id}. "
         f"Duration: {attempt.start_time.isoformat()} to {(attempt.end_time or datetime.utcnow()).isoformat()}. "
         f"Final trust score: {attempt.trust_score}. "
         f"Risk level: {attempt.risk_level}. "
-        f"Total violations: {len(events)}. "
+        f"Total violations: {sum(violation_counts.values())}. "
         f"Total interventions: {len(interventions)}. "
         f"Violation breakdown: {json.dumps(violation_counts)}."
     )
@@ -89,6 +123,7 @@ async def generate_audit_report(
 
     # Save report
     report = AuditReport(
+        id=uuid4(),
         attempt_id=attempt_id,
         summary=summary,
         timeline=timeline,
@@ -96,15 +131,14 @@ async def generate_audit_report(
         final_trust_score=attempt.trust_score,
         ai_reasoning=[
             {
-                "trigger": i.trigger_event,
-                "reasoning": i.reasoning_trace,
+                "trigger": i.label,
+                "reasoning": i.data,
                 "outcome": i.outcome,
             }
             for i in interventions
         ],
     )
     db.add(report)
-    await db.flush()
 
     return {
         "id": str(report.id),
@@ -0,0 +1,121 @@
+"""
+ProctorForge AI - Redis Cache
+Shared Redis client, a read-through cache for hot, rarely-changing reads
+(e.g. exam question lists), and a pattern-subscription helper for pub/sub. Every call degrades to a cache miss when Redis is
+not installed or unreachable.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional
+
+from config import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis is optional for local development
+    aioredis = None
+
+# After a connection failure, skip Redis for this long instead of timing out on every request
+RETRY_AFTER_SECONDS = 30
+# A dropped subscription is retried at once, then after 0.1s, 0.2s, ... up to RETRY_AFTER_SECONDS
+RESUBSCRIBE_BASE_DELAY = 0.1
+
+# Socket timeout per client. Cached reads give up fast and fall through to the
+# database; live session state (services/session_store.py) can't be rebuilt from it,
+# so it waits longer and backs off separately, and a slow cache reply leaves it alone
+SOCKET_TIMEOUTS = {"cache": 0.2, "state": 2.0}
+
+_clients = {}
+_disabled_until = {}
+
+
+def get_redis(kind: str = "cache"):
+    """Shared redis.asyncio client of the given kind (see SOCKET_TIMEOUTS), or None
+    while Redis is missing or that client is backed off."""
+    if aioredis is None or time.monotonic() < _disabled_until.get(kind, 0.0):
+        return None
+    client = _clients.get(kind)
+    if client is None:
+        client = _clients[kind] = aioredis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=SOCKET_TIMEOUTS[kind],
+            socket_timeout=SOCKET_TIMEOUTS[kind],
+        )
+    return client
+
+
+def mark_redis_unavailable(e: Exception, kind: str = "cache"):
+    """Back off from Redis after a connection/command failure."""
+    _disabled_until[kind] = time.monotonic() + RETRY_AFTER_SECONDS
+    print(f"⚠️ Redis ({kind}) unavailable, retrying in {RETRY_AFTER_SECONDS}s: {type(e).__name__}: {str(e)[:100]}")
+
+
+async def cache_get(key: str) -> Optional[bytes]:
+    """Return the cached blob for `key`, or None on a miss or Redis error."""
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        return await client.get(key)
+    except Exception as e:
+        mark_redis_unavailable(e)
+        return None
+
+
+async def cache_set(key: str, value: bytes, ttl: int = 300) -> None:
+    """Store `value` under `key` for `ttl` seconds (best effort)."""
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        await client.set(key, value, ex=ttl)
+    except Exception as e:
+        mark_redis_unavailable(e)
+
+
+async def cache_delete(*keys: str) -> None:
+    """Drop `keys` from the cache (best effort)."""
+    client = get_redis()
+    if client is None or not keys:
+        return
+    try:
+        await client.delete(*keys)
+    except Exception as e:
+        mark_redis_unavailable(e)
+
+
+async def psubscribe_forever(pattern: str, handler: Callable[[str, bytes], Awaitable[None]]) -> None:
+    """Pass every message on channels matching `pattern` to handler(channel, data) until
+    cancelled, reconnecting with exponential backoff after failures. Runs on its own
+    connection: the shared client's 200ms socket timeout would end the subscription."""
+    if aioredis is None:
+        return
+    delay = 0.0
+    while True:
+        client = aioredis.from_url(settings.REDIS_URL)
+        try:
+            async with client.pubsub() as pubsub:
+                await pubsub.psubscribe(pattern)
+                delay = 0.0  # subscribed; the next drop is retried at once again
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    await handler(channel, message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[REDIS PUBSUB ERROR] {pattern}: {type(e).__name__}: {str(e)[:200]} (retrying in {delay:.1f}s)")
+            await asyncio.sleep(delay)
+            delay = min(max(delay * 2, RESUBSCRIBE_BASE_DELAY), RETRY_AFTER_SECONDS)
+        finally:
+            await client.aclose()
+
+
+async def close_cache() -> None:
+    """Close the shared connection pools (called from the app lifespan)."""
+    while _clients:
+        _, client = _clients.popitem()
+        await client.aclose()
@@ -0,0 +1,151 @@
+"""
+ProctorForge AI - Buffered Event Writer
+Coalesces high-frequency proctoring inserts (events, typing metrics, code
+snapshots) into one multi-row INSERT per table per flush.
+"""
+import asyncio
+from collections import defaultdict
+from typing import NamedTuple, Optional
+from uuid import UUID
+
+from sqlalchemy import insert, update
+
+import database
+from config import settings
+
+
+class _Increment(NamedTuple):
+    """Queued `column += 1` for an already-queued (or written) row."""
+    column: str
+    row_id: UUID
+
+
+class EventWriter:
+    """Background writer that batches rows and commits them in a single transaction."""
+
+    def __init__(self, batch_size: int = 200, flush_interval: float = 0.2):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the flush loop (called from the app lifespan)."""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Flush anything still buffered and stop the flush loop."""
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+    def enqueue(self, model, row: dict):
+        """Buffer one row for `model`. Callers pre-assign id/timestamps they need to return."""
+        if self._queue is None:
+            raise RuntimeError("EventWriter not started.")
+        self._queue.put_nowait((model, row, None))
+
+    def enqueue_increment(self, model, row_id: UUID, column: str):
+        """Buffer `column += 1` on the row with id `row_id`. Applied after the batch's
+        inserts, so it may target a row enqueued moments earlier."""
+        if self._queue is None:
+            raise RuntimeError("EventWriter not started.")
+        self._queue.put_nowait((model, _Increment(column, row_id), None))
+
+    async def write(self, model, row: dict):
+        """Buffer one row and wait until the batch containing it is committed."""
+        if self._queue is None:
+            raise RuntimeError("EventWriter not started.")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((model, row, future))
+        await future
+
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._write(batch)
+
+    async def _write(self, batch: list):
+        try:
+            await self._commit(batch)
+        except Exception as e:
+            print(f"[EVENT WRITER ERROR] {type(e).__name__}: {str(e)[:200]} (retrying {len(batch)} rows one by one)")
+            await self._write_each(batch)
+            return
+        for _, _, future in batch:
+            _settle(future)
+
+    async def _write_each(self, batch: list):
+        """Commit each row on its own so one bad row doesn't take the batch down with it.
+        Inserts go first, so increments still find rows queued in the same batch."""
+        dropped = defaultdict(int)
+        for item in sorted(batch, key=lambda item: isinstance(item[1], _Increment)):
+            try:
+                await self._commit([item])
+            except Exception as e:
+                dropped[item[0].__tablename__] += 1
+                _settle(item[2], e)
+            else:
+                _settle(item[2])
+        if dropped:
+            print(f"[EVENT WRITER ERROR] rows dropped: {dict(dropped)} ({len(batch)} in batch)")
+
+    @staticmethod
+    async def _commit(batch: list):
+        """Write the batch in one transaction: one multi-row INSERT per model, then the increments."""
+        rows_by_model = defaultdict(list)
+        increments = defaultdict(int)
+        for model, row, _ in batch:
+            if isinstance(row, _Increment):
+                increments[(model, row.column, row.row_id)] += 1
+            else:
+                rows_by_model[model].append(row)
+        async with database.AsyncSessionLocal() as session:
+            for model, rows in rows_by_model.items():
+                await session.execute(insert(model), rows)
+            for (model, column, row_id), count in increments.items():
+                await session.execute(
+                    update(model)
+                    .where(model.id == row_id)
+                    .values({column: getattr(model, column) + count})
+                    .execution_options(synchronize_session=False)
+                )
+            await session.commit()
+
+
+def _settle(future: Optional[asyncio.Future], error: Optional[Exception] = None):
+    """Resolve a write() caller's future, if there is one still waiting."""
+    if future is None or future.done():
+        return
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(error)
+
+
+event_writer = EventWriter(
+    batch_size=settings.EVENT_BATCH_SIZE,
+    flush_interval=settings.EVENT_BATCH_MS / 1000,
+)
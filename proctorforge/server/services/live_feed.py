@@ -0,0 +1,82 @@
+"""
+ProctorForge AI - Live Risk Feed
+Fans trust-score / risk-level changes out to teacher dashboards streaming
+/api/monitoring/live-sessions/{exam_id}/stream. Changes are published on the
+Redis channel exam:{exam_id}:risk so every API worker sees them; one pattern
+subscription per process forwards them to local subscribers. Without Redis,
+publishes are delivered in-process only.
+"""
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Set
+
+import orjson
+
+from services.cache import get_redis, mark_redis_unavailable, psubscribe_forever
+
+CHANNEL_PATTERN = "exam:*:risk"
+SUBSCRIBER_BACKLOG = 1000  # updates buffered per dashboard before it starts dropping them
+
+
+def risk_channel(exam_id) -> str:
+    return f"exam:{exam_id}:risk"
+
+
+class LiveFeed:
+    """Process-wide pub/sub bridge between penalty updates and dashboard streams."""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._listener: Optional[asyncio.Task] = None
+
+    async def publish(self, exam_id, update: dict):
+        """Broadcast one attempt's new trust_score/risk_level to the exam's dashboards."""
+        client = get_redis()
+        if client is not None:
+            try:
+                await client.publish(risk_channel(exam_id), orjson.dumps(update))
+                return
+            except Exception as e:
+                mark_redis_unavailable(e)
+        self._fan_out(str(exam_id), update)
+
+    @asynccontextmanager
+    async def subscribe(self, exam_id):
+        """Yield a queue receiving the exam's updates until the block exits."""
+        exam_id = str(exam_id)
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_BACKLOG)
+        self._subscribers[exam_id].add(queue)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(psubscribe_forever(CHANNEL_PATTERN, self._on_message))
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(exam_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[exam_id]
+
+    async def stop(self):
+        """Cancel the Redis listener (called from the app lifespan)."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def _fan_out(self, exam_id: str, update: dict):
+        for queue in self._subscribers.get(exam_id, ()):
+            try:
+                queue.put_nowait(update)
+            except asyncio.QueueFull:
+                pass  # stalled dashboard; it resyncs from a fresh snapshot on reconnect
+
+    async def _on_message(self, channel: str, data: bytes):
+        self._fan_out(channel.split(":")[1], orjson.loads(data))
+
+
+live_feed = LiveFeed()
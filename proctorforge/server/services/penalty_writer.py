@@ -0,0 +1,124 @@
+"""
+ProctorForge AI - Batched Trust Penalties
+Heartbeat violations are queued here instead of updating the attempt row per ping;
+a background loop coalesces them per attempt and applies one UPDATE each.
+"""
+import asyncio
+from collections import defaultdict
+from typing import Awaitable, Callable, Optional
+from uuid import UUID
+
+from sqlalchemy import insert, update, case
+
+import database
+from config import settings
+from models.attempt import Attempt
+from models.event import Event
+
+
+def _risk_level(score):
+    """SQL CASE mirroring the risk bands used by the monitoring handlers."""
+    return case(
+        (score < 40, "critical"),
+        (score < 60, "high"),
+        (score < 80, "medium"),
+        else_="low",
+    )
+
+
+def penalty_update(attempt_id: UUID, user_id: UUID, penalty: float):
+    """Atomic UPDATE ... RETURNING that takes `penalty` off the attempt's trust score
+    (floored at 0) and re-derives its risk level, only if `user_id` owns the attempt."""
+    new_score = case(
+        (Attempt.trust_score - penalty < 0, 0.0),
+        else_=Attempt.trust_score - penalty,
+    )
+    return (
+        update(Attempt)
+        .where(Attempt.id == attempt_id, Attempt.user_id == user_id)
+        .values(trust_score=new_score, risk_level=_risk_level(new_score))
+        .returning(
+            Attempt.id, Attempt.user_id, Attempt.exam_id,
+            Attempt.trust_score, Attempt.risk_level,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+class PenaltyWriter:
+    """Coalesces trust-score penalties per (attempt, owner) and flushes them periodically."""
+
+    def __init__(self, flush_interval: float = 1.0):
+        self.flush_interval = flush_interval
+        # Called once per updated attempt: (row, violation_count); row has id, user_id,
+        # exam_id, trust_score, risk_level
+        self.on_applied: Optional[Callable[..., Awaitable[None]]] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the flush loop (called from the app lifespan)."""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Apply anything still queued and stop the flush loop."""
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+    def enqueue(self, attempt_id: UUID, user_id: UUID, penalty: float, violations: int, events: list = ()):
+        """Queue a penalty plus any Event rows that go with it; both only apply
+        if `user_id` owns the attempt."""
+        if self._queue is None:
+            raise RuntimeError("PenaltyWriter not started.")
+        self._queue.put_nowait((attempt_id, user_id, penalty, violations, list(events)))
+
+    async def _flush_loop(self):
+        stopping = False
+        while not stopping:
+            await asyncio.sleep(self.flush_interval)
+            pending = defaultdict(lambda: [0.0, 0, []])
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    continue
+                attempt_id, user_id, penalty, violations, events = item
+                totals = pending[(attempt_id, user_id)]
+                totals[0] += penalty
+                totals[1] += violations
+                totals[2].extend(events)
+            if pending:
+                await self._apply(pending)
+
+    async def _apply(self, pending: dict):
+        updated = []
+        event_rows = []
+        try:
+            async with database.AsyncSessionLocal() as session:
+                for (attempt_id, user_id), (penalty, violations, events) in pending.items():
+                    result = await session.execute(penalty_update(attempt_id, user_id, penalty))
+                    row = result.one_or_none()
+                    if row is not None:
+                        updated.append((row, violations))
+                        event_rows.extend(events)
+                if event_rows:
+                    await session.execute(insert(Event), event_rows)
+                await session.commit()
+        except Exception as e:
+            print(f"[PENALTY WRITER ERROR] {type(e).__name__}: {str(e)[:200]} ({len(pending)} attempts skipped)")
+            return
+        if self.on_applied is None:
+            return
+        for row, violations in updated:
+            try:
+                await self.on_applied(row, violations)
+            except Exception as e:
+                print(f"[PENALTY WRITER ERROR] on_applied: {type(e).__name__}: {str(e)[:200]}")
+
+
+penalty_writer = PenaltyWriter(flush_interval=settings.PENALTY_FLUSH_MS / 1000)
@@ -3,16 +3,54 @@ ProctorForge AI - Secure Code Execution Sandbox
 Executes student code in isolated Docker containers with resource limits.
 Falls back to subprocess execution (with restrictions) if Docker is unavailable.
 """
+import ast
 import asyncio
+import multiprocessing
 import subprocess
 import sys
 import tempfile
 import os
 import json
-import uuid
+import secrets
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
 from typing import Optional
+
+import orjson
+
 from config import settings
 
+try:
+    import resource  # POSIX only
+except ImportError:
+    resource = None
+
+TEST_CASE_TIMEOUT = 10  # seconds per test case
+HARNESS_TIMEOUT_MARGIN = 10  # seconds on top of the per-case budget for a batched run
+OUTPUT_LIMIT = 65536  # bytes of stdout/stderr decoded per execution (as in the harness)
+# Sent as `python3 -c` source; runs all of a submission's test cases in one sandbox
+HARNESS_SOURCE = (Path(__file__).parent / "sandbox_harness.py").read_text()
+# `python3 -c` bootstrap that reads the submission from stdin (see _python_stdin) rather
+# than argv, where one argument is capped at 128 KiB. The excepthook drops the loader's
+# frame so tracebacks start in the submitted code, as they would under `-c`.
+PYTHON_LOADER = (
+    "import sys\n"
+    "sys.excepthook = lambda t, e, tb: sys.__excepthook__(t, e.with_traceback(tb.tb_next), tb.tb_next)\n"
+    "n = int(sys.stdin.buffer.readline())\n"
+    "code = compile(sys.stdin.buffer.read(n), '<string>', 'exec')\n"
+    "exec(code, {'__name__': '__main__', '__builtins__': __builtins__})\n"
+)
+
+
+def _decode_output(data: bytes, limit: Optional[int] = OUTPUT_LIMIT) -> str:
+    """Captured output, capped before decoding so a flood of output isn't decoded in full
+    (limit=None keeps all of it)."""
+    if limit is not None:
+        data = data[:limit]
+    return data.decode("utf-8", errors="replace")
+
 
 class SandboxResult:
     """Result of code execution."""
@@ -35,6 +73,29 @@ class SandboxResult:
         }
 
 
+def _python_stdin(code: str, stdin_data: str) -> bytes:
+    """stdin for PYTHON_LOADER: the code's byte length, a newline, the code, then the
+    program's own input, which it reads as usual once the loader has consumed the code."""
+    source = code.encode()
+    return b"%d\n" % len(source) + source + stdin_data.encode()
+
+
+async def _communicate(proc, stdin_data, timeout: float) -> tuple:
+    """proc.communicate() under a deadline. If the deadline passes (TimeoutError) or
+    the caller is cancelled, the process is killed and reaped before re-raising.
+    stdin_data may be str or already-encoded bytes."""
+    if isinstance(stdin_data, str):
+        stdin_data = stdin_data.encode()
+    try:
+        async with asyncio.timeout(timeout):
+            return await proc.communicate(input=stdin_data or None)
+    except BaseException:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        raise
+
+
 async def _check_docker_available() -> bool:
     """Check if Docker is available."""
     try:
@@ -43,41 +104,234 @@ async def _check_docker_available() -> bool:
             stdout=asyncio.subprocess.DEVNULL,
             stderr=asyncio.subprocess.DEVNULL,
         )
-        await asyncio.wait_for(proc.wait(), timeout=5)
+        await _communicate(proc, "", timeout=5)
         return proc.returncode == 0
     except Exception:
         return False
 
 
-async def execute_code_docker(code: str, language: str = "python",
-                               stdin_data: str = "", timeout: int = None) -> SandboxResult:
-    """Execute code inside a Docker container."""
-    timeout = timeout or settings.SANDBOX_TIMEOUT
-    container_name = f"pf-sandbox-{uuid.uuid4().hex[:12]}"
+DOCKER_CHECK_INTERVAL = 60.0  # seconds between `docker info` probes
+_docker_status = (float("-inf"), False)
 
-    # Language-specific commands
-    lang_config = {
-        "python": {"image": settings.SANDBOX_IMAGE, "cmd": ["python3", "-c", code]},
-        "javascript": {"image": "node:20-slim", "cmd": ["node", "-e", code]},
-    }
 
-    config = lang_config.get(language, lang_config["python"])
+async def _docker_available_cached() -> bool:
+    """`docker info` spawns a process; probe at most once per DOCKER_CHECK_INTERVAL."""
+    global _docker_status
+    checked_at, available = _docker_status
+    now = asyncio.get_running_loop().time()
+    if now - checked_at >= DOCKER_CHECK_INTERVAL:
+        available = await _check_docker_available()
+        _docker_status = (now, available)
+    return available
 
-    docker_cmd = [
-        "docker", "run", "--rm",
-        "--name", container_name,
+
+def _container_limits() -> list:
+    """`docker run` isolation flags shared by one-off and warm sandbox containers."""
+    return [
         "--network", "none",  # No network
         "--memory", settings.SANDBOX_MEMORY_LIMIT,
         "--cpus", str(settings.SANDBOX_CPU_LIMIT),
         "--pids-limit", "50",
         "--read-only",
         "--tmpfs", "/tmp:size=10m",
+        # No /dev/shm: --read-only would still leave Docker's writable 64 MB one in place
+        "--ipc", "none",
         "--security-opt", "no-new-privileges",
+    ]
+
+
+async def _docker(*args: str, timeout: float = 30) -> tuple:
+    """Run a short docker CLI command; returns (exit code, stdout)."""
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "docker", *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        stdout, _ = await _communicate(proc, "", timeout)
+    except OSError:
+        return 127, ""
+    except TimeoutError:
+        return 124, ""
+    return proc.returncode, stdout.decode("utf-8", errors="replace")
+
+
+_kill_tasks: set = set()
+
+
+def _kill_container(container_name: str):
+    """Fire-and-forget `docker kill`, so a timed-out request doesn't wait on the CLI."""
+    task = asyncio.create_task(_docker("kill", "--signal=KILL", container_name, timeout=10))
+    _kill_tasks.add(task)
+    task.add_done_callback(_kill_tasks.discard)
+
+
+def _rlimits(cpu_seconds: int, memory_bytes: Optional[int] = None):
+    """preexec_fn capping the child's CPU time (and address space), so the kernel
+    stops a busy loop even before the wall-clock timeout fires."""
+    def apply():
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+        if memory_bytes is not None:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    return apply
+
+
+class WarmContainers:
+    """Idle Python sandbox containers kept running (`tail -f /dev/null`), so an
+    execution is a `docker exec` rather than a full `docker run`.
+
+    A container serves one execution at a time. Afterwards every process it started
+    is killed and /tmp is wiped before the container is handed out again; after a
+    timeout or error the container is removed and replaced instead.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._idle: Optional[asyncio.Queue] = None
+        self._containers: set = set()
+        self._background: set = set()
+
+    async def start(self):
+        """Start the containers (called from SandboxPool.start when Docker is up)."""
+        if self._idle is not None or self.size <= 0:
+            return
+        self._idle = asyncio.Queue()
+        await asyncio.gather(*(self._spawn() for _ in range(self.size)))
+
+    async def stop(self):
+        """Remove every warm container."""
+        for task in list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        if self._containers:
+            await _docker("rm", "-f", *self._containers)
+        self._containers.clear()
+        self._idle = None
+
+    def acquire(self) -> Optional[str]:
+        """An idle container id, or None if all are busy (use a one-off container)."""
+        if self._idle is None:
+            return None
+        try:
+            return self._idle.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+
+    def release(self, container: str, reusable: bool):
+        """Return a container after use; cleanup runs in the background."""
+        task = asyncio.create_task(self._recycle(container, reusable))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _spawn(self):
+        code, stdout = await _docker(
+            "run", "-d", "--rm", *_container_limits(),
+            "--entrypoint", "tail", settings.SANDBOX_IMAGE, "-f", "/dev/null",
+        )
+        if code != 0:
+            print(f"[SANDBOX ERROR] could not start warm container (exit {code})")
+            return
+        container = stdout.strip()
+        self._containers.add(container)
+        if self._idle is not None:
+            self._idle.put_nowait(container)
+
+    async def _recycle(self, container: str, reusable: bool):
+        if reusable:
+            # kill -1 skips PID 1 (tail) and the shell itself. With --read-only and
+            # --ipc none, /tmp and the container's POSIX message queues (/dev/mqueue)
+            # are all the next submission could find left behind
+            code, _ = await _docker(
+                "exec", container, "sh", "-c",
+                "kill -9 -1; rm -rf /tmp/* /tmp/.[!.]* /dev/mqueue/*; true",
+                timeout=10,
+            )
+            if code == 0 and self._idle is not None:
+                self._idle.put_nowait(container)
+                return
+        self._containers.discard(container)
+        await _docker("rm", "-f", container)
+        if self._idle is not None:
+            await self._spawn()
+
+
+warm_containers = WarmContainers(
+    settings.SANDBOX_WARM_CONTAINERS if settings.SANDBOX_WARM_CONTAINERS >= 0
+    else settings.SANDBOX_MAX_CONCURRENCY or os.cpu_count() or 1
+)
+
+
+async def _execute_in_warm_container(container: str, code: str, stdin_data: str,
+                                     timeout: int, output_limit: Optional[int]) -> SandboxResult:
+    """Run Python code in a checked-out warm container and hand the container back."""
+    import time
+    start_time = time.time()
+    reusable = False
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "docker", "exec", "-i", container, "python3", "-c", PYTHON_LOADER,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await _communicate(proc, _python_stdin(code, stdin_data), timeout)
+        except TimeoutError:
+            # Killing the CLI leaves the process running in the container, which is discarded
+            return SandboxResult(
+                stderr="Execution timed out",
+                exit_code=124,
+                timed_out=True,
+                execution_time=timeout,
+            )
+        reusable = True
+        return SandboxResult(
+            stdout=_decode_output(stdout, output_limit),
+            stderr=_decode_output(stderr, output_limit),
+            exit_code=proc.returncode or 0,
+            execution_time=time.time() - start_time,
+        )
+    except Exception as e:
+        return SandboxResult(stderr=str(e), exit_code=1, execution_time=time.time() - start_time)
+    finally:
+        warm_containers.release(container, reusable)
+
+
+async def execute_code_docker(code: str, language: str = "python",
+                               stdin_data: str = "", timeout: int = None,
+                               output_limit: Optional[int] = OUTPUT_LIMIT) -> SandboxResult:
+    """Execute code inside a Docker container (a warm one for Python when available)."""
+    timeout = timeout or settings.SANDBOX_TIMEOUT
+    if language != "javascript":  # warm containers run the Python image
+        container = warm_containers.acquire()
+        if container is not None:
+            return await _execute_in_warm_container(container, code, stdin_data, timeout, output_limit)
+
+    container_name = f"pf-sandbox-{secrets.token_hex(6)}"
+
+    # Language-specific commands; Python code travels on stdin (see PYTHON_LOADER)
+    if language == "javascript":
+        config = {"image": "node:20-slim", "cmd": ["node", "-e", code]}
+    else:
+        config = {"image": settings.SANDBOX_IMAGE, "cmd": ["python3", "-c", PYTHON_LOADER]}
+        stdin_data = _python_stdin(code, stdin_data)
+
+    docker_cmd = [
+        "docker", "run", "--rm",
+        *(["-i"] if stdin_data else []),
+        "--name", container_name,
+        *_container_limits(),
+        # CPU-bound code is killed in-container; `docker kill` only backs up sleepers
+        "--ulimit", f"cpu={timeout}",
+        "--stop-signal", "SIGKILL",
+        # The sandbox image's entrypoint is `python3 -c`; run the command as given
+        "--entrypoint", config["cmd"][0],
         config["image"],
-    ] + config["cmd"]
+    ] + config["cmd"][1:]
 
     import time
     start_time = time.time()
+    finished = False
 
     try:
         proc = await asyncio.create_subprocess_exec(
@@ -87,29 +341,19 @@ async def execute_code_docker(code: str, language: str = "python",
             stderr=asyncio.subprocess.PIPE,
         )
 
-        stdout, stderr = await asyncio.wait_for(
-            proc.communicate(input=stdin_data.encode() if stdin_data else None),
-            timeout=timeout,
-        )
+        stdout, stderr = await _communicate(proc, stdin_data, timeout)
+        finished = True
 
         execution_time = time.time() - start_time
 
         return SandboxResult(
-            stdout=stdout.decode("utf-8", errors="replace"),
-            stderr=stderr.decode("utf-8", errors="replace"),
+            stdout=_decode_output(stdout, output_limit),
+            stderr=_decode_output(stderr, output_limit),
             exit_code=proc.returncode or 0,
             execution_time=execution_time,
         )
 
-    except asyncio.TimeoutError:
-        # Kill the container
-        kill_proc = await asyncio.create_subprocess_exec(
-            "docker", "kill", container_name,
-            stdout=asyncio.subprocess.DEVNULL,
-            stderr=asyncio.subprocess.DEVNULL,
-        )
-        await kill_proc.wait()
-
+    except TimeoutError:
         return SandboxResult(
             stderr="Execution timed out",
             exit_code=124,
@@ -120,35 +364,120 @@ async def execute_code_docker(code: str, language: str = "python",
     except Exception as e:
         return SandboxResult(stderr=str(e), exit_code=1, execution_time=time.time() - start_time)
 
+    finally:
+        if not finished:
+            # Killing the CLI doesn't stop the container (timeout or cancellation)
+            _kill_container(container_name)
+
+
+# Subprocess fallback restrictions (no container isolation there)
+BLOCKED_MODULES = frozenset({
+    "os", "subprocess", "sys", "shutil", "socket", "http", "urllib", "requests",
+})
+# Referenced at all, not just called, so `f = eval; f(...)` is caught too
+BLOCKED_NAMES = frozenset({"eval", "exec", "open", "__import__", "__builtins__"})
+# Attribute walks used to climb from any object back to builtins
+BLOCKED_ATTRIBUTES = frozenset({
+    "__subclasses__", "__globals__", "__builtins__", "__bases__", "__base__", "__mro__",
+})
+# JavaScript isn't parsed here; it keeps the original substring screen
+JS_DANGEROUS_PATTERNS = (
+    "import os", "import subprocess", "import sys", "import shutil",
+    "__import__", "eval(", "exec(", "open(", "import socket",
+    "import http", "import urllib", "import requests",
+)
+
+
+def _blocked_python_construct(code: str) -> Optional[str]:
+    """First disallowed import/name/attribute in the code, found on its syntax tree
+    (so comments and string literals don't count), or None."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None  # the interpreter reports it
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                module = alias.name.partition(".")[0]
+                if module in BLOCKED_MODULES:
+                    return f"import {module}"
+        elif isinstance(node, ast.ImportFrom):
+            module = (node.module or "").partition(".")[0]
+            if node.level == 0 and module in BLOCKED_MODULES:
+                return f"import {module}"
+        elif isinstance(node, ast.Name):
+            if node.id in BLOCKED_NAMES:
+                return node.id
+        elif isinstance(node, ast.Attribute):
+            if node.attr in BLOCKED_ATTRIBUTES:
+                return f".{node.attr}"
+    return None
+
+
+_fallback_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _fallback_executor() -> ProcessPoolExecutor:
+    """Worker processes for the non-strict fallback (SANDBOX_FALLBACK_STRICT=false).
+    Each starts once; an execution forks a child from it (sandbox_harness.run_case)
+    instead of starting an interpreter, and only that child runs the code."""
+    global _fallback_pool
+    if _fallback_pool is None:
+        from services import sandbox_harness
+        _fallback_pool = ProcessPoolExecutor(
+            max_workers=settings.SANDBOX_MAX_CONCURRENCY or os.cpu_count() or 1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=sandbox_harness.seal,
+        )
+    return _fallback_pool
+
+
+def _shutdown_fallback_pool():
+    global _fallback_pool
+    if _fallback_pool is not None:
+        _fallback_pool.shutdown(wait=False, cancel_futures=True)
+        _fallback_pool = None
+
+
+async def _execute_in_fallback_pool(code: str, stdin_data: str, timeout: int) -> SandboxResult:
+    from services import sandbox_harness
+    try:
+        case = await asyncio.get_running_loop().run_in_executor(
+            _fallback_executor(), sandbox_harness.run_case, code, stdin_data, timeout,
+        )
+    except BrokenProcessPool as e:
+        _shutdown_fallback_pool()  # a worker died; the next execution starts a fresh pool
+        return SandboxResult(stderr=str(e), exit_code=1)
+    return SandboxResult(**case)
+
 
 async def execute_code_subprocess(code: str, language: str = "python",
-                                    stdin_data: str = "", timeout: int = None) -> SandboxResult:
+                                    stdin_data: str = "", timeout: int = None,
+                                    output_limit: Optional[int] = OUTPUT_LIMIT) -> SandboxResult:
     """Fallback: Execute code in a subprocess with basic restrictions."""
     timeout = timeout or settings.SANDBOX_TIMEOUT
 
-    # Blocked modules/patterns for safety
-    dangerous_patterns = [
-        "import os", "import subprocess", "import sys", "import shutil",
-        "__import__", "eval(", "exec(", "open(", "import socket",
-        "import http", "import urllib", "import requests",
-    ]
+    if language == "javascript":
+        blocked = next((p for p in JS_DANGEROUS_PATTERNS if p in code), None)
+    else:
+        blocked = _blocked_python_construct(code)
+    if blocked:
+        return SandboxResult(
+            stderr=f"Blocked: '{blocked}' is not allowed in sandbox mode",
+            exit_code=1,
+        )
 
-    for pattern in dangerous_patterns:
-        if pattern in code:
-            return SandboxResult(
-                stderr=f"Blocked: '{pattern}' is not allowed in sandbox mode",
-                exit_code=1,
-            )
+    if language != "javascript" and not settings.SANDBOX_FALLBACK_STRICT and resource is not None:
+        return await _execute_in_fallback_pool(code, stdin_data, timeout)
 
     import time
     start_time = time.time()
 
-    lang_cmd = {
-        "python": [sys.executable, "-c", code],
-        "javascript": ["node", "-e", code],
-    }
-
-    cmd = lang_cmd.get(language, lang_cmd["python"])
+    if language == "javascript":
+        cmd = ["node", "-e", code]
+    else:
+        cmd = [sys.executable, "-c", PYTHON_LOADER]
+        stdin_data = _python_stdin(code, stdin_data)
 
     try:
         proc = await asyncio.create_subprocess_exec(
@@ -157,53 +486,284 @@ async def execute_code_subprocess(code: str, language: str = "python",
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
             cwd=tempfile.gettempdir(),
+            preexec_fn=_rlimits(timeout) if resource is not None else None,
         )
 
-        stdout, stderr = await asyncio.wait_for(
-            proc.communicate(input=stdin_data.encode() if stdin_data else None),
-            timeout=timeout,
-        )
+        stdout, stderr = await _communicate(proc, stdin_data, timeout)
 
         execution_time = time.time() - start_time
 
         return SandboxResult(
-            stdout=stdout.decode("utf-8", errors="replace"),
-            stderr=stderr.decode("utf-8", errors="replace"),
+            stdout=_decode_output(stdout, output_limit),
+            stderr=_decode_output(stderr, output_limit),
             exit_code=proc.returncode or 0,
             execution_time=execution_time,
         )
 
-    except asyncio.TimeoutError:
-        proc.kill()
+    except TimeoutError:
         return SandboxResult(stderr="Execution timed out", exit_code=124, timed_out=True, execution_time=timeout)
 
     except Exception as e:
         return SandboxResult(stderr=str(e), exit_code=1, execution_time=time.time() - start_time)
 
 
-async def execute_code(code: str, language: str = "python",
-                       stdin_data: str = "", timeout: int = None) -> SandboxResult:
-    """Execute code using Docker if available, otherwise subprocess fallback."""
-    if await _check_docker_available():
-        return await execute_code_docker(code, language, stdin_data, timeout)
+BWRAP_PATH = shutil.which("bwrap")
+# Read-only host paths visible in the jail: interpreters and shared libraries only,
+# never the app directory (.env) or home directories
+JAIL_READONLY_PATHS = tuple(dict.fromkeys((
+    "/usr", "/bin", "/lib", "/lib64", "/etc/alternatives", "/etc/ld.so.cache",
+    sys.base_prefix,
+)))
+# The jailed process gets this environment, not the server's (which holds its secrets)
+JAIL_ENV = {"PATH": "/usr/local/bin:/usr/bin:/bin", "LANG": "C.UTF-8", "HOME": "/tmp"}
+_MEMORY_UNITS = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+
+def _use_bwrap() -> bool:
+    return settings.SANDBOX_BACKEND == "bwrap" and BWRAP_PATH is not None and resource is not None
+
+
+def _memory_limit_bytes() -> int:
+    """SANDBOX_MEMORY_LIMIT in Docker's notation ("256m", "1g") as bytes."""
+    limit = settings.SANDBOX_MEMORY_LIMIT.strip().lower().rstrip("b")
+    unit = _MEMORY_UNITS.get(limit[-1:])
+    return int(float(limit[:-1]) * unit) if unit else int(limit)
+
+
+async def execute_code_bwrap(code: str, language: str = "python",
+                             stdin_data: str = "", timeout: int = None,
+                             output_limit: Optional[int] = OUTPUT_LIMIT) -> SandboxResult:
+    """Execute code in a bubblewrap jail (SANDBOX_BACKEND=bwrap): fresh user/pid/net/ipc
+    namespaces, read-only interpreter paths, private /tmp, CPU and memory rlimits.
+    Spawning it costs milliseconds where `docker run` costs hundreds."""
+    timeout = timeout or settings.SANDBOX_TIMEOUT
+
+    if language == "javascript":
+        cmd = [shutil.which("node") or "node", "-e", code]
+        memory = None  # V8 reserves far more address space than it uses
     else:
-        return await execute_code_subprocess(code, language, stdin_data, timeout)
+        cmd = [os.path.realpath(sys.executable), "-c", PYTHON_LOADER]
+        stdin_data = _python_stdin(code, stdin_data)
+        memory = _memory_limit_bytes()
+
+    jail_cmd = [
+        BWRAP_PATH,
+        "--unshare-all",  # includes the network namespace: no network
+        "--die-with-parent",
+        "--new-session",
+        *(arg for path in JAIL_READONLY_PATHS for arg in ("--ro-bind-try", path, path)),
+        "--proc", "/proc",
+        "--dev", "/dev",
+        "--tmpfs", "/tmp",
+        "--chdir", "/tmp",
+        "--",
+    ] + cmd
 
+    import time
+    start_time = time.time()
+
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *jail_cmd,
+            stdin=asyncio.subprocess.PIPE if stdin_data else None,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=JAIL_ENV,
+            preexec_fn=_rlimits(timeout, memory),
+        )
+
+        # Killing bwrap takes the jailed process with it (--die-with-parent)
+        stdout, stderr = await _communicate(proc, stdin_data, timeout)
+
+        return SandboxResult(
+            stdout=_decode_output(stdout, output_limit),
+            stderr=_decode_output(stderr, output_limit),
+            exit_code=proc.returncode or 0,
+            execution_time=time.time() - start_time,
+        )
+
+    except TimeoutError:
+        return SandboxResult(stderr="Execution timed out", exit_code=124, timed_out=True, execution_time=timeout)
+
+    except Exception as e:
+        return SandboxResult(stderr=str(e), exit_code=1, execution_time=time.time() - start_time)
+
+
+async def _execute_direct(code: str, language: str = "python",
+                          stdin_data: str = "", timeout: int = None,
+                          output_limit: Optional[int] = OUTPUT_LIMIT) -> SandboxResult:
+    """Execute code using bubblewrap if configured, else Docker if available,
+    otherwise the subprocess fallback."""
+    if _use_bwrap():
+        return await execute_code_bwrap(code, language, stdin_data, timeout, output_limit)
+    if await _docker_available_cached():
+        return await execute_code_docker(code, language, stdin_data, timeout, output_limit)
+    else:
+        return await execute_code_subprocess(code, language, stdin_data, timeout, output_limit)
+
+
+class SandboxPool:
+    """Fixed set of long-lived worker tasks draining a queue of sandbox jobs.
+
+    Python jobs run in a warm container that is scrubbed between uses (see
+    WarmContainers), anything else in a fresh container/process; the pool bounds how many run at once and keeps the Docker probe and
+    job dispatch off the request path.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        """Probe Docker once, warm up containers and start the workers (called from
+        the app lifespan)."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        if not _use_bwrap() and await _docker_available_cached():
+            await warm_containers.start()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Let queued jobs finish, then stop the workers."""
+        if not self._tasks:
+            return
+        for _ in self._tasks:
+            self._queue.put_nowait(None)
+        await asyncio.gather(*self._tasks)
+        self._tasks = []
+        await warm_containers.stop()
+        _shutdown_fallback_pool()
+
+    async def submit(self, code: str, language: str = "python",
+                     stdin_data: str = "", timeout: int = None,
+                     output_limit: Optional[int] = OUTPUT_LIMIT) -> SandboxResult:
+        """Queue one execution and wait for its result."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((future, (code, language, stdin_data, timeout, output_limit)))
+        return await future
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            if job is None:
+                return
+            future, args = job
+            if future.cancelled():
+                continue
+            try:
+                result = await _execute_direct(*args)
+            except Exception as e:
+                result = SandboxResult(stderr=str(e), exit_code=1)
+            if not future.done():
+                future.set_result(result)
+
+
+sandbox_pool = SandboxPool(workers=settings.SANDBOX_MAX_CONCURRENCY or os.cpu_count() or 1)
+
+
+async def execute_code(code: str, language: str = "python",
+                       stdin_data: str = "", timeout: int = None,
+                       output_limit: Optional[int] = OUTPUT_LIMIT) -> SandboxResult:
+    """Execute code on the sandbox worker pool (directly if the pool isn't running).
+    stdout/stderr are capped at output_limit bytes each (None: uncapped)."""
+    if sandbox_pool.running:
+        return await sandbox_pool.submit(code, language, stdin_data, timeout, output_limit)
+    return await _execute_direct(code, language, stdin_data, timeout, output_limit)
+
+
+def _expected_output(test_case: dict) -> str:
+    return test_case.get("expected_output", "").strip()
+
+
+def _case_passed(result: SandboxResult, expected: str, actual: str) -> bool:
+    return result.exit_code == 0 and not result.timed_out and actual == expected
+
+
+async def _run_batched(code: str, test_cases: list) -> list:
+    """Run every test case in one sandbox execution through the fork-per-case
+    harness (services/sandbox_harness.py); returns one SandboxResult per case."""
+    job = orjson.dumps({
+        "code": code,
+        "cases": [tc.get("input", "") for tc in test_cases],
+        "timeout": TEST_CASE_TIMEOUT,
+    }).decode()
+    # Uncapped: the result JSON holds every case's output; each case is capped below
+    run = await execute_code(
+        HARNESS_SOURCE, "python", stdin_data=job,
+        timeout=TEST_CASE_TIMEOUT * len(test_cases) + HARNESS_TIMEOUT_MARGIN,
+        output_limit=None,
+    )
+    try:
+        cases = orjson.loads(run.stdout)
+        if len(cases) == len(test_cases):
+            return [
+                SandboxResult(**{**case, "stdout": case["stdout"][:OUTPUT_LIMIT],
+                                 "stderr": case["stderr"][:OUTPUT_LIMIT]})
+                for case in cases
+            ]
+    except (orjson.JSONDecodeError, TypeError):
+        pass
+    # The harness itself died (or was killed): every case fails with its error
+    failed = SandboxResult(
+        stderr=run.stderr or "Sandbox harness failed", exit_code=run.exit_code or 1,
+        timed_out=run.timed_out, execution_time=run.execution_time,
+    )
+    return [failed] * len(test_cases)
+
+
+async def run_test_cases(code: str, test_cases: list, language: str = "python",
+                         fail_fast: bool = False) -> dict:
+    """Run code against a list of test cases and return results.
+
+    fail_fast stops at the first failing case (for feedback runs, not grading):
+    cases that never ran are reported with "skipped": True and count as failed.
+    """
+    if fail_fast:
+        # One case at a time, stopping at the first failure; None marks the rest skipped
+        executions = [None] * len(test_cases)
+        for i, tc in enumerate(test_cases):
+            result = executions[i] = await execute_code(
+                code, language, stdin_data=tc.get("input", ""), timeout=TEST_CASE_TIMEOUT
+            )
+            if not _case_passed(result, _expected_output(tc), result.stdout.strip()):
+                break
+    elif language == "python" and test_cases and (_use_bwrap() or await _docker_available_cached()):
+        # One container run for the whole submission instead of one per case
+        executions = await _run_batched(code, test_cases)
+    else:
+        # Test cases are independent, so latency is the slowest case rather than the sum
+        executions = await asyncio.gather(*(
+            execute_code(code, language, stdin_data=tc.get("input", ""), timeout=TEST_CASE_TIMEOUT)
+            for tc in test_cases
+        ))
 
-async def run_test_cases(code: str, test_cases: list, language: str = "python") -> dict:
-    """Run code against a list of test cases and return results."""
     results = []
     passed = 0
     total = len(test_cases)
 
-    for i, tc in enumerate(test_cases):
-        stdin_data = tc.get("input", "")
-        expected = tc.get("expected_output", "").strip()
-
-        result = await execute_code(code, language, stdin_data=stdin_data, timeout=10)
+    for i, (tc, result) in enumerate(zip(test_cases, executions)):
+        expected = _expected_output(tc)
+        if result is None:
+            results.append({
+                "test_case": i + 1,
+                "passed": False,
+                "skipped": True,
+                "expected": expected,
+                "actual": None,
+                "stderr": None,
+                "timed_out": False,
+                "execution_time": 0.0,
+            })
+            continue
         actual = result.stdout.strip()
 
-        test_passed = actual == expected and result.exit_code == 0 and not result.timed_out
+        test_passed = _case_passed(result, expected, actual)
 
         if test_passed:
             passed += 1
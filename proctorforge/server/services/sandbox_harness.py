@@ -0,0 +1,119 @@
+"""
+ProctorForge AI - Sandbox Test Harness
+Runs inside the sandbox (sent as `python3 -c` source, so standard library only).
+Reads {"code", "cases": [stdin, ...], "timeout"} as JSON on stdin and runs the
+code once per case in a forked child with its own stdin/stdout/stderr, then
+prints the per-case results as a JSON list.
+Forking from one interpreter replaces a container start and an interpreter start
+per test case, while each case still starts from clean process state.
+The non-strict subprocess fallback also calls run_case from its worker processes.
+"""
+import ctypes
+import json
+import os
+import resource
+import signal
+import sys
+import tempfile
+import time
+import traceback
+
+OUTPUT_LIMIT = 65536  # bytes of stdout/stderr kept per case
+POLL_INTERVAL = 0.005  # seconds between child status checks
+PR_SET_DUMPABLE = 4
+
+
+def seal():
+    """Make this process non-dumpable: its /proc/<pid>/fd becomes root-owned, so the
+    code under test can't reach the results pipe (fd 1) through it."""
+    try:
+        ctypes.CDLL(None).prctl(PR_SET_DUMPABLE, 0, 0, 0, 0)
+    except (OSError, AttributeError):
+        pass
+
+
+def _run_child(code: str, files: list, timeout: int):
+    """In the forked child: point fds 0-2 at the case's files and run the code."""
+    exit_code = 0
+    try:
+        for fd, f in enumerate(files):
+            os.dup2(f.fileno(), fd)
+        # Keep only fds 0-2 (a fallback pool worker holds its pipes to the server)
+        os.closerange(3, os.sysconf("SC_OPEN_MAX"))
+        sys.stdin = open(0, "r", closefd=False)
+        sys.stdout = open(1, "w", closefd=False)
+        sys.stderr = open(2, "w", closefd=False)
+        resource.setrlimit(resource.RLIMIT_CPU, (timeout, timeout))
+        exec(compile(code, "<string>", "exec"), {"__name__": "__main__", "__builtins__": __builtins__})
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            exit_code = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException as e:
+        # Skip the harness's own frame so the traceback starts in the submitted code
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        exit_code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(exit_code)
+
+
+def _read(f) -> str:
+    f.seek(0)
+    return f.read(OUTPUT_LIMIT).decode("utf-8", errors="replace")
+
+
+def run_case(code: str, stdin: str, timeout: int) -> dict:
+    files = [tempfile.TemporaryFile() for _ in range(3)]  # stdin, stdout, stderr
+    files[0].write(stdin.encode())
+    files[0].seek(0)
+
+    start = time.monotonic()
+    pid = os.fork()
+    if pid == 0:
+        _run_child(code, files, timeout)
+
+    timed_out = False
+    while True:
+        done, status = os.waitpid(pid, os.WNOHANG)
+        if done:
+            break
+        if time.monotonic() - start >= timeout:
+            os.kill(pid, signal.SIGKILL)
+            _, status = os.waitpid(pid, 0)
+            timed_out = True
+            break
+        time.sleep(POLL_INTERVAL)
+    elapsed = time.monotonic() - start
+
+    if os.WIFEXITED(status):
+        exit_code = os.WEXITSTATUS(status)
+    else:
+        exit_code = 128 + os.WTERMSIG(status)
+    result = {
+        "stdout": _read(files[1]),
+        "stderr": "Execution timed out" if timed_out else _read(files[2]),
+        "exit_code": 124 if timed_out else exit_code,
+        "timed_out": timed_out,
+        "execution_time": elapsed,
+    }
+    for f in files:
+        f.close()
+    return result
+
+
+def main():
+    seal()
+    job = json.loads(sys.stdin.read())
+    results = [run_case(job["code"], stdin, job["timeout"]) for stdin in job["cases"]]
+    sys.stdout.write(json.dumps(results))
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+ProctorForge AI - Live Session Store
+Heartbeat timestamps (epoch seconds) and per-attempt session state, kept in
+Redis so every worker sees the same view. Falls back to process-local dicts while Redis is
+unavailable (fine for a single-worker dev server); heartbeat gaps that span such a
+fallback window aren't reported, since the beats in it were spread over local stores.
+"""
+import time
+from collections import Counter, OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from services.cache import aioredis, get_redis, mark_redis_unavailable
+
+# Abandoned attempts drop out of Redis (and the local fallback) after this long
+SESSION_TTL = 6 * 3600  # seconds
+# Epoch seconds at which a worker last came back to Redis from the local fallback.
+# Heartbeats in between went to process-local stores, so a stored beat older than
+# this says nothing about the gap
+FALLBACK_UNTIL_KEY = "hb:fallback_until"
+
+
+@dataclass(slots=True)
+class SessionState:
+    paused: bool = False
+    violations: int = 0
+    last_camera_event: Optional[float] = None
+    last_audio_event: Optional[float] = None
+
+
+# Local fallback, ordered oldest heartbeat first so stale attempts are evicted from the front
+# Keyed by UUID (16-byte int hash); strings are only built for Redis keys
+_local_heartbeats: "OrderedDict[UUID, float]" = OrderedDict()
+_local_states: Dict[UUID, SessionState] = {}
+_local_event_counts: Dict[UUID, Counter] = {}
+# attempt -> event_type -> (window expiry on time.monotonic(), id of the event holding it)
+_local_event_windows: Dict[UUID, Dict[str, Tuple[float, UUID]]] = {}
+# Set once this process answers a heartbeat locally; cleared after recording its end in Redis
+_in_fallback = False
+
+
+def _mark_unavailable(e: Exception) -> None:
+    global _in_fallback
+    _in_fallback = True
+    mark_redis_unavailable(e, "state")
+
+
+def _hb_key(attempt_id: UUID) -> str:
+    return f"hb:{attempt_id}"
+
+
+def _state_key(attempt_id: UUID) -> str:
+    return f"session:{attempt_id}"
+
+
+def _counts_key(attempt_id: UUID) -> str:
+    return f"event_counts:{attempt_id}"
+
+
+def _window_key(attempt_id: UUID, event_type: str) -> str:
+    return f"event_window:{attempt_id}:{event_type}"
+
+
+def _evict_stale_local(now: float) -> None:
+    cutoff = now - SESSION_TTL
+    while _local_heartbeats:
+        attempt_id, last_beat = next(iter(_local_heartbeats.items()))
+        if last_beat >= cutoff:
+            break
+        del _local_heartbeats[attempt_id]
+        _local_states.pop(attempt_id, None)
+        _local_event_counts.pop(attempt_id, None)
+        _local_event_windows.pop(attempt_id, None)
+
+
+def _parse_ts(value) -> Optional[float]:
+    return None if value is None else float(value)
+
+
+def _decode_state(raw: dict) -> dict:
+    if not raw:
+        return {}
+    raw = {k.decode() if isinstance(k, bytes) else k: v for k, v in raw.items()}
+    return asdict(SessionState(
+        paused=raw.get("paused") in (b"1", "1"),
+        violations=int(raw.get("violations") or 0),
+    ))
+
+
+def _decode_counts(raw: dict) -> Dict[str, int]:
+    return {(k.decode() if isinstance(k, bytes) else k): int(v) for k, v in raw.items()}
+
+
+async def record_heartbeat(attempt_id: UUID, now: float) -> Tuple[Optional[float], bool]:
+    """Store `now` (epoch seconds) as the attempt's latest heartbeat and make sure its
+    session state exists. Returns (previous heartbeat, paused); the previous heartbeat
+    is None when there is none or it can't be trusted to measure a gap (it predates
+    a local-fallback window)."""
+    global _in_fallback
+    client = get_redis("state")
+    if client is not None:
+        state_key = _state_key(attempt_id)
+        recovering = _in_fallback
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                if recovering:
+                    pipe.set(FALLBACK_UNTIL_KEY, repr(now), ex=SESSION_TTL)
+                pipe.set(_hb_key(attempt_id), repr(now), ex=SESSION_TTL, get=True)
+                pipe.hsetnx(state_key, "paused", 0)
+                pipe.hsetnx(state_key, "violations", 0)
+                pipe.expire(state_key, SESSION_TTL)
+                pipe.hget(state_key, "paused")
+                pipe.get(FALLBACK_UNTIL_KEY)
+                *_, previous, _, _, _, paused, fallback_until = await pipe.execute()
+            _in_fallback = False
+            previous, fallback_until = _parse_ts(previous), _parse_ts(fallback_until)
+            if previous is not None and fallback_until is not None and previous < fallback_until:
+                previous = None
+            return previous, paused in (b"1", "1")
+        except Exception as e:
+            _mark_unavailable(e)
+
+    previous = _local_heartbeats.get(attempt_id)
+    _local_heartbeats[attempt_id] = now
+    _local_heartbeats.move_to_end(attempt_id)
+    _evict_stale_local(now)
+    state = _local_states.get(attempt_id)
+    if state is None:
+        state = _local_states[attempt_id] = SessionState()
+    if aioredis is not None:
+        # Redis is down, not absent: the other workers hold some of this attempt's beats,
+        # so the local view can't tell a missed heartbeat from one served elsewhere
+        previous = None
+    return previous, state.paused
+
+
+async def get_heartbeats(attempt_ids: List[UUID]) -> Dict[UUID, float]:
+    """Latest heartbeat per attempt (attempts that never pinged are omitted), in one MGET."""
+    if not attempt_ids:
+        return {}
+    client = get_redis("state")
+    if client is not None:
+        try:
+            values = await client.mget([_hb_key(a) for a in attempt_ids])
+            return {a: _parse_ts(v) for a, v in zip(attempt_ids, values) if v is not None}
+        except Exception as e:
+            _mark_unavailable(e)
+    return {a: _local_heartbeats[a] for a in attempt_ids if a in _local_heartbeats}
+
+
+async def get_session_state(attempt_id: UUID) -> dict:
+    """Session state for the attempt, or {} before its first heartbeat."""
+    client = get_redis("state")
+    if client is not None:
+        try:
+            return _decode_state(await client.hgetall(_state_key(attempt_id)))
+        except Exception as e:
+            _mark_unavailable(e)
+    state = _local_states.get(attempt_id)
+    return asdict(state) if state is not None else {}
+
+
+async def add_violations(attempt_id: UUID, count: int) -> None:
+    """Add `count` to the attempt's violation counter (no-op before its first heartbeat)."""
+    client = get_redis("state")
+    if client is not None:
+        state_key = _state_key(attempt_id)
+        try:
+            if await client.exists(state_key):
+                await client.hincrby(state_key, "violations", count)
+            return
+        except Exception as e:
+            _mark_unavailable(e)
+    state = _local_states.get(attempt_id)
+    if state is not None:
+        state.violations += count
+
+
+async def count_event(attempt_id: UUID, event_type: str) -> None:
+    """Count an event that isn't stored as a row (e.g. face_detected keepalives)."""
+    client = get_redis("state")
+    if client is not None:
+        key = _counts_key(attempt_id)
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.hincrby(key, event_type, 1)
+                pipe.expire(key, SESSION_TTL)
+                await pipe.execute()
+            return
+        except Exception as e:
+            _mark_unavailable(e)
+    _local_event_counts.setdefault(attempt_id, Counter())[event_type] += 1
+
+
+async def claim_event_window(attempt_id: UUID, event_type: str, event_id: UUID, window_ms: int) -> Optional[UUID]:
+    """Open a `window_ms` suppression window for (attempt, event_type) held by `event_id`.
+    Returns None if it opened (store the event), or the id of the event already
+    holding an open window (fold this one into it)."""
+    client = get_redis("state")
+    if client is not None:
+        key = _window_key(attempt_id, event_type)
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.set(key, str(event_id), px=window_ms, nx=True)
+                pipe.get(key)
+                opened, holder = await pipe.execute()
+            if opened or holder is None:
+                return None
+            return UUID(holder.decode() if isinstance(holder, bytes) else holder)
+        except Exception as e:
+            _mark_unavailable(e)
+
+    now = time.monotonic()
+    windows = _local_event_windows.setdefault(attempt_id, {})
+    expires, holder = windows.get(event_type, (0.0, None))
+    if now < expires:
+        return holder
+    windows[event_type] = (now + window_ms / 1000, event_id)
+    return None
+
+
+async def get_status(attempt_id: UUID) -> Tuple[dict, Dict[str, int], Optional[float]]:
+    """(session state, event counts, last heartbeat) for the status view, in one pipeline."""
+    client = get_redis("state")
+    if client is not None:
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.hgetall(_state_key(attempt_id))
+                pipe.hgetall(_counts_key(attempt_id))
+                pipe.get(_hb_key(attempt_id))
+                state, counts, heartbeat = await pipe.execute()
+            return _decode_state(state), _decode_counts(counts), _parse_ts(heartbeat)
+        except Exception as e:
+            _mark_unavailable(e)
+    state = _local_states.get(attempt_id)
+    return (
+        asdict(state) if state is not None else {},
+        dict(_local_event_counts.get(attempt_id, {})),
+        _local_heartbeats.get(attempt_id),
+    )
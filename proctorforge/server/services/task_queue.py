@@ -0,0 +1,153 @@
+"""
+ProctorForge AI - Durable Task Queue
+Jobs are appended to a Redis stream and consumed by `python worker.py`, so slow
+work (AI analysis) survives web-worker restarts and scales separately. Jobs left
+unacknowledged by a crashed worker are reclaimed by the next one. Without Redis
+(local development), or while no worker is consuming, jobs run in-process instead.
+"""
+import asyncio
+import os
+import socket
+import time
+from typing import Set
+
+import orjson
+
+from config import settings
+from services.cache import get_redis, mark_redis_unavailable
+from services.tasks import TASKS
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis is optional for local development
+    aioredis = None
+
+STREAM = "tasks"
+DEAD_LETTER_STREAM = "tasks:dead"
+GROUP = "workers"
+STREAM_MAXLEN = 10_000  # approximate cap on retained entries
+MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 1.0  # seconds; doubles after each failed attempt
+RECLAIM_IDLE_MS = 60_000  # a job pending this long belongs to a dead worker
+WORKER_IDLE_MS = 15_000  # a live worker re-reads at least every block_ms (5s)
+WORKER_CHECK_INTERVAL = 5.0  # seconds between consumer-group lookups
+
+_worker_check = {"at": float("-inf"), "active": False}
+
+# Keeps in-process fallback tasks referenced until they finish
+_local_jobs: Set[asyncio.Task] = set()
+
+
+async def enqueue(task_name: str, *args) -> None:
+    """Queue `task_name(*args)` for a worker. Arguments must be JSON-serialisable."""
+    if task_name not in TASKS:
+        raise ValueError(f"Unknown task: {task_name}")
+    client = get_redis()
+    if client is not None and await _worker_active(client):
+        try:
+            await client.xadd(
+                STREAM, {"task": task_name, "args": orjson.dumps(args)},
+                maxlen=STREAM_MAXLEN, approximate=True,
+            )
+            return
+        except Exception as e:
+            mark_redis_unavailable(e)
+    job = asyncio.create_task(run_task(task_name, list(args)))
+    _local_jobs.add(job)
+    job.add_done_callback(_local_jobs.discard)
+
+
+async def _worker_active(client) -> bool:
+    """Whether a worker has read the stream recently; otherwise queued jobs would just sit there."""
+    now = time.monotonic()
+    if now - _worker_check["at"] < WORKER_CHECK_INTERVAL:
+        return _worker_check["active"]
+    try:
+        consumers = await client.xinfo_consumers(STREAM, GROUP)
+    except Exception as e:
+        if "NOGROUP" not in str(e) and "no such key" not in str(e):
+            mark_redis_unavailable(e)
+            return False
+        consumers = []  # no worker has ever started
+    _worker_check["at"] = now
+    _worker_check["active"] = any(consumer["idle"] < WORKER_IDLE_MS for consumer in consumers)
+    return _worker_check["active"]
+
+
+async def run_task(task_name: str, args: list) -> bool:
+    """Run one job, retrying with exponential backoff. Returns False if every attempt failed."""
+    handler = TASKS.get(task_name)
+    if handler is None:
+        print(f"[TASK QUEUE ERROR] task={task_name} unknown task, dropped")
+        return False
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            await handler(*args)
+            return True
+        except Exception as e:
+            print(
+                f"[TASK QUEUE ERROR] task={task_name} attempt={attempt}/{MAX_ATTEMPTS} "
+                f"{type(e).__name__}: {str(e)[:200]}"
+            )
+            if attempt < MAX_ATTEMPTS:
+                await asyncio.sleep(RETRY_BASE_DELAY * 2 ** (attempt - 1))
+    return False
+
+
+async def _process(client, message_id, fields: dict):
+    fields = {k.decode() if isinstance(k, bytes) else k: v for k, v in fields.items()}
+    task_name = fields.get("task", b"")
+    task_name = task_name.decode() if isinstance(task_name, bytes) else task_name
+    try:
+        args = orjson.loads(fields.get("args") or b"[]")
+    except orjson.JSONDecodeError:
+        args = None
+    ok = args is not None and await run_task(task_name, args)
+    if not ok:
+        # Keep failed jobs around for inspection instead of retrying forever
+        await client.xadd(DEAD_LETTER_STREAM, fields, maxlen=STREAM_MAXLEN, approximate=True)
+    await client.xack(STREAM, GROUP, message_id)
+
+
+async def run_worker(consumer: str = "", batch_size: int = 10, block_ms: int = 5000):
+    """Consume jobs until cancelled (entry point: worker.py)."""
+    if aioredis is None:
+        raise RuntimeError("Task worker needs the redis package.")
+    # Own connection: the shared client's 200ms socket timeout would cut off blocking reads
+    client = aioredis.from_url(settings.REDIS_URL)
+    consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+    try:
+        await client.xgroup_create(STREAM, GROUP, id="0", mkstream=True)
+    except Exception as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+    print(f"✅ Task worker {consumer} consuming '{STREAM}'")
+    try:
+        while True:
+            try:
+                await _consume(client, consumer, batch_size, block_ms)
+            except Exception as e:
+                print(f"[TASK QUEUE ERROR] worker {type(e).__name__}: {str(e)[:200]}")
+                await asyncio.sleep(RETRY_BASE_DELAY)
+    finally:
+        await client.aclose()
+
+
+async def _consume(client, consumer: str, batch_size: int, block_ms: int):
+    # Take over jobs a crashed worker read but never acknowledged
+    _, claimed, *_ = await client.xautoclaim(
+        STREAM, GROUP, consumer, min_idle_time=RECLAIM_IDLE_MS, count=batch_size,
+    )
+    for message_id, fields in claimed:
+        if fields:  # entries trimmed from the stream come back empty
+            await _process(client, message_id, fields)
+        else:
+            await client.xack(STREAM, GROUP, message_id)
+
+    response = await client.xreadgroup(
+        GROUP, consumer, {STREAM: ">"}, count=batch_size, block=block_ms,
+    )
+    for _, messages in response or []:
+        for message_id, fields in messages:
+            await _process(client, message_id, fields)
@@ -0,0 +1,28 @@
+"""
+ProctorForge AI - Background Task Handlers
+Jobs executed by the task queue worker (services/task_queue.py). Handlers take
+only JSON-serialisable arguments and open their own database sessions if needed.
+"""
+from services.ai_twin import analyze_session
+
+
+async def analyze_high_risk_event(attempt_id: str, trigger_event: str):
+    """Run AI Twin analysis after a high-risk proctoring event."""
+    session_data = {
+        "attempt_id": attempt_id,
+        "trigger_event": trigger_event,
+        "tab_switches": 0,
+        "paste_size": 0,
+        "typing_speed": 50,
+        "gaze_deviation": 0.5 if "gaze" in trigger_event else 0,
+        "voice_match": True,
+        "backspace_ratio": 0.1,
+        "code_entropy": 3.0,
+    }
+    return await analyze_session(session_data)
+
+
+# Task name -> handler; names are what gets written to the queue
+TASKS = {
+    "analyze_high_risk_event": analyze_high_risk_event,
+}
@@ -26,6 +26,7 @@ CREATE TABLE IF NOT EXISTS users (
 );
 
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
+CREATE INDEX IF NOT EXISTS ix_users_class_lookup ON users(role, class_name, year, section);
 
 -- ================================================
 -- 2. EXAMS TABLE
@@ -48,12 +49,15 @@ CREATE TABLE IF NOT EXISTS exams (
     assigned_section VARCHAR(20)
 );
 
+CREATE INDEX IF NOT EXISTS ix_exams_created_by_created_at ON exams(created_by, created_at);
+CREATE INDEX IF NOT EXISTS ix_exams_class_lookup ON exams(assigned_class, assigned_year, assigned_section, status);
+
 -- ================================================
 -- 3. EXAM ASSIGNMENTS TABLE
 -- ================================================
 CREATE TABLE IF NOT EXISTS exam_assignments (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    exam_id UUID NOT NULL REFERENCES exams(id),
+    exam_id UUID NOT NULL REFERENCES exams(id) ON DELETE CASCADE,
     student_id UUID NOT NULL REFERENCES users(id),
     assigned_by UUID NOT NULL REFERENCES users(id),
     assigned_at TIMESTAMP DEFAULT NOW(),
@@ -62,13 +66,14 @@ CREATE TABLE IF NOT EXISTS exam_assignments (
 
 CREATE INDEX IF NOT EXISTS idx_exam_assignments_exam ON exam_assignments(exam_id);
 CREATE INDEX IF NOT EXISTS idx_exam_assignments_student ON exam_assignments(student_id);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_exam_assignments_exam_student ON exam_assignments(exam_id, student_id);
 
 -- ================================================
 -- 4. QUESTIONS TABLE
 -- ================================================
 CREATE TABLE IF NOT EXISTS questions (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    exam_id UUID NOT NULL REFERENCES exams(id),
+    exam_id UUID NOT NULL REFERENCES exams(id) ON DELETE CASCADE,
     type VARCHAR(20) NOT NULL DEFAULT 'mcq',        -- mcq, coding
     language VARCHAR(20),                            -- python, java, cpp, javascript
     question_text TEXT NOT NULL,
@@ -77,7 +82,8 @@ CREATE TABLE IF NOT EXISTS questions (
     test_cases JSONB,                                -- Coding: [{"input":"...","expected_output":"..."}]
     points INTEGER NOT NULL DEFAULT 10,
     order_index INTEGER NOT NULL DEFAULT 0,
-    created_at TIMESTAMP DEFAULT NOW()
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW()                -- bumped on every edit; versions cached test cases
 );
 
 CREATE INDEX IF NOT EXISTS idx_questions_exam ON questions(exam_id);
@@ -100,6 +106,9 @@ CREATE TABLE IF NOT EXISTS attempts (
 
 CREATE INDEX IF NOT EXISTS idx_attempts_user ON attempts(user_id);
 CREATE INDEX IF NOT EXISTS idx_attempts_exam ON attempts(exam_id);
+-- One active attempt per student per exam (target of the create_attempt upsert)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_attempts_active_user_exam
+    ON attempts(user_id, exam_id) WHERE status = 'active';
 
 -- ================================================
 -- 6. CODE SUBMISSIONS TABLE
@@ -130,6 +139,7 @@ CREATE TABLE IF NOT EXISTS live_code_logs (
 );
 
 CREATE INDEX IF NOT EXISTS idx_live_code_logs_attempt ON live_code_logs(attempt_id);
+CREATE INDEX IF NOT EXISTS ix_live_code_logs_attempt_timestamp ON live_code_logs(attempt_id, "timestamp");
 
 -- ================================================
 -- 8. TYPING METRICS TABLE
@@ -142,26 +152,42 @@ CREATE TABLE IF NOT EXISTS typing_metrics (
     paste_size INTEGER,
     idle_time FLOAT,
     entropy_score FLOAT,
-    burst_detected VARCHAR(10) DEFAULT 'false',
+    burst_detected BOOLEAN DEFAULT FALSE,
     recorded_at TIMESTAMP DEFAULT NOW()
 );
 
 CREATE INDEX IF NOT EXISTS idx_typing_metrics_attempt ON typing_metrics(attempt_id);
+CREATE INDEX IF NOT EXISTS ix_typing_metrics_attempt_recorded ON typing_metrics(attempt_id, recorded_at);
 
 -- ================================================
 -- 9. EVENTS TABLE (Security/Behavioral Events)
 -- ================================================
+-- Hash-partitioned by attempt so monitoring writes spread across 16 partitions
 CREATE TABLE IF NOT EXISTS events (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     attempt_id UUID NOT NULL REFERENCES attempts(id),
     event_type VARCHAR(50) NOT NULL,                 -- tab_switch, devtools, paste, gaze_deviation, etc.
     event_data JSONB,
     confidence_score FLOAT,
     hmac_signature TEXT,
-    created_at TIMESTAMP DEFAULT NOW()
-);
+    repeat_count INTEGER NOT NULL DEFAULT 1,         -- duplicates folded in by the suppression window
+    created_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (id, attempt_id)
+) PARTITION BY HASH (attempt_id);
+
+DO $$
+BEGIN
+    FOR i IN 0..15 LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS events_p%s PARTITION OF events FOR VALUES WITH (MODULUS 16, REMAINDER %s)',
+            i, i
+        );
+    END LOOP;
+END $$;
 
 CREATE INDEX IF NOT EXISTS idx_events_attempt ON events(attempt_id);
+CREATE INDEX IF NOT EXISTS ix_events_attempt_created ON events(attempt_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_events_data_gin ON events USING gin (event_data jsonb_path_ops);
 
 -- ================================================
 -- 10. AI INTERVENTIONS TABLE
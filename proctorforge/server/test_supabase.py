@@ -7,34 +7,40 @@ import sys
 sys.path.append(os.getcwd())
 
 from config import settings
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine
 import ssl
 
+# Built once: create_default_context() loads and parses the whole system CA bundle
+_SSL_CTX = ssl.create_default_context()
+_SSL_CTX.check_hostname = False
+_SSL_CTX.verify_mode = ssl.CERT_NONE
+
 async def test_conn():
     db_url = settings.DATABASE_URL
     print(f"Testing connection to: {db_url}")
     
-    ssl_context = ssl.create_default_context()
-    ssl_context.check_hostname = False
-    ssl_context.verify_mode = ssl.CERT_NONE
-    
     engine = create_async_engine(
         db_url,
-        echo=True,
+        echo=False,
+        pool_pre_ping=True,
         connect_args={
-            "ssl": ssl_context,
+            "ssl": _SSL_CTX,
             "prepared_statement_cache_size": 0,
+            "statement_cache_size": 0,  # asyncpg's own cache; both must be off behind PgBouncer
         },
     )
     
     try:
         async with engine.connect() as conn:
-            await conn.execute("SELECT 1")
+            await conn.execute(text("SELECT 1"))
             print("✅ CONNECTION SUCCESSFUL!")
     except Exception as e:
         print(f"❌ CONNECTION FAILED: {type(e).__name__}: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        await engine.dispose()
 
 if __name__ == "__main__":
     asyncio.run(test_conn())
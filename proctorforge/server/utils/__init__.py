@@ -1 +1,2 @@
-from utils.hmac import sign_event, verify_event  # noqa
+from utils.hmac import sign_event, verify_event, sign_payload, verify_payload  # noqa
+from utils.ttl_cache import TTLCache  # noqa
@@ -5,21 +5,53 @@ Signs and verifies event payloads for zero-trust event integrity.
 import hmac
 import hashlib
 import json
+from functools import lru_cache
 from config import settings
 
+# Keyed once at import; each signature copies this OpenSSL-backed state instead of
+# re-deriving the key pads. Signing is ~1-2us, so it stays on the event loop
+# (a thread hop would cost far more than the hash).
+_keyed_sha256 = hmac.new(settings.HMAC_SECRET_KEY.encode(), digestmod=hashlib.sha256)
+
+# Canonical payload form: byte-for-byte json.dumps(sort_keys=True, default=str), which
+# existing signatures depend on. A shared encoder skips json.dumps building one per call.
+_canonical_json = json.JSONEncoder(sort_keys=True, default=str).encode
+
+
+def _hexdigest(message: bytes) -> str:
+    mac = _keyed_sha256.copy()
+    mac.update(message)
+    return mac.hexdigest()
+
+
+@lru_cache(maxsize=4096)
+def _sign_canonical(payload: str) -> str:
+    """Server-side signatures repeat (the same event type for the same attempt),
+    so they're memoized on the canonical payload."""
+    return _hexdigest(payload.encode())
+
 
 def sign_event(event_data: dict) -> str:
     """Generate HMAC-SHA256 signature for an event payload."""
-    payload = json.dumps(event_data, sort_keys=True, default=str)
-    signature = hmac.new(
-        settings.HMAC_SECRET_KEY.encode(),
-        payload.encode(),
-        hashlib.sha256
-    ).hexdigest()
-    return signature
+    return _sign_canonical(_canonical_json(event_data))
 
 
 def verify_event(event_data: dict, signature: str) -> bool:
-    """Verify HMAC-SHA256 signature of an event payload."""
-    expected = sign_event(event_data)
-    return hmac.compare_digest(expected, signature)
+    """
+    Verify HMAC-SHA256 signature of an event payload.
+    Always a constant-time comparison; compared as bytes so a non-ASCII
+    signature is rejected instead of raising TypeError.
+    """
+    # Not memoized: client payloads (e.g. keystroke batches) are large and rarely repeat
+    expected = _hexdigest(_canonical_json(event_data).encode())
+    return hmac.compare_digest(expected.encode(), signature.encode("utf-8", "replace"))
+
+
+def sign_payload(body: bytes) -> str:
+    """HMAC-SHA256 signature over raw request bytes (no re-serialization)."""
+    return _hexdigest(body)
+
+
+def verify_payload(body: bytes, signature: str) -> bool:
+    """Constant-time check of a raw-body signature (e.g. an X-Signature header)."""
+    return hmac.compare_digest(sign_payload(body).encode(), signature.encode("utf-8", "replace"))
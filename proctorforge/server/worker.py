@@ -0,0 +1,29 @@
+"""
+ProctorForge AI - Background Task Worker
+Consumes the Redis task queue (services/task_queue.py). Run alongside the API:
+    python worker.py
+"""
+import asyncio
+
+from database import init_db
+from services.task_queue import run_worker
+
+try:
+    import uvloop  # installed with uvicorn[standard]; not available on Windows
+except ImportError:
+    uvloop = None
+
+
+async def main():
+    # Task handlers open their own sessions from database.AsyncSessionLocal
+    await init_db()
+    await run_worker()
+
+
+if __name__ == "__main__":
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("🛑 Task worker shutting down")
@@ -1,18 +1,24 @@
 import os
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
 from dotenv import load_dotenv
-from supabase import create_client, Client
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 # Load environment variables from .env file
 load_dotenv()
 
-url: str = os.environ.get("SUPABASE_URL")
-key: str = os.environ.get("SUPABASE_ANON_KEY")
-
-if not url or not key:
-    raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY must be set in .env file")
 
-supabase: Client = create_client(url, key)
+@lru_cache(maxsize=1)
+def get_supabase() -> "Client":
+    """Returns the Supabase client, creating it on first use."""
+    # Imported here so processes that never touch Supabase skip the supabase/httpx import chain
+    from supabase import create_client
 
-def get_supabase():
-    """Returns the initialized Supabase client."""
-    return supabase
+    url = os.environ.get("SUPABASE_URL")
+    key = os.environ.get("SUPABASE_ANON_KEY")
+    if not url or not key:
+        raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY must be set in .env file")
+    return create_client(url, key)